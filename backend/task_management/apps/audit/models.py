@@ -12,7 +12,7 @@ class AuditLog(models.Model):
     class Meta:
         ordering = ['-timestamp']
         indexes = [
-            models.Index(fields=['user']),
+            models.Index(fields=['user', '-timestamp']),
             models.Index(fields=['task']),
             models.Index(fields=['-timestamp']),
         ]
@@ -1,8 +1,9 @@
 from rest_framework import serializers
+from apps.tasks.sparse import SparseFieldsetSerializerMixin
 from .models import AuditLog
 import json
 
-class AuditLogSerializer(serializers.ModelSerializer):
+class AuditLogSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     username = serializers.CharField(source='user.username', read_only=True)
     task_title = serializers.SerializerMethodField()
     changed_data_json = serializers.SerializerMethodField()
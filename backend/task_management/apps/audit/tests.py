@@ -1,3 +1,184 @@
-from django.test import TestCase
+import threading
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from unittest import mock
+
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.tasks.models import Task
+
+from .models import AuditLog
+from .writer import AsyncAuditWriter, entries_written, record, write_entries
+
+
+class AuditWriterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auditor', password='pass12345')
+
+    def entry(self, action='Task Updated'):
+        return AuditLog(user=self.user, action=action, changed_data='{}')
+
+    def test_entries_are_written_once_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                record([self.entry('Status Changed')])
+                record([self.entry('Priority Changed'), self.entry()])
+                self.assertEqual(AuditLog.objects.count(), 0)
+        self.assertEqual(
+            list(AuditLog.objects.order_by('id').values_list('action', flat=True)),
+            ['Status Changed', 'Priority Changed', 'Task Updated'],
+        )
+
+    def test_single_insert_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with transaction.atomic():
+                for _ in range(5):
+                    record([self.entry()])
+        self.assertEqual(len(callbacks), 1)
+        with CaptureQueriesContext(connection) as captured:
+            callbacks[0]()
+        self.assertEqual(len([q for q in captured if q['sql'].startswith('INSERT')]), 1)
+        self.assertEqual(AuditLog.objects.count(), 5)
+
+    def test_rolled_back_savepoint_drops_its_entries(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                record([self.entry('Kept')])
+                try:
+                    with transaction.atomic():
+                        record([self.entry('Dropped')])
+                        raise ValueError
+                except ValueError:
+                    pass
+                record([self.entry('Also kept')])
+        self.assertEqual(
+            sorted(AuditLog.objects.values_list('action', flat=True)),
+            ['Also kept', 'Kept'],
+        )
+
+    def test_entries_written_signal(self):
+        received = []
+
+        def receiver(sender, entries, **kwargs):
+            received.extend(entry.pk for entry in entries)
+
+        entries_written.connect(receiver)
+        self.addCleanup(entries_written.disconnect, receiver)
+        with self.captureOnCommitCallbacks(execute=True):
+            record([self.entry(), self.entry()])
+        self.assertEqual(sorted(received), sorted(AuditLog.objects.values_list('id', flat=True)))
+
+
+class UserDeletionAuditTests(TransactionTestCase):
+    def test_deleting_a_user_who_owns_tasks(self):
+        owner = User.objects.create_user(username='owner', password='pass12345')
+        other = User.objects.create_user(username='other', password='pass12345')
+        Task.objects.create(title='Owned', description='x', owner=owner)
+        owner.delete()
+        self.assertFalse(Task.objects.exists())
+        self.assertFalse(AuditLog.objects.filter(user_id=owner.id).exists())
+        with transaction.atomic():
+            record([AuditLog(user=other, action='Kept', changed_data='{}')])
+            gone = User.objects.create_user(username='gone', password='pass12345')
+            record([AuditLog(user=gone, action='Dropped', changed_data='{}')])
+            gone.delete()
+        self.assertEqual(list(AuditLog.objects.values_list('action', flat=True)), ['Kept'])
+
+
+class AsyncAuditWriterTests(TestCase):
+    def test_drains_in_background_and_flushes_on_shutdown(self):
+        written = []
+        writer = AsyncAuditWriter(write=written.extend, maxsize=10)
+        writer.submit([1, 2])
+        writer.submit([3])
+        writer.flush()
+        self.assertEqual(written, [1, 2, 3])
+        writer.submit([4])
+        writer.shutdown()
+        self.assertEqual(written, [1, 2, 3, 4])
+
+    def test_full_queue_applies_backpressure(self):
+        started = threading.Event()
+        release = threading.Event()
+        background = []
+        inline = []
+
+        def write(entries):
+            if threading.current_thread().name == 'audit-writer':
+                started.set()
+                release.wait(5)
+                background.extend(entries)
+            else:
+                inline.extend(entries)
+
+        writer = AsyncAuditWriter(write=write, maxsize=1, put_timeout=0.01, batch_size=1)
+        writer.submit(['a'])
+        started.wait(5)
+        writer.submit(['b'])
+        writer.submit(['c'])
+        self.assertEqual(writer.inline_writes, 1)
+        self.assertEqual(inline, ['c'])
+        release.set()
+        writer.shutdown()
+        self.assertEqual(background, ['a', 'b'])
+
+    def test_failed_batch_is_retried_per_submission(self):
+        started = threading.Event()
+        release = threading.Event()
+        written = []
+
+        def write(entries):
+            if not started.is_set():
+                started.set()
+                release.wait(5)
+            if 'bad' in entries:
+                raise ValueError('bad row')
+            written.extend(entries)
+
+        writer = AsyncAuditWriter(write=write, maxsize=10)
+        writer.submit(['first'])
+        started.wait(5)
+        writer.submit(['a'])
+        writer.submit(['bad', 'lost'])
+        writer.submit(['b'])
+        with self.assertLogs('apps.audit.writer', 'ERROR'):
+            release.set()
+            writer.shutdown()
+        self.assertEqual(written, ['first', 'a', 'b'])
+
+
+# Realtime events are numbered in the database; keep that off the writer's thread.
+@override_settings(AUDIT_LOG_ASYNC=True, REALTIME_DISPATCH_ASYNC=False)
+class AsyncAuditConditionalTests(TransactionTestCase):
+    def test_log_etag_changes_once_background_rows_land(self):
+        user = User.objects.create_user(username='auditor', password='pass12345')
+        client = APIClient()
+        client.force_authenticate(user=user)
+        release = threading.Event()
+
+        def write(entries):
+            release.wait(5)
+            write_entries(entries)
+
+        writer = AsyncAuditWriter(write=write)
+        self.addCleanup(writer.shutdown)
+        # The writer only runs while this thread waits on it: SQLite's shared
+        # in-memory test database does not take concurrent writers.
+        with mock.patch('apps.audit.writer.get_async_writer', return_value=writer):
+            task = Task.objects.create(title='Audited', description='x', owner=user)
+            release.set()
+            writer.flush()
+            release.clear()
+            task.title = 'Renamed'
+            task.save()
+            early = client.get('/api/logs/')
+            release.set()
+            writer.flush()
+        stored = AuditLog.objects.filter(user=user).count()
+        self.assertLess(early.data['count'], stored)
+        late = client.get('/api/logs/', HTTP_IF_NONE_MATCH=early['ETag'])
+        self.assertEqual(late.status_code, 200)
+        self.assertEqual(late.data['count'], stored)
@@ -6,11 +6,14 @@ from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
 
+from apps.tasks.conditional import conditional_on_data_version
+from apps.tasks.sparse import SparseFieldsetViewMixin
+
 from .models import AuditLog
 from .serializers import AuditLogSerializer
 
 
-class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
+class AuditLogViewSet(SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     """
     Read-only ViewSet for Audit Logs
     
@@ -24,7 +27,19 @@ class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ['action', 'task']
     ordering_fields = ['timestamp']
     ordering = ['-timestamp']
+    sparse_field_sources = {
+        'username': ['user__username'],
+        'task_title': ['task', 'task__title'],
+        'changed_data_json': ['changed_data'],
+    }
     
     def get_queryset(self):
         """Return audit logs only for the authenticated user"""
-        return AuditLog.objects.filter(user=self.request.user).select_related('user', 'task')
\ No newline at end of file
+        return AuditLog.objects.filter(user=self.request.user).select_related('user', 'task')
+
+    def filter_queryset(self, queryset):
+        return self.apply_sparse_fieldset(super().filter_queryset(queryset))
+
+    @conditional_on_data_version()
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
@@ -0,0 +1,208 @@
+import atexit
+import logging
+import queue
+import threading
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, close_old_connections
+from django.dispatch import Signal
+
+from apps.tasks.caching import invalidate_scopes
+from apps.tasks.models import Task
+from apps.tasks.oncommit import CommitBuffers
+from apps.tasks.versioning import bump_user_versions
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+# Sent after every bulk insert with `entries`, the saved AuditLog instances.
+entries_written = Signal()
+
+
+def write_entries(entries):
+    """
+    Insert `entries` with one `bulk_create`. Entries pointing at a task that
+    no longer exists lose the reference, like `on_delete=SET_NULL` would
+    have done had they been written earlier, and entries by a user that no
+    longer exists are dropped, as `on_delete=CASCADE` would have done.
+
+    The authors' scopes are bumped once the rows exist: the task signals
+    bump them before the rows are written (possibly by the background
+    writer), so a log page cached in between must not stay valid.
+    """
+    entries = list(entries)
+    if not entries:
+        return []
+    user_ids = {entry.user_id for entry in entries}
+    existing = set(User.objects.filter(id__in=user_ids).values_list('id', flat=True))
+    if existing != user_ids:
+        entries = [entry for entry in entries if entry.user_id in existing]
+        user_ids = existing
+        if not entries:
+            return []
+    task_ids = {entry.task_id for entry in entries if entry.task_id}
+    if task_ids:
+        existing = set(Task.objects.filter(id__in=task_ids).values_list('id', flat=True))
+        for entry in entries:
+            if entry.task_id and entry.task_id not in existing:
+                entry.task = None
+    AuditLog.objects.bulk_create(entries, batch_size=getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 500))
+    invalidate_scopes(bump_user_versions(user_ids, include_global=False))
+    entries_written.send(sender=AuditLog, entries=entries)
+    return entries
+
+
+class AsyncAuditWriter:
+    """
+    Drains audit entries into the database from a background thread.
+
+    The queue is bounded. When it stays full for `put_timeout` seconds the
+    caller writes its entries itself, which slows producers down to the
+    database's pace instead of dropping rows or growing memory. Whatever is
+    queued is written on `shutdown()`, which runs at interpreter exit.
+    """
+
+    def __init__(self, write=write_entries, maxsize=1000, put_timeout=0.5, batch_size=500):
+        self.write = write
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.put_timeout = put_timeout
+        self.batch_size = batch_size
+        self.inline_writes = 0
+        self._stopped = object()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+
+    def submit(self, entries):
+        entries = list(entries)
+        if not entries:
+            return
+        self.start()
+        try:
+            self.queue.put(entries, timeout=self.put_timeout)
+        except queue.Full:
+            self.inline_writes += 1
+            self.write(entries)
+
+    def flush(self):
+        """Block until everything submitted so far has been written."""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.join()
+
+    def shutdown(self, timeout=10):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None or not thread.is_alive():
+            self._drain_inline()
+            return
+        self.queue.put(self._stopped)
+        thread.join(timeout)
+        self._drain_inline()
+
+    def _drain_inline(self):
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not self._stopped:
+                self.write(item)
+            self.queue.task_done()
+
+    def _write(self, items):
+        """
+        Write several submissions at once, or one by one when that fails, so
+        a bad row only loses the entries submitted with it.
+        """
+        entries = [entry for item in items for entry in item]
+        if not entries:
+            return
+        try:
+            self.write(entries)
+            return
+        except Exception:
+            if len(items) == 1:
+                logger.exception('Failed to write %d audit entries.', len(entries))
+                return
+        for item in items:
+            try:
+                self.write(item)
+            except Exception:
+                logger.exception('Failed to write %d audit entries.', len(item))
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is self._stopped for item in batch)
+            items = [item for item in batch if item is not self._stopped]
+            try:
+                self._write(items)
+            finally:
+                close_old_connections()
+                for _ in batch:
+                    self.queue.task_done()
+            if stop:
+                return
+
+
+_async_writer = None
+_async_writer_lock = threading.Lock()
+
+
+def get_async_writer():
+    global _async_writer
+    with _async_writer_lock:
+        if _async_writer is None:
+            _async_writer = AsyncAuditWriter(
+                maxsize=getattr(settings, 'AUDIT_LOG_QUEUE_SIZE', 1000),
+                put_timeout=getattr(settings, 'AUDIT_LOG_QUEUE_TIMEOUT', 0.5),
+                batch_size=getattr(settings, 'AUDIT_LOG_BATCH_SIZE', 500),
+            )
+            atexit.register(_async_writer.shutdown)
+        return _async_writer
+
+
+def async_enabled():
+    return getattr(settings, 'AUDIT_LOG_ASYNC', False)
+
+
+def _dispatch(entries):
+    if async_enabled():
+        get_async_writer().submit(entries)
+    else:
+        write_entries(entries)
+
+
+_pending = CommitBuffers(list, _dispatch)
+
+
+def record(entries, using=DEFAULT_DB_ALIAS):
+    """
+    Queue audit entries for writing.
+
+    Outside a transaction they are written right away. Inside one they are
+    buffered and written with a single `bulk_create` once it commits, and
+    dropped if it rolls back. Entries recorded inside a nested atomic block
+    are buffered per savepoint, so rolling that savepoint back drops only
+    its own entries.
+    """
+    entries = list(entries)
+    if not entries:
+        return
+    pending = _pending.get(using)
+    if pending is None:
+        _dispatch(entries)
+        return
+    pending.extend(entries)
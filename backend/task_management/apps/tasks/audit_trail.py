@@ -0,0 +1,109 @@
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.audit.models import AuditLog
+
+TRACKED_FIELDS = ('title', 'description', 'status', 'priority')
+ASSIGNMENT_TRACKED_FIELDS = ('assigned_role', 'submission_deadline', 'feedback_notes')
+# Fields that also get an audit row of their own when they change.
+HIGHLIGHTED_FIELDS = {
+    'status': 'Status Changed',
+    'priority': 'Priority Changed',
+}
+
+
+def created_entries(task):
+    return [
+        AuditLog(
+            user_id=task.owner_id,
+            task=task,
+            action='Task Created',
+            changed_data=json.dumps({field: getattr(task, field) for field in TRACKED_FIELDS}),
+        )
+    ]
+
+
+def updated_entries(old_values, task):
+    """
+    Audit rows for an update, given the tracked field values before it:
+    one per highlighted field that changed, then a "Task Updated" summary.
+    """
+    changes = {}
+    entries = []
+    for field in TRACKED_FIELDS:
+        old, new = old_values[field], getattr(task, field)
+        if old == new:
+            continue
+        changes[field] = {'old': old, 'new': new}
+        if field in HIGHLIGHTED_FIELDS:
+            entries.append(AuditLog(
+                user_id=task.owner_id,
+                task=task,
+                action=HIGHLIGHTED_FIELDS[field],
+                changed_data=json.dumps(changes[field]),
+            ))
+    if changes:
+        entries.append(AuditLog(
+            user_id=task.owner_id,
+            task=task,
+            action='Task Updated',
+            changed_data=json.dumps(changes),
+        ))
+    return entries
+
+
+def deleted_entries(task):
+    data = {'task_id': task.id}
+    data.update((field, getattr(task, field)) for field in TRACKED_FIELDS)
+    return [
+        AuditLog(
+            user_id=task.owner_id,
+            task=None,
+            action='Task Deleted',
+            changed_data=json.dumps(data),
+        )
+    ]
+
+
+def tracked_values(task):
+    return {field: getattr(task, field) for field in TRACKED_FIELDS}
+
+
+def assignment_entries(assignment, created=False, deleted=False):
+    """
+    Audit rows for a role assignment write, filed under the task owner like
+    the task's own rows. Soft revokes (`is_active` cleared) and reactivations
+    count as "Role Revoked" and "Role Assigned".
+    """
+    dirty = assignment.get_dirty_fields()
+    was_active, is_active = dirty.get('is_active', (assignment.is_active, assignment.is_active))
+    if deleted or (was_active and not is_active):
+        action = 'Role Revoked'
+        data = {'assigned_role': assignment.assigned_role}
+    elif created or (is_active and not was_active):
+        action = 'Role Assigned'
+        data = {
+            'assigned_role': assignment.assigned_role,
+            'submission_deadline': assignment.submission_deadline,
+            'assigned_by_id': assignment.assigned_by_id,
+        }
+    else:
+        data = {
+            field: {'old': dirty[field][0], 'new': dirty[field][1]}
+            for field in ASSIGNMENT_TRACKED_FIELDS
+            if field in dirty
+        }
+        if not data:
+            return []
+        action = 'Role Updated'
+
+    data.update(assignment_id=assignment.id, user_id=assignment.user_id)
+    return [
+        AuditLog(
+            user_id=assignment.task.owner_id,
+            task_id=assignment.task_id,
+            action=action,
+            changed_data=json.dumps(data, cls=DjangoJSONEncoder),
+        )
+    ]
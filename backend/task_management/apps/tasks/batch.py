@@ -0,0 +1,255 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.audit.writer import record as record_audit
+
+from .audit_trail import created_entries, deleted_entries, tracked_values, updated_entries
+from .caching import invalidate_scopes
+from .counters import CounterDeltas, new_state, old_state
+from .fast_serializers import TaskValuesSerializer
+from .models import Task, TaskVisibility
+from .permissions import IsTaskOwner
+from .ranking import reserve_positions
+from .realtime import (
+    broadcast_generic_event,
+    broadcast_memberships_changed,
+    broadcast_shared_task_event,
+    broadcast_task_summary,
+)
+from .serializers import TaskSerializer
+from .signals import muted_task_signals
+from .versioning import bump_task_versions
+from .visibility import grant_visibilities
+
+OP_CREATE = 'create'
+OP_UPDATE = 'update'
+OP_DELETE = 'delete'
+OPERATIONS = (OP_CREATE, OP_UPDATE, OP_DELETE)
+
+
+class TaskBatch:
+    """
+    Apply a list of create/update/delete operations in one transaction.
+
+    Every operation is validated first, with the same serializer and the
+    same owner/assignee rules as the single-task endpoints. Valid operations
+    are then written with `bulk_create`, `bulk_update` and one queryset
+    delete, so the per-row signals never fire; their side effects are done
+    here once for the whole batch: one audit insert, one visibility insert,
+    one version bump, and a single `tasks_batch` event plus summary per
+    affected owner. Collaborators of changed tasks get the usual per-task
+    event on the task's group.
+
+    Targets are locked while they are validated and written, and each
+    update only writes the fields it was given, so a concurrent PATCH of
+    other fields is not reverted.
+
+    With `atomic=True` any invalid operation rejects the whole batch.
+    """
+
+    def __init__(self, user, operations, queryset, context=None):
+        self.user = user
+        self.operations = operations
+        self.queryset = queryset
+        self.context = context or {}
+        self.results = [None] * len(operations)
+        self.creates = []
+        self.updates = []
+        self.deletes = []
+        # Task id -> users it is shared with, for updated and deleted tasks.
+        self.shared = {}
+
+    @property
+    def failed(self):
+        return sum(1 for result in self.results if result['status'] == 'error')
+
+    def run(self, atomic=False):
+        """Validate and apply; returns True when anything was written."""
+        with transaction.atomic():
+            self.validate()
+            if atomic and self.failed:
+                for result in self.results:
+                    if result['status'] == 'ok':
+                        result['status'] = 'skipped'
+                return False
+            if not (self.creates or self.updates or self.deletes):
+                return False
+            rows = self.apply()
+        self.broadcast(rows)
+        return True
+
+    def error(self, index, kind, errors):
+        self.results[index] = {'index': index, 'op': kind, 'status': 'error', 'errors': errors}
+
+    def ok(self, index, kind, task_id=None):
+        self.results[index] = {'index': index, 'op': kind, 'status': 'ok', 'id': task_id}
+
+    def validate(self):
+        targets = {}
+        for index, operation in enumerate(self.operations):
+            kind = operation.get('op')
+            if kind in (OP_UPDATE, OP_DELETE):
+                task_id = operation.get('id')
+                if not isinstance(task_id, int) or isinstance(task_id, bool):
+                    continue
+                targets.setdefault(task_id, []).append(index)
+        # Locked until `run` commits, so nothing changes between the
+        # permission checks here and the writes in `apply`.
+        tasks = self.queryset.filter(id__in=list(targets)).select_for_update(of=('self',)).in_bulk()
+
+        for index, operation in enumerate(self.operations):
+            kind = operation.get('op')
+            data = operation.get('data') or {}
+            if kind not in OPERATIONS:
+                self.error(index, kind, {'op': [f"Must be one of: {', '.join(OPERATIONS)}."]})
+                continue
+            if not isinstance(data, dict):
+                self.error(index, kind, {'data': ['Expected an object.']})
+                continue
+            if kind == OP_CREATE:
+                self.validate_create(index, data)
+                continue
+
+            task_id = operation.get('id')
+            if task_id not in targets:
+                self.error(index, kind, {'id': ['A valid task id is required.']})
+            elif len(targets[task_id]) > 1:
+                self.error(index, kind, {'id': ['A task can only appear once per batch.']})
+            elif task_id not in tasks:
+                self.error(index, kind, {'detail': 'Not found.'})
+            elif kind == OP_UPDATE:
+                self.validate_update(index, tasks[task_id], data)
+            elif tasks[task_id].owner_id != self.user.id:
+                self.error(index, kind, {'detail': 'Only the owner can delete a task.'})
+            else:
+                self.deletes.append(tasks[task_id])
+                self.ok(index, kind, task_id)
+
+    def validate_create(self, index, data):
+        serializer = TaskSerializer(data=data, context=self.context)
+        if not serializer.is_valid():
+            self.error(index, OP_CREATE, serializer.errors)
+            return
+        self.creates.append((index, serializer.validated_data))
+        self.ok(index, OP_CREATE)
+
+    def validate_update(self, index, task, data):
+        if task.owner_id != self.user.id:
+            assignments = getattr(task, 'current_assignments', None)
+            allowed = set(data).issubset(IsTaskOwner.ASSIGNEE_MUTABLE_FIELDS)
+            if not assignments or not allowed:
+                self.error(index, OP_UPDATE, {
+                    'detail': 'You do not have permission to perform this action.'
+                })
+                return
+        serializer = TaskSerializer(task, data=data, partial=True, context=self.context)
+        if not serializer.is_valid():
+            self.error(index, OP_UPDATE, serializer.errors)
+            return
+        self.updates.append((index, task, serializer.validated_data))
+        self.ok(index, OP_UPDATE, task.id)
+
+    def apply(self):
+        entries = []
+        scopes = set()
+        counters = CounterDeltas()
+
+        changed_ids = [task.id for task in self.deletes] + [task.id for _, task, _ in self.updates]
+        if changed_ids:
+            # Read before the deletes cascade the visibility rows away.
+            shared = (
+                TaskVisibility.objects.filter(task_id__in=changed_ids)
+                .exclude(user_id=F('task__owner_id'))
+                .values_list('task_id', 'user_id')
+            )
+            for task_id, user_id in shared:
+                self.shared.setdefault(task_id, set()).add(user_id)
+
+        if self.deletes:
+            delete_ids = [task.id for task in self.deletes]
+            # Visibility rows cascade with the tasks, so bump their viewers first.
+            scopes.update(bump_task_versions(*delete_ids))
+            for task in self.deletes:
+                entries.extend(deleted_entries(task))
+                counters.change(old_state(task), None)
+            with muted_task_signals():
+                Task.objects.filter(id__in=delete_ids).delete()
+
+        created = []
+        if self.creates:
+            positions = reserve_positions(self.user.id, len(self.creates))
+            for (index, validated_data), position in zip(self.creates, positions):
+                created.append(Task(owner=self.user, position=position, **validated_data))
+            Task.objects.bulk_create(created)
+            for (index, _), task in zip(self.creates, created):
+                self.results[index]['id'] = task.id
+                entries.extend(created_entries(task))
+                counters.change(None, new_state(task))
+            grant_visibilities((task.id, task.owner_id) for task in created)
+
+        updated = []
+        if self.updates:
+            now = timezone.now()
+            # One bulk_update per field set: a task only writes its own fields.
+            groups = {}
+            for index, task, validated_data in self.updates:
+                old_values = tracked_values(task)
+                for attr, value in validated_data.items():
+                    setattr(task, attr, value)
+                task.updated_at = now
+                entries.extend(updated_entries(old_values, task))
+                counters.change(old_state(task), new_state(task))
+                updated.append(task)
+                fields = tuple(sorted({'updated_at', *validated_data}))
+                groups.setdefault(fields, []).append(task)
+            for fields, tasks in groups.items():
+                Task.objects.bulk_update(tasks, fields)
+
+        record_audit(entries)
+        counters.apply()
+        written = [task.id for task in created + updated]
+        if written:
+            scopes.update(bump_task_versions(*written))
+        invalidate_scopes(sorted(scopes))
+
+        rows = {}
+        if written:
+            reader = TaskValuesSerializer(user=self.user)
+            rows = {row['id']: row for row in reader.serialize_queryset(Task.objects.filter(id__in=written))}
+        for index, _ in self.creates:
+            self.results[index]['data'] = rows.get(self.results[index]['id'])
+        for index, task, _ in self.updates:
+            self.results[index]['data'] = rows.get(task.id)
+        return rows
+
+    def broadcast(self, rows):
+        """One coalesced event and one summary per owner whose tasks changed."""
+        events = {}
+        # Same shape as `broadcast_task_payload`, which has no requesting user.
+        rows = {task_id: dict(row, current_assignment=None) for task_id, row in rows.items()}
+
+        def event_for(owner_id):
+            return events.setdefault(owner_id, {'created': [], 'updated': [], 'deleted': []})
+
+        for index, _ in self.creates:
+            event_for(self.user.id)['created'].append(rows[self.results[index]['id']])
+        for index, task, _ in self.updates:
+            event_for(task.owner_id)['updated'].append(rows[task.id])
+        for task in self.deletes:
+            event_for(task.owner_id)['deleted'].append(task.id)
+
+        for owner_id, data in events.items():
+            broadcast_generic_event(owner_id, 'tasks_batch', data)
+            broadcast_task_summary(owner_id)
+
+        for index, task, _ in self.updates:
+            if task.id in self.shared:
+                broadcast_shared_task_event(task.owner_id, task.id, 'task_updated', rows[task.id])
+        collaborators = set()
+        for task in self.deletes:
+            if task.id in self.shared:
+                broadcast_shared_task_event(task.owner_id, task.id, 'task_deleted', {'id': task.id})
+                # Their assignments went with the task, unsignalled.
+                collaborators |= self.shared[task.id]
+        broadcast_memberships_changed(collaborators)
@@ -0,0 +1,78 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .stats import Counters
+
+INDEX_TIMEOUT = None
+
+
+class CacheStats(Counters):
+    """Process-wide hit/miss counters for the task list cache."""
+
+    fields = ('hits', 'misses', 'stores', 'invalidations')
+
+    def snapshot(self):
+        counts = super().snapshot()
+        lookups = counts['hits'] + counts['misses']
+        counts['hit_ratio'] = round(counts['hits'] / lookups, 4) if lookups else 0.0
+        return counts
+
+
+stats = CacheStats()
+
+
+def cache_enabled():
+    return getattr(settings, 'TASK_LIST_CACHE_ENABLED', True)
+
+
+def get_list_cache():
+    return caches[getattr(settings, 'TASK_LIST_CACHE_ALIAS', 'default')]
+
+
+def _index_key(scope):
+    return f'tasks:list:index:{scope}'
+
+
+def list_cache_key(request, scope, version):
+    """
+    Key a rendered list page on the user, the scope version and the
+    normalized query string. The host is included because pagination links
+    are absolute URLs.
+    """
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    raw = '|'.join([request.get_host(), request.path, repr(params)])
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return f'tasks:list:{scope}:{version}:{request.user.id}:{digest}'
+
+
+def get_cached_page(key):
+    data = get_list_cache().get(key)
+    stats.incr('misses' if data is None else 'hits')
+    return data
+
+
+def store_page(key, scope, data):
+    cache = get_list_cache()
+    cache.set(key, data)
+    index = cache.get(_index_key(scope)) or set()
+    index.add(key)
+    cache.set(_index_key(scope), index, INDEX_TIMEOUT)
+    stats.incr('stores')
+
+
+def invalidate_scopes(scopes):
+    """
+    Drop every cached page for `scopes`. Keys already embed the scope version,
+    so this frees memory eagerly rather than being needed for correctness.
+    """
+    if not scopes or not cache_enabled():
+        return
+    cache = get_list_cache()
+    index_keys = [_index_key(scope) for scope in scopes]
+    keys = list(index_keys)
+    for page_keys in cache.get_many(index_keys).values():
+        keys.extend(page_keys)
+    cache.delete_many(keys)
+    stats.incr('invalidations', len(scopes))
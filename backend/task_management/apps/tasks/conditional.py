@@ -0,0 +1,74 @@
+import hashlib
+from functools import wraps
+
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from .versioning import get_data_version, user_scope
+
+
+def data_version_etag(request, scope, version):
+    params = sorted(request.query_params.lists())
+    raw = '|'.join([
+        scope,
+        str(version),
+        request.path,
+        repr(params),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return 'W/"{}"'.format(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+def etag_matches(request, etag):
+    header = request.META.get('HTTP_IF_NONE_MATCH')
+    if not header:
+        return False
+    candidates = parse_etags(header)
+    if '*' in candidates:
+        return True
+    # Weak comparison: W/"x" and "x" name the same representation.
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    return any(
+        (candidate[2:] if candidate.startswith('W/') else candidate) == opaque
+        for candidate in candidates
+    )
+
+
+def conditional_on_data_version(scope_func=None):
+    """
+    Decorate a viewset handler so it answers `If-None-Match` with 304 before
+    touching any queryset. The weak ETag is derived from the scope's data
+    version and the request's query parameters.
+
+    `scope_func(view, request)` picks the version scope; it defaults to the
+    requesting user's scope. The handler can read `view.data_version` as a
+    `(scope, version)` pair.
+    """
+
+    def decorator(handler):
+        @wraps(handler)
+        def wrapper(view, request, *args, **kwargs):
+            if scope_func is not None:
+                scope = scope_func(view, request)
+            else:
+                scope = user_scope(request.user.id)
+            version = get_data_version(scope)
+            view.data_version = (scope, version)
+            etag = data_version_etag(request, scope, version)
+
+            if etag_matches(request, etag):
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+            else:
+                response = handler(view, request, *args, **kwargs)
+
+            if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+                response['ETag'] = etag
+                patch_cache_control(response, private=True, no_cache=True)
+                patch_vary_headers(response, ['Authorization'])
+            return response
+
+        return wrapper
+
+    return decorator
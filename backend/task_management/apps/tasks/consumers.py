@@ -1,12 +1,62 @@
+import asyncio
 from urllib.parse import parse_qs
 
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from .encodings import DEFAULT_ENCODING, ENCODING_PARAM, frames, negotiate
+from .memberships import memberships, task_group
+from .outbound import RESYNC_EVENT, OutboundQueue, stats as outbound_stats
+from .pagination import TaskPagination
+from .realtime import Event, full_task_list, task_snapshot
+from .replay import current_sequence, missed_since
+from .sparse import FIELDS_PARAM, OMIT_PARAM, parse_field_list, project, select_fields
+from .serializers import TaskSerializer
+
+# Events whose data is a serialized task or a list of them.
+TASK_PAYLOAD_EVENTS = {'task_created', 'task_updated'}
+# Events whose data holds lists of serialized tasks under these keys.
+TASK_BATCH_EVENTS = {'tasks_batch': ('created', 'updated')}
+# Close code for clients that stopped reading.
+SLOW_CLIENT_CLOSE_CODE = 4408
+
 
 class TaskConsumer(AsyncJsonWebsocketConsumer):
-    """WebSocket consumer that streams per-user task updates."""
+    """
+    WebSocket consumer that streams per-user task updates.
+
+    `?fields=` / `?omit=` on the connection URL trim task payloads the same
+    way they trim REST responses. Events carry a per-user `seq`; a client
+    reconnecting with `?since=<seq>` gets the events it missed replayed, or
+    `resync_required` when they are no longer buffered. A live event whose
+    `seq` skips ahead or goes backwards means one was lost or reordered on
+    the way, so the client gets `resync_required` for it too. `?snapshot=<n>`
+    pushes the summary and first `n` tasks right after `connected`, saving
+    the page load its separate HTTP requests.
+
+    Frames are JSON text unless the client offers a `msgpack` or `cbor`
+    subprotocol (or passes `?encoding=`), in which case they are binary, both
+    ways. Event frames are encoded once per process and shared by every
+    socket that receives them.
+
+    Group events are not written inline: they go through a bounded,
+    coalescing `OutboundQueue` drained by a writer task, so a stalled tab
+    cannot back up the channel layer. Clients stalled for longer than
+    REALTIME_SLOW_CLIENT_TIMEOUT are disconnected.
+
+    Besides the user's own group, the socket joins `task_<id>` for every task
+    shared with the user through a role assignment, from the per-process
+    `memberships` cache. Updates to those tasks arrive without a `seq`.
+    """
+
+    last_seq = 0
+    # Events up to here were sent before the socket connected or replayed.
+    connected_seq = 0
+    encoding = DEFAULT_ENCODING
+    outbound = None
+    writer = None
+    shared_task_ids = None
 
     async def connect(self):
         self.user = await self._authenticate_user()
@@ -14,27 +64,181 @@ class TaskConsumer(AsyncJsonWebsocketConsumer):
             await self.close(code=4401)
             return
 
+        try:
+            self.task_fields = self._parse_task_fields()
+            since = self._parse_since()
+            snapshot_size = self._parse_snapshot_size()
+            self.encoding, subprotocol = negotiate(
+                self.scope.get('subprotocols'), self._query_param(ENCODING_PARAM)
+            )
+        except Exception:
+            await self.close(code=4400)
+            return
+
         self.group_name = f'user_tasks_{self.user.id}'
+        # Join before reading the sequence so nothing falls between the
+        # replay and the live stream.
         await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
+        await self._join_task_groups(await database_sync_to_async(memberships.connect)(self.user.id))
+        current = await database_sync_to_async(current_sequence)(self.user.id)
+        self.connected_seq = self.last_seq = current
+        missed = None
+        if since is not None:
+            missed = await database_sync_to_async(missed_since)(self.user.id, since)
+        await self.accept(subprotocol=subprotocol)
+        self.outbound = OutboundQueue()
+        self.writer = asyncio.ensure_future(self._write_outbound())
         await self.send_json({
             'event': 'connected',
-            'data': {'message': 'Realtime connection established.'}
+            'data': {'message': 'Realtime connection established.', 'seq': current}
         })
+        if snapshot_size is not None:
+            data = await database_sync_to_async(task_snapshot)(self.user, snapshot_size, self.task_fields)
+            await self.send_json({'event': 'snapshot', 'data': data})
+        if since is None:
+            return
+        if missed is None:
+            await self.send_json({'event': 'resync_required', 'data': {'seq': current}})
+            return
+        for message in missed:
+            await self._send_event(message)
 
     async def disconnect(self, code):
+        self._stop_writer()
+        if self.shared_task_ids is not None:
+            await self._join_task_groups(frozenset())
+            self.shared_task_ids = None
+            memberships.disconnect(self.user.id)
         if getattr(self, 'group_name', None) and self.channel_layer:
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
+    async def task_memberships(self, event):
+        """The tasks shared with this user changed; follow them."""
+        if self.shared_task_ids is None:
+            return
+        task_ids = await database_sync_to_async(memberships.refresh)(self.user.id, event.get('generation'))
+        await self._join_task_groups(task_ids)
+
+    async def _join_task_groups(self, task_ids):
+        """Join the groups of `task_ids` and leave the ones not in it."""
+        current = self.shared_task_ids or frozenset()
+        for task_id in task_ids - current:
+            await self.channel_layer.group_add(task_group(task_id), self.channel_name)
+        for task_id in current - task_ids:
+            await self.channel_layer.group_discard(task_group(task_id), self.channel_name)
+        self.shared_task_ids = frozenset(task_ids)
+
     async def receive_json(self, content, **kwargs):
         if content.get('type') == 'ping':
             await self.send_json({'event': 'pong'})
+        elif content.get('type') == 'resync':
+            # Sent by clients that noticed a gap in `tasks_reordered` versions.
+            data = await database_sync_to_async(full_task_list)(self.user.id)
+            if self.task_fields:
+                data['tasks'] = project(data['tasks'], self.task_fields)
+            await self.send_json({'event': 'tasks_resync', 'data': data})
 
     async def task_event(self, event):
-        await self.send_json({
+        seq = event.get('seq')
+        if self.outbound is None or (seq is not None and seq <= self.connected_seq):
+            return
+        if self.outbound.stalled():
+            outbound_stats.incr('slow_disconnects')
+            self._stop_writer()
+            await self.close(code=SLOW_CLIENT_CLOSE_CODE)
+            return
+        if seq is not None and seq != self.last_seq + 1:
+            outbound_stats.incr('gaps')
+            self.last_seq = max(self.last_seq, seq)
+            self.outbound.put(Event(self.user.id, RESYNC_EVENT, {'seq': self.last_seq}))
+            return
+        if seq is not None:
+            self.last_seq = seq
+        self.outbound.put(Event(
+            self.user.id, event.get('event'), event.get('data'), seq=seq, event_id=event.get('event_id')
+        ))
+        data = event.get('data')
+        if event.get('event') == 'task_deleted' and self.shared_task_ids and isinstance(data, dict):
+            if data.get('id') in self.shared_task_ids:
+                memberships.discard(self.user.id, data['id'])
+                await self._join_task_groups(self.shared_task_ids - {data['id']})
+
+    async def _write_outbound(self):
+        outbound = self.outbound
+        while True:
+            events = await outbound.get()
+            for event in events:
+                await self._send_event(event.message())
+            outbound.written(len(events))
+
+    def _stop_writer(self):
+        if self.writer is not None:
+            self.writer.cancel()
+        self.writer = self.outbound = None
+
+    async def _send_event(self, event):
+        data = event.get('data')
+        if self.task_fields and event.get('event') in TASK_PAYLOAD_EVENTS:
+            data = project(data, self.task_fields)
+        elif self.task_fields and event.get('event') in TASK_BATCH_EVENTS and data:
+            data = dict(data)
+            for key in TASK_BATCH_EVENTS[event['event']]:
+                if key in data:
+                    data[key] = project(data[key], self.task_fields)
+        content = {
             'event': event.get('event'),
-            'data': event.get('data'),
-        })
+            'data': data,
+            'seq': event.get('seq'),
+        }
+        key = None
+        if event.get('event_id') is not None:
+            key = (event['event_id'], event.get('seq'), tuple(self.task_fields or ()))
+        await self._send_frame(frames.encode(content, self.encoding, key))
+
+    async def send_json(self, content, close=False):
+        await self._send_frame(self.encoding.encode(content), close=close)
+
+    async def _send_frame(self, frame, close=False):
+        if self.encoding.binary:
+            await self.send(bytes_data=frame, close=close)
+        else:
+            await self.send(text_data=frame, close=close)
+
+    async def receive(self, text_data=None, bytes_data=None, **kwargs):
+        if bytes_data is not None and self.encoding.binary:
+            await self.receive_json(self.encoding.decode(bytes_data), **kwargs)
+        else:
+            await super().receive(text_data=text_data, bytes_data=bytes_data, **kwargs)
+
+    def _query_param(self, name):
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        return params.get(name, [None])[0]
+
+    def _parse_task_fields(self):
+        params = parse_qs(self.scope.get('query_string', b'').decode())
+        return select_fields(
+            list(TaskSerializer().fields),
+            parse_field_list(params.get(FIELDS_PARAM, [''])[0]),
+            parse_field_list(params.get(OMIT_PARAM, [''])[0]),
+        )
+
+    def _parse_since(self):
+        since = self._query_param('since')
+        if since is None:
+            return None
+        since = int(since)
+        if since < 0:
+            raise ValueError('since must not be negative.')
+        return since
+
+    def _parse_snapshot_size(self):
+        size = self._query_param('snapshot')
+        if size is None:
+            return None
+        size = int(size)
+        if size < 0:
+            raise ValueError('snapshot must not be negative.')
+        return min(size, TaskPagination.max_page_size)
 
     async def _authenticate_user(self):
         query_string = self.scope.get('query_string', b'').decode()
@@ -0,0 +1,135 @@
+from collections import defaultdict
+
+from django.db.models import Count, F, Q
+
+from .models import Task, TaskCounter
+
+COUNTER_FIELDS = ('total_tasks', 'completed', 'pending', 'high_priority')
+COUNTER_AGGREGATES = {
+    'total_tasks': Count('id'),
+    'completed': Count('id', filter=Q(status='Completed')),
+    'pending': Count('id', filter=Q(status='Pending')),
+    'high_priority': Count('id', filter=Q(priority='High')),
+}
+
+
+def contribution(status, priority):
+    """What one task with this status and priority adds to its owner's counters."""
+    return {
+        'total_tasks': 1,
+        'completed': int(status == 'Completed'),
+        'pending': int(status == 'Pending'),
+        'high_priority': int(priority == 'High'),
+    }
+
+
+class CounterDeltas:
+    """
+    Accumulates counter changes per user so a write touching many tasks
+    issues one UPDATE per owner.
+    """
+
+    def __init__(self):
+        self.deltas = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+
+    def add(self, owner_id, status, priority, sign=1):
+        if not owner_id:
+            return
+        deltas = self.deltas[owner_id]
+        for field, value in contribution(status, priority).items():
+            deltas[field] += sign * value
+
+    def remove(self, owner_id, status, priority):
+        self.add(owner_id, status, priority, sign=-1)
+
+    def change(self, old, new):
+        """`old` and `new` are `(owner_id, status, priority)`, or None."""
+        if old == new:
+            return
+        if old:
+            self.remove(*old)
+        if new:
+            self.add(*new)
+
+    def apply(self):
+        for user_id, deltas in self.deltas.items():
+            apply_delta(user_id, deltas)
+        self.deltas.clear()
+
+
+def record_change(old, new):
+    """Account for one task going from `old` to `new` state."""
+    deltas = CounterDeltas()
+    deltas.change(old, new)
+    deltas.apply()
+
+
+def old_state(task):
+    """`(owner_id, status, priority)` as the task was loaded."""
+    return tuple(task.get_old_value(attname) for attname in ('owner_id', 'status', 'priority'))
+
+
+def new_state(task):
+    return (task.owner_id, task.status, task.priority)
+
+
+def apply_delta(user_id, deltas):
+    """
+    Add `deltas` to the user's counters in one UPDATE. A user without a
+    counter row gets one counted from the tasks table, which already
+    includes the write being accounted for.
+    """
+    changes = {field: F(field) + value for field, value in deltas.items() if value}
+    if not changes:
+        return
+    if not TaskCounter.objects.filter(user_id=user_id).update(**changes):
+        recount(user_ids=[user_id])
+
+
+def count_tasks(user_ids=None):
+    """`{user_id: counts}` straight from the tasks table."""
+    queryset = Task.objects.order_by()
+    if user_ids is not None:
+        queryset = queryset.filter(owner_id__in=user_ids)
+    rows = queryset.values('owner_id').annotate(**COUNTER_AGGREGATES)
+    return {row.pop('owner_id'): row for row in rows}
+
+
+def recount(user_ids=None):
+    """
+    Rewrite counters from the tasks table and return
+    `{user_id: (stored, actual)}` for every user whose row was off.
+    Users without tasks are counted as zeros. Pass `user_ids` to limit the
+    recount; by default every user with a task or a counter is checked.
+    """
+    actual = count_tasks(user_ids)
+    stored_rows = TaskCounter.objects.all()
+    if user_ids is not None:
+        stored_rows = stored_rows.filter(user_id__in=user_ids)
+    stored = {
+        row.pop('user_id'): row
+        for row in stored_rows.values('user_id', *COUNTER_FIELDS)
+    }
+    zeros = dict.fromkeys(COUNTER_FIELDS, 0)
+    users = set(actual) | set(stored) | set(user_ids or ())
+    drift = {}
+    for user_id in users:
+        counts = actual.get(user_id, zeros)
+        if stored.get(user_id) == counts:
+            continue
+        drift[user_id] = (stored.get(user_id), counts)
+        TaskCounter.objects.update_or_create(user_id=user_id, defaults=counts)
+    return drift
+
+
+def get_counts(user_id):
+    """The user's summary counts, from their counter row."""
+    counts = (
+        TaskCounter.objects.filter(user_id=user_id)
+        .values(*COUNTER_FIELDS)
+        .first()
+    )
+    if counts is None:
+        recount(user_ids=[user_id])
+        counts = TaskCounter.objects.filter(user_id=user_id).values(*COUNTER_FIELDS).first()
+    return counts
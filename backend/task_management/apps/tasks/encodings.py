@@ -0,0 +1,114 @@
+import json
+import threading
+from collections import OrderedDict
+
+import cbor2
+import msgpack
+from django.conf import settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .renderers import dumps, fast_json_enabled
+
+ENCODING_PARAM = 'encoding'
+
+
+def _default(value):
+    # Same fallbacks as JSON (dates as ISO strings, Decimals as strings, ...),
+    # so every encoding carries identical values.
+    return JSONEncoder().default(value)
+
+
+def encode_json(content):
+    if fast_json_enabled():
+        return dumps(content, default=_default)
+    return json.dumps(content, cls=JSONEncoder)
+
+
+def encode_msgpack(content):
+    return msgpack.packb(content, default=_default)
+
+
+def encode_cbor(content):
+    return cbor2.dumps(content, default=lambda encoder, value: encoder.encode(_default(value)))
+
+
+class Encoding:
+    """A WebSocket frame format: text frames for JSON, binary for the rest."""
+
+    def __init__(self, name, encode, decode, binary):
+        self.name = name
+        self.encode = encode
+        self.decode = decode
+        self.binary = binary
+
+
+ENCODINGS = {
+    'json': Encoding('json', encode_json, json.loads, binary=False),
+    'msgpack': Encoding('msgpack', encode_msgpack, msgpack.unpackb, binary=True),
+    'cbor': Encoding('cbor', encode_cbor, cbor2.loads, binary=True),
+}
+DEFAULT_ENCODING = ENCODINGS['json']
+
+
+def negotiate(subprotocols, requested=None):
+    """
+    Pick the encoding for a connection. Returns `(encoding, subprotocol)`:
+    the first offered subprotocol naming a known encoding wins (and has to
+    be echoed back on accept), then `?encoding=`, then JSON. An unknown
+    `?encoding=` raises ValueError.
+    """
+    for subprotocol in subprotocols or ():
+        if subprotocol in ENCODINGS:
+            return ENCODINGS[subprotocol], subprotocol
+    if requested:
+        if requested not in ENCODINGS:
+            raise ValueError(f'Unsupported encoding: {requested}')
+        return ENCODINGS[requested], None
+    return DEFAULT_ENCODING, None
+
+
+class EncodedFrames:
+    """
+    Process-wide LRU of encoded event frames. Every socket of a user (and of
+    each collaborator on a shared task) in this process receives the same
+    event, so each (event id, seq, encoding, field selection) is encoded
+    once and the frame reused for the others.
+    """
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._frames = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    def encode(self, content, encoding, key=None):
+        if key is None:
+            return encoding.encode(content)
+        key = (encoding.name, *key)
+        with self._lock:
+            frame = self._frames.get(key)
+            if frame is not None:
+                self._frames.move_to_end(key)
+                self.hits += 1
+                return frame
+        frame = encoding.encode(content)
+        with self._lock:
+            self.misses += 1
+            self._frames[key] = frame
+            self._frames.move_to_end(key)
+            while len(self._frames) > self.maxsize:
+                self._frames.popitem(last=False)
+        return frame
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+frames = EncodedFrames(maxsize=getattr(settings, 'REALTIME_FRAME_CACHE_SIZE', 1024))
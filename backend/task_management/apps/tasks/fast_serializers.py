@@ -0,0 +1,103 @@
+from django.conf import settings
+from rest_framework import serializers
+
+from .models import TaskRoleAssignment
+from .serializers import TaskSerializer
+
+ASSIGNMENT_FIELD = 'current_assignment'
+
+
+def fast_read_path_enabled():
+    return getattr(settings, 'TASK_FAST_READ_PATH', True)
+
+
+class TaskValuesSerializer:
+    """
+    Read-only fast path producing exactly what `TaskSerializer` would, from
+    `values()` rows instead of model instances.
+
+    Each output field is compiled once into a `(name, values path, to_representation)`
+    triple taken from the bound `TaskSerializer` field, so formatting stays
+    identical. The owner username/email come from the same query through a
+    join, and `current_assignment` is resolved for the whole page with one
+    extra query.
+    """
+
+    def __init__(self, fields=None, user=None):
+        declared = TaskSerializer().fields
+        self.user = user if user is not None and user.is_authenticated else None
+        self.include_assignment = False
+        self.accessors = []
+        for name, field in declared.items():
+            if fields is not None and name not in fields:
+                continue
+            if field.write_only:
+                continue
+            if name == ASSIGNMENT_FIELD:
+                self.include_assignment = True
+                self.accessors.append((name, None, None))
+                continue
+            path = '__'.join(field.source_attrs)
+            if isinstance(field, serializers.RelatedField):
+                # `values()` already yields the primary key the field would render.
+                convert = None
+            else:
+                convert = field.to_representation
+            self.accessors.append((name, path, convert))
+        self.paths = ['id'] + [
+            path for _, path, _ in self.accessors if path is not None and path != 'id'
+        ]
+
+    def values_queryset(self, queryset):
+        """
+        Turn a task queryset into the `values()` queryset this serializer
+        reads. Ordering keys are selected as well so keyset pagination can
+        build cursors from the rows.
+        """
+        paths = list(self.paths)
+        for term in queryset.query.order_by:
+            if isinstance(term, str):
+                name = term.lstrip('-')
+                if name not in paths:
+                    paths.append(name)
+        return queryset.prefetch_related(None).values(*paths)
+
+    def to_representation(self, rows):
+        rows = list(rows)
+        assignments = self._load_assignments(rows) if self.include_assignment else {}
+        accessors = self.accessors
+        data = []
+        for row in rows:
+            item = {}
+            for name, path, convert in accessors:
+                if path is None:
+                    item[name] = assignments.get(row['id'])
+                    continue
+                value = row[path]
+                if value is None or convert is None:
+                    item[name] = value
+                else:
+                    item[name] = convert(value)
+            data.append(item)
+        return data
+
+    def serialize_queryset(self, queryset):
+        return self.to_representation(self.values_queryset(queryset))
+
+    def _load_assignments(self, rows):
+        if self.user is None or not rows:
+            return {}
+        assignments = TaskRoleAssignment.objects.filter(
+            user=self.user,
+            is_active=True,
+            task_id__in=[row['id'] for row in rows],
+        ).order_by().values('task_id', 'id', 'assigned_role', 'submission_deadline', 'feedback_notes')
+        return {
+            assignment['task_id']: {
+                'id': assignment['id'],
+                'assigned_role': assignment['assigned_role'],
+                'submission_deadline': assignment['submission_deadline'],
+                'feedback_notes': assignment['feedback_notes'],
+            }
+            for assignment in assignments
+        }
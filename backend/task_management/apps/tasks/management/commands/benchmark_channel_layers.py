@@ -0,0 +1,66 @@
+import asyncio
+import os
+import tempfile
+import time
+
+from channels.layers import InMemoryChannelLayer
+from django.core.management.base import BaseCommand
+
+from task_management.channel_layers import SQLiteChannelLayer
+
+
+class Command(BaseCommand):
+    help = (
+        'Measure group_send throughput of the in-memory layer and the SQLite '
+        'layer, both within one process and between two layer instances that '
+        'stand in for separate worker processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=5000)
+        parser.add_argument('--groups', type=int, default=20)
+
+    def handle(self, *args, **options):
+        count, groups = options['messages'], options['groups']
+        self.stdout.write(f'messages: {count}, groups: {groups}')
+        results = [('InMemoryChannelLayer', asyncio.run(self.measure(
+            lambda: InMemoryChannelLayer(capacity=count), count, groups, remote=False
+        )))]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'channels.sqlite3')
+            results.append(('SQLiteChannelLayer (same process)', asyncio.run(self.measure(
+                lambda: SQLiteChannelLayer(path=path, capacity=count), count, groups, remote=False
+            ))))
+            results.append(('SQLiteChannelLayer (cross process)', asyncio.run(self.measure(
+                lambda: SQLiteChannelLayer(path=path, capacity=count), count, groups, remote=True
+            ))))
+        for name, elapsed in results:
+            self.stdout.write(f'{name + ":":37} {count / elapsed:10.0f} msg/s ({elapsed * 1000:.1f} ms)')
+
+    async def measure(self, make_layer, count, groups, remote):
+        receiver = make_layer()
+        sender = make_layer() if remote else receiver
+        channels = []
+        for index in range(groups):
+            channel = await receiver.new_channel()
+            await receiver.group_add(f'benchmark_{index}', channel)
+            channels.append(channel)
+        per_group = count // groups
+
+        async def drain(channel):
+            for _ in range(per_group):
+                await receiver.receive(channel)
+
+        started = time.perf_counter()
+        consumers = asyncio.gather(*(drain(channel) for channel in channels))
+        for sequence in range(per_group):
+            for index in range(groups):
+                await sender.group_send(f'benchmark_{index}', {'type': 'task_event', 'seq': sequence})
+        await consumers
+        elapsed = time.perf_counter() - started
+
+        await receiver.flush()
+        for layer in {id(receiver): receiver, id(sender): sender}.values():
+            if hasattr(layer, 'close'):
+                await layer.close()
+        return elapsed
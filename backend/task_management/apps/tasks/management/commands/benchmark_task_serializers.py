@@ -0,0 +1,78 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from apps.tasks.fast_serializers import TaskValuesSerializer
+from apps.tasks.models import Task
+from apps.tasks.renderers import UJSONRenderer
+from apps.tasks.serializers import TaskSerializer
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare TaskSerializer with the values() fast path on generated tasks. '
+        'Everything runs in a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options['tasks'], options['repeat'])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def run(self, count, repeat):
+        owner = User.objects.create_user(username='benchmark-task-serializers')
+        Task.objects.bulk_create(
+            Task(
+                title=f'Benchmark task {index}',
+                description=f'Generated description {index}',
+                owner=owner,
+                position=index + 1,
+            )
+            for index in range(count)
+        )
+        request = RequestFactory().get('/api/tasks/')
+        request.user = owner
+        queryset = Task.objects.filter(owner=owner).order_by('-position', '-created_at')
+        renderer = UJSONRenderer()
+
+        def slow():
+            tasks = queryset.select_related('owner').with_current_assignment(owner)
+            data = TaskSerializer(tasks, many=True, context={'request': request}).data
+            return renderer.render(data)
+
+        def fast():
+            data = TaskValuesSerializer(user=owner).serialize_queryset(queryset)
+            return renderer.render(data)
+
+        slow_time, slow_body = self.measure(slow, repeat)
+        fast_time, fast_body = self.measure(fast, repeat)
+        if slow_body != fast_body:
+            self.stderr.write(self.style.ERROR('Outputs differ between the two paths.'))
+
+        self.stdout.write(f'tasks: {count}, best of {repeat}')
+        self.stdout.write(f'TaskSerializer:       {slow_time * 1000:.1f} ms')
+        self.stdout.write(f'TaskValuesSerializer: {fast_time * 1000:.1f} ms')
+        self.stdout.write(self.style.SUCCESS(f'speedup: {slow_time / fast_time:.2f}x'))
+
+    def measure(self, func, repeat):
+        best, body = None, None
+        for _ in range(max(repeat, 1)):
+            started = time.perf_counter()
+            body = func()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, body
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.tasks.visibility import find_visibility_drift
+
+
+class Command(BaseCommand):
+    help = 'Report rows missing from or stale in the task visibility index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        missing, extra = find_visibility_drift(chunk_size=options['chunk_size'])
+        for user_id, task_id in sorted(missing):
+            self.stdout.write(f'missing: user={user_id} task={task_id}')
+        for user_id, task_id in sorted(extra):
+            self.stdout.write(f'stale: user={user_id} task={task_id}')
+        if missing or extra:
+            raise CommandError(
+                f'Task visibility drift: {len(missing)} missing, {len(extra)} stale. '
+                'Run rebuild_task_visibility to repair.'
+            )
+        self.stdout.write(self.style.SUCCESS('Task visibility index is consistent.'))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from apps.tasks.search import install_search_index
+
+
+class Command(BaseCommand):
+    help = 'Install (if missing) and rebuild the full-text search index for tasks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        install_search_index(connection)
+        self.stdout.write(self.style.SUCCESS(
+            f'Task search index rebuilt for {connection.vendor}.'
+        ))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.tasks.visibility import rebuild_visibility
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the task visibility index from task owners and active role assignments.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        added, removed = rebuild_visibility(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Task visibility rebuilt: {added} rows added, {removed} rows removed.'
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from apps.tasks.counters import recount
+
+
+class Command(BaseCommand):
+    help = 'Recount per-user task counters from the tasks table and repair any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='user_ids',
+                            help='Only recount this user id (repeatable).')
+
+    def handle(self, *args, **options):
+        drift = recount(user_ids=options['user_ids'])
+        for user_id, (stored, actual) in sorted(drift.items()):
+            self.stdout.write(f'repaired: user={user_id} stored={stored} actual={actual}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Task counters recounted: {len(drift)} users repaired.'
+        ))
@@ -0,0 +1,83 @@
+import threading
+
+from .models import TaskVisibility
+
+
+def task_group(task_id):
+    return f'task_{task_id}'
+
+
+def load_shared_task_ids(user_id):
+    """Tasks `user_id` can see through a role assignment rather than ownership."""
+    return frozenset(
+        TaskVisibility.objects.filter(user_id=user_id)
+        .exclude(task__owner_id=user_id)
+        .values_list('task_id', flat=True)
+    )
+
+
+class MembershipCache:
+    """
+    Per-process map of user id to the tasks shared with them, i.e. the task
+    groups their sockets join.
+
+    Entries live while the user has a socket open in this process, so every
+    invalidation (a `task_memberships` message on the user's group, carrying
+    a new generation) reaches a consumer here. All sockets of a user share
+    one entry and the first to see a generation reloads it for the others.
+    """
+
+    def __init__(self, load=load_shared_task_ids):
+        self.load = load
+        self._lock = threading.Lock()
+        # user_id -> [open sockets, generation, task ids]
+        self._entries = {}
+
+    def __contains__(self, user_id):
+        return user_id in self._entries
+
+    def connect(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry[0] += 1
+                return entry[2]
+        task_ids = self.load(user_id)
+        with self._lock:
+            entry = self._entries.setdefault(user_id, [0, None, task_ids])
+            entry[0] += 1
+            return entry[2]
+
+    def disconnect(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry[0] -= 1
+                if entry[0] <= 0:
+                    del self._entries[user_id]
+
+    def refresh(self, user_id, generation):
+        """Task ids as of `generation`, reloaded once per generation."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[1] == generation:
+                return entry[2]
+        task_ids = self.load(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry[1], entry[2] = generation, task_ids
+        return task_ids
+
+    def discard(self, user_id, task_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                entry[2] = entry[2] - {task_id}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+memberships = MembershipCache()
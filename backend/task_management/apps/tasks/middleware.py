@@ -0,0 +1,15 @@
+from .realtime import collect
+
+
+class RealtimeDispatchMiddleware:
+    """
+    Collect realtime events for the whole request and publish them, merged,
+    once the response is ready.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with collect():
+            return self.get_response(request)
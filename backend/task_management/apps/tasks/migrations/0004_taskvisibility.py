@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def seed_visibility(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskRoleAssignment = apps.get_model('tasks', 'TaskRoleAssignment')
+    TaskVisibility = apps.get_model('tasks', 'TaskVisibility')
+    pairs = set(Task.objects.values_list('owner_id', 'id'))
+    pairs.update(
+        TaskRoleAssignment.objects.filter(is_active=True).values_list('user_id', 'task_id')
+    )
+    TaskVisibility.objects.bulk_create(
+        [TaskVisibility(user_id=user_id, task_id=task_id) for user_id, task_id in pairs],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0003_taskroleassignment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskVisibility',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visibility', to='tasks.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='visible_tasks', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'task')},
+            },
+        ),
+        migrations.RunPython(seed_visibility, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,96 @@
+from django.db import migrations
+
+# The DDL is frozen here rather than imported from apps.tasks.search, so
+# later changes to that module cannot alter this migration.
+
+POSTGRES_INSTALL = [
+    'ALTER TABLE "tasks_task" ADD COLUMN IF NOT EXISTS "search_vector" tsvector',
+    """
+    CREATE OR REPLACE FUNCTION tasks_task_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('pg_catalog.english', coalesce(NEW.description, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    'DROP TRIGGER IF EXISTS tasks_task_search_vector_trigger ON "tasks_task"',
+    """
+    CREATE TRIGGER tasks_task_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, description ON "tasks_task"
+    FOR EACH ROW EXECUTE FUNCTION tasks_task_search_vector_update()
+    """,
+    """
+    UPDATE "tasks_task" SET "search_vector" =
+        setweight(to_tsvector('pg_catalog.english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('pg_catalog.english', coalesce(description, '')), 'B')
+    """,
+    'CREATE INDEX IF NOT EXISTS tasks_task_search_vector_gin ON "tasks_task" USING GIN ("search_vector")',
+]
+
+POSTGRES_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS tasks_task_search_vector_trigger ON "tasks_task"',
+    'DROP FUNCTION IF EXISTS tasks_task_search_vector_update()',
+    'ALTER TABLE "tasks_task" DROP COLUMN IF EXISTS "search_vector"',
+]
+
+SQLITE_INSTALL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS "tasks_task_fts" USING fts5(
+        title, description, content='tasks_task', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_ai AFTER INSERT ON "tasks_task" BEGIN
+        INSERT INTO "tasks_task_fts"(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_ad AFTER DELETE ON "tasks_task" BEGIN
+        INSERT INTO "tasks_task_fts"("tasks_task_fts", rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_task_fts_au AFTER UPDATE OF title, description ON "tasks_task" BEGIN
+        INSERT INTO "tasks_task_fts"("tasks_task_fts", rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO "tasks_task_fts"(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """INSERT INTO "tasks_task_fts"("tasks_task_fts") VALUES ('rebuild')""",
+]
+
+SQLITE_UNINSTALL = [
+    'DROP TRIGGER IF EXISTS tasks_task_fts_ai',
+    'DROP TRIGGER IF EXISTS tasks_task_fts_ad',
+    'DROP TRIGGER IF EXISTS tasks_task_fts_au',
+    'DROP TABLE IF EXISTS "tasks_task_fts"',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement, params=None)
+
+
+def install(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_INSTALL, 'sqlite': SQLITE_INSTALL})
+
+
+def uninstall(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_UNINSTALL, 'sqlite': SQLITE_UNINSTALL})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0004_taskvisibility'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
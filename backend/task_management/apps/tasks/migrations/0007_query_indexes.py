@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:15
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_dataversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_task_owner_i_593016_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='tasks_task_positio_83eca2_idx',
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', '-position', '-created_at'], name='tasks_task_owner_i_10132e_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-position', '-created_at'], name='tasks_task_positio_2cf594_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskroleassignment',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['user', 'task'], name='tasks_role_active_user_idx'),
+        ),
+    ]
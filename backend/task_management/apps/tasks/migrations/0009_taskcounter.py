@@ -0,0 +1,27 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_taskpositioncounter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_tasks', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('pending', models.IntegerField(default=0)),
+                ('high_priority', models.IntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='task_counter', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
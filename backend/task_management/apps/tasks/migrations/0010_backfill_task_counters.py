@@ -0,0 +1,38 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+
+def backfill_counters(apps, schema_editor):
+    Task = apps.get_model('tasks', 'Task')
+    TaskCounter = apps.get_model('tasks', 'TaskCounter')
+    rows = Task.objects.order_by().values('owner_id').annotate(
+        total_tasks=Count('id'),
+        completed=Count('id', filter=Q(status='Completed')),
+        pending=Count('id', filter=Q(status='Pending')),
+        high_priority=Count('id', filter=Q(priority='High')),
+    )
+    TaskCounter.objects.bulk_create(
+        [
+            TaskCounter(
+                user_id=row['owner_id'],
+                total_tasks=row['total_tasks'],
+                completed=row['completed'],
+                pending=row['pending'],
+                high_priority=row['high_priority'],
+            )
+            for row in rows
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_taskcounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
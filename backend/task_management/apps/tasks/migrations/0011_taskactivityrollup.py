@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_backfill_task_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskActivityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('created', models.IntegerField(default=0)),
+                ('completed', models.IntegerField(default=0)),
+                ('reopened', models.IntegerField(default=0)),
+                ('deleted', models.IntegerField(default=0)),
+                ('created_high', models.IntegerField(default=0)),
+                ('created_medium', models.IntegerField(default=0)),
+                ('created_low', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='task_activity_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='tasks_rollup_user_day_uniq'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('day',), name='tasks_rollup_global_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0011_taskactivityrollup'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskpositioncounter',
+            name='board_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0012_taskpositioncounter_board_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskpositioncounter',
+            name='event_sequence',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
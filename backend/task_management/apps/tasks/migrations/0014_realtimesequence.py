@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_sequences(apps, schema_editor):
+    TaskPositionCounter = apps.get_model('tasks', 'TaskPositionCounter')
+    RealtimeSequence = apps.get_model('tasks', 'RealtimeSequence')
+    RealtimeSequence.objects.bulk_create(
+        [
+            RealtimeSequence(user_id=user_id, last_seq=last_seq)
+            for user_id, last_seq in TaskPositionCounter.objects.filter(event_sequence__gt=0).values_list(
+                'user_id', 'event_sequence'
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0013_taskpositioncounter_event_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RealtimeSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last_seq', models.BigIntegerField(default=0)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='realtime_sequence', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.RunPython(copy_sequences, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='taskpositioncounter',
+            name='event_sequence',
+        ),
+    ]
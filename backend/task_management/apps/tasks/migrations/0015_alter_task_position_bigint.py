@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 06:22
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# Positions grow by RANK_GAP on every create and move to the top, so 32 bits
+# run out after about two million of those per user.
+#
+# SQLite widens the column by rebuilding tasks_task, which drops the FTS
+# triggers; they are put back from the DDL frozen in 0005 after the rebuild
+# either way.
+search_index = import_module('apps.tasks.migrations.0005_task_search_index')
+
+
+def reinstall_sqlite_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        search_index.install(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0014_realtimesequence'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, reinstall_sqlite_fts),
+        migrations.AlterField(
+            model_name='task',
+            name='position',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.RunPython(reinstall_sqlite_fts, migrations.RunPython.noop),
+    ]
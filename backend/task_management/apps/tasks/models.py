@@ -1,8 +1,28 @@
 from django.db import models
 from django.contrib.auth.models import User
 
+from .tracking import ChangeTrackingMixin
 
-class Task(models.Model):
+
+class TaskQuerySet(models.QuerySet):
+    def with_current_assignment(self, user):
+        """
+        Prefetch the given user's active role assignment for every task in one
+        query. `TaskSerializer.get_current_assignment` reads it from
+        `current_assignments` instead of querying per row.
+        """
+        if not user or not user.is_authenticated:
+            return self
+        return self.prefetch_related(
+            models.Prefetch(
+                'role_assignments',
+                queryset=TaskRoleAssignment.objects.filter(user=user, is_active=True).order_by(),
+                to_attr='current_assignments',
+            )
+        )
+
+
+class Task(ChangeTrackingMixin, models.Model):
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
         ('Completed', 'Completed'),
@@ -21,23 +41,26 @@ class Task(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
-    position = models.PositiveIntegerField(default=0)
+    position = models.PositiveBigIntegerField(default=0)
+
+    objects = TaskQuerySet.as_manager()
     
     class Meta:
         ordering = ['-position', '-created_at']
         indexes = [
             models.Index(fields=['status']),
             models.Index(fields=['priority']),
-            models.Index(fields=['owner']),
+            # "My tasks" in board order; also serves plain owner lookups.
+            models.Index(fields=['owner', '-position', '-created_at']),
             models.Index(fields=['-created_at']),
-            models.Index(fields=['-position']),
+            models.Index(fields=['-position', '-created_at']),
         ]
     
     def __str__(self):
         return f"{self.title} - {self.owner.username}"
 
 
-class TaskRoleAssignment(models.Model):
+class TaskRoleAssignment(ChangeTrackingMixin, models.Model):
     ROLE_MEMBER = 'Member'
     ROLE_REVIEWER = 'Reviewer'
     ROLE_CONTRIBUTOR = 'Contributor'
@@ -73,6 +96,14 @@ class TaskRoleAssignment(models.Model):
     class Meta:
         unique_together = ('task', 'user')
         ordering = ['-created_at']
+        indexes = [
+            # Only active assignments are ever looked up by user.
+            models.Index(
+                fields=['user', 'task'],
+                condition=models.Q(is_active=True),
+                name='tasks_role_active_user_idx',
+            ),
+        ]
         permissions = [
             (
                 'task_manage',
@@ -81,4 +112,141 @@ class TaskRoleAssignment(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.task_id}:{self.user.username} -> {self.assigned_role}"
\ No newline at end of file
+        return f"{self.task_id}:{self.user.username} -> {self.assigned_role}"
+
+
+class TaskVisibility(models.Model):
+    """
+    Denormalized index of which users can see which tasks: the owner plus
+    every user holding an active role assignment. Maintained by the task and
+    role assignment signals so "tasks visible to me" is a single indexed
+    lookup instead of an OR-join with DISTINCT.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='visible_tasks'
+    )
+    task = models.ForeignKey(
+        Task,
+        on_delete=models.CASCADE,
+        related_name='visibility'
+    )
+
+    class Meta:
+        unique_together = ('user', 'task')
+
+    def __str__(self):
+        return f"{self.user_id} -> {self.task_id}"
+
+
+class DataVersion(models.Model):
+    """
+    Monotonic change counter per data scope ("user:<id>" or "global"). The
+    task signals bump it on every write that changes what a scope can see;
+    conditional GETs derive their ETags from it.
+    """
+
+    scope = models.CharField(max_length=64, unique=True)
+    version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.scope}@{self.version}"
+
+
+class TaskPositionCounter(models.Model):
+    """
+    Highest position handed out on each user's board. New tasks take their
+    position from here in one atomic UPDATE instead of reading MAX(position);
+    see `ranking.reserve_positions`. `board_version` counts the reorder
+    deltas sent to the user's clients, so they can spot a missed one.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='task_position_counter'
+    )
+    last_position = models.BigIntegerField(default=0)
+    board_version = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.last_position}"
+
+
+class RealtimeSequence(models.Model):
+    """
+    Last number handed to a realtime event for each user, shared by every
+    process. The dispatcher reserves a block per user and flush in one
+    autocommitted UPDATE; see `replay.reserve_sequences`. Kept apart from
+    the position counter, which request transactions hold locked.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='realtime_sequence'
+    )
+    last_seq = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.last_seq}"
+
+
+class TaskCounter(models.Model):
+    """
+    Per-user task summary kept up to date by the task signals and bulk
+    writers with `F()` deltas, so reading it is a single-row lookup. See
+    `counters.py`; the `recount_task_counters` command repairs drift.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='task_counter'
+    )
+    total_tasks = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    pending = models.IntegerField(default=0)
+    high_priority = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user_id}: {self.total_tasks} tasks"
+
+
+class TaskActivityRollup(models.Model):
+    """
+    Daily task activity per owner, plus one global row per day with no
+    user. Built from audit rows as they are written (see `rollups.py`), so
+    trends never have to scan the audit log.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='task_activity_rollups'
+    )
+    day = models.DateField()
+    created = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+    reopened = models.IntegerField(default=0)
+    deleted = models.IntegerField(default=0)
+    created_high = models.IntegerField(default=0)
+    created_medium = models.IntegerField(default=0)
+    created_low = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'day'], name='tasks_rollup_user_day_uniq'),
+            models.UniqueConstraint(
+                fields=['day'],
+                condition=models.Q(user__isnull=True),
+                name='tasks_rollup_global_day_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id or 'all'} {self.day}: {self.created} created"
@@ -0,0 +1,66 @@
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+
+class CommitBuffers:
+    """
+    Per-thread buffers that hold items back until the transaction they were
+    produced in commits.
+
+    Each savepoint gets its own buffer, so rolling one back drops only its
+    own items. `new_buffer()` makes an empty buffer, `flush(buffer)` runs
+    once it commits and `discard(buffer)`, if given, is told about buffers
+    thrown away with a rolled back transaction.
+    """
+
+    def __init__(self, new_buffer, flush, discard=None):
+        self.new_buffer = new_buffer
+        self.flush = flush
+        self.discard = discard
+        self._local = threading.local()
+
+    def _buffers(self):
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            buffers = self._local.buffers = {}
+        return buffers
+
+    def get(self, using=DEFAULT_DB_ALIAS):
+        """The buffer for the current savepoint, or None outside a transaction."""
+        connection = transaction.get_connection(using)
+        if not connection.in_atomic_block:
+            return None
+        buffers = self._buffers()
+        # Blocks opened with savepoint=False show up as None and share the
+        # enclosing buffer.
+        key = (using, frozenset(sid for sid in connection.savepoint_ids if sid))
+        pending = buffers.get(key)
+        # A buffer whose hook is gone belongs to a transaction that rolled back.
+        scheduled = {id(func) for _, func, _ in connection.run_on_commit}
+        if pending is None or id(pending) not in scheduled:
+            stale_keys = [
+                k for k, hook in buffers.items() if k[0] == using and id(hook) not in scheduled
+            ]
+            for stale in stale_keys:
+                stale_hook = buffers.pop(stale)
+                if self.discard is not None:
+                    self.discard(stale_hook.buffer)
+            pending = buffers[key] = _Pending(self, key)
+            transaction.on_commit(pending, using=using)
+        return pending.buffer
+
+
+class _Pending:
+    """The on-commit hook of one buffer."""
+
+    def __init__(self, owner, key):
+        self.owner = owner
+        self.key = key
+        self.buffer = owner.new_buffer()
+
+    def __call__(self):
+        buffers = self.owner._buffers()
+        if buffers.get(self.key) is self:
+            del buffers[self.key]
+        self.owner.flush(self.buffer)
@@ -0,0 +1,95 @@
+import asyncio
+import time
+import weakref
+
+from django.conf import settings
+
+from .realtime import Event, EventBuffer
+from .stats import Counters
+
+RESYNC_EVENT = 'resync_required'
+
+
+class OutboundStats(Counters):
+    """Process-wide counters for the per-connection outbound queues."""
+
+    fields = ('queued', 'merged', 'dropped', 'sent', 'overflows', 'slow_disconnects', 'gaps', 'max_depth')
+
+    def __init__(self):
+        self._queues = weakref.WeakSet()
+        super().__init__()
+
+    def track(self, queue):
+        with self._lock:
+            self._queues.add(queue)
+
+    def observe_depth(self, depth):
+        with self._lock:
+            self.max_depth = max(self.max_depth, depth)
+
+    def snapshot(self):
+        with self._lock:
+            depths = [len(queue) for queue in list(self._queues)]
+        return {'sockets': len(depths), 'depth': sum(depths), **super().snapshot()}
+
+
+stats = OutboundStats()
+
+
+class OutboundQueue:
+    """
+    Events waiting to be written to one socket.
+
+    Pending events are merged like the dispatcher's (latest summary only,
+    task events by id, consecutive reorder deltas). Past `limit` the client
+    is too far behind: the backlog is dropped for a single `resync_required`.
+    A client that has not finished a write for `slow_timeout` seconds while
+    events wait is stalled, and the consumer disconnects it.
+    """
+
+    def __init__(self, limit=None, slow_timeout=None):
+        if limit is None:
+            limit = getattr(settings, 'REALTIME_CONNECTION_QUEUE_SIZE', 100)
+        if slow_timeout is None:
+            slow_timeout = getattr(settings, 'REALTIME_SLOW_CLIENT_TIMEOUT', 10)
+        self.limit = limit
+        self.slow_timeout = slow_timeout
+        self.buffer = EventBuffer(counters=stats)
+        self.ready = asyncio.Event()
+        # When the client last caught up, or None while nothing is owed.
+        self.waiting_since = None
+        stats.track(self)
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def put(self, event):
+        stats.incr('queued')
+        if self.waiting_since is None:
+            self.waiting_since = time.monotonic()
+        self.buffer.add(event)
+        if len(self.buffer) > self.limit:
+            dropped = self.buffer.pop_all()
+            stats.incr('overflows')
+            stats.incr('dropped', len(dropped))
+            seqs = [item.seq for item in dropped if item.seq is not None]
+            self.buffer.add(Event(event.user_id, RESYNC_EVENT, {'seq': max(seqs, default=None)}))
+        stats.observe_depth(len(self.buffer))
+        self.ready.set()
+
+    def stalled(self):
+        return (
+            self.waiting_since is not None
+            and time.monotonic() - self.waiting_since > self.slow_timeout
+        )
+
+    async def get(self):
+        """Wait until something is queued, then take everything."""
+        await self.ready.wait()
+        self.ready.clear()
+        return self.buffer.pop_all()
+
+    def written(self, count):
+        """Record that a batch from `get()` reached the socket."""
+        stats.incr('sent', count)
+        self.waiting_since = time.monotonic() if len(self.buffer) else None
@@ -0,0 +1,100 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from .models import Task, TaskCounter
+
+SNAPSHOT_KEY = 'tasks:admin-overview'
+LOCK_KEY = 'tasks:admin-overview:lock'
+TOP_USERS = 5
+
+
+def refresh_interval():
+    return getattr(settings, 'TASK_OVERVIEW_REFRESH_INTERVAL', 60)
+
+
+def compute_overview():
+    """
+    Totals and breakdowns in one conditional aggregate over the tasks table;
+    top users come from the per-user counters.
+    """
+    counts = Task.objects.order_by().aggregate(
+        total_tasks=Count('id'),
+        completed=Count('id', filter=Q(status='Completed')),
+        pending=Count('id', filter=Q(status='Pending')),
+        high=Count('id', filter=Q(priority='High')),
+        medium=Count('id', filter=Q(priority='Medium')),
+        low=Count('id', filter=Q(priority='Low')),
+    )
+    top_users = (
+        TaskCounter.objects.filter(total_tasks__gt=0)
+        .order_by('-total_tasks', 'user_id')
+        .values('user__username', 'total_tasks', 'completed', 'high_priority')[:TOP_USERS]
+    )
+    return {
+        'totals': {
+            'total_tasks': counts['total_tasks'],
+            'completed': counts['completed'],
+            'pending': counts['pending'],
+            'high_priority': counts['high'],
+        },
+        'priority_breakdown': {
+            'high': counts['high'],
+            'medium': counts['medium'],
+            'low': counts['low'],
+        },
+        'status_breakdown': {
+            'completed': counts['completed'],
+            'pending': counts['pending'],
+        },
+        'top_users': [
+            {
+                'username': row['user__username'],
+                'total': row['total_tasks'],
+                'completed': row['completed'],
+                'high_priority': row['high_priority'],
+            } for row in top_users
+        ],
+    }
+
+
+def refresh_snapshot():
+    snapshot = {'generated_at': time.time(), 'data': compute_overview()}
+    # Kept well past the refresh interval so a slow refresh serves stale data
+    # instead of making every admin recompute at once.
+    cache.set(SNAPSHOT_KEY, snapshot, timeout=max(refresh_interval() * 10, 600))
+    return snapshot
+
+
+def get_snapshot(force=False):
+    """
+    The cached overview, recomputed when older than the refresh interval.
+    Only one caller refreshes an expired snapshot; the others keep serving
+    the previous one until it lands.
+    """
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None or force:
+        return refresh_snapshot()
+    if time.time() - snapshot['generated_at'] >= refresh_interval():
+        if cache.add(LOCK_KEY, True, timeout=30):
+            try:
+                return refresh_snapshot()
+            finally:
+                cache.delete(LOCK_KEY)
+    return snapshot
+
+
+def clear_snapshot():
+    cache.delete(SNAPSHOT_KEY)
+
+
+def snapshot_meta(snapshot):
+    generated_at = snapshot['generated_at']
+    return {
+        'generated_at': datetime.fromtimestamp(generated_at, tz=dt_timezone.utc).isoformat(),
+        'age_seconds': round(max(time.time() - generated_at, 0.0), 3),
+        'refresh_interval': refresh_interval(),
+    }
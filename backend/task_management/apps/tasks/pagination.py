@@ -0,0 +1,255 @@
+import json
+from base64 import b64decode, b64encode
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination:
+    """
+    Keyset (seek) pagination over the queryset's own ordering.
+
+    The cursor stores the sort key values of the boundary row, so every page
+    is a single indexed range scan no matter how deep the client has paged.
+    `id` is appended as a tie-breaker to keep the ordering total.
+    """
+
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, page_size, page_size_query_param=None, max_page_size=None):
+        self.default_page_size = page_size
+        self.page_size_query_param = page_size_query_param
+        self.max_page_size = max_page_size
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.keys = self.get_ordering_keys(queryset)
+        self.key_fields = [self._resolve_field(queryset, name) for name, _ in self.keys]
+        self.count = self.get_count(queryset, request)
+
+        values, reverse = self.decode_cursor(request)
+        ordering = [self._order_term(name, desc ^ reverse) for name, desc in self.keys]
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek_filter(values, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next = values is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = values is not None
+
+        self.first_row = results[0] if results else None
+        self.last_row = results[-1] if results else None
+        return results
+
+    def get_paginated_response(self, data):
+        payload = {}
+        if self.count is not None:
+            payload['count'] = self.count
+        payload['next'] = self.get_next_link()
+        payload['previous'] = self.get_previous_link()
+        payload['results'] = data
+        return Response(payload)
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param],
+                    strict=True,
+                    cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.default_page_size
+
+    def get_ordering_keys(self, queryset):
+        ordering = list(queryset.query.order_by) or list(queryset.model._meta.ordering)
+        keys = []
+        for term in ordering:
+            if not isinstance(term, str):
+                raise NotFound('Cursor pagination requires field based ordering.')
+            desc = term.startswith('-')
+            name = term.lstrip('-')
+            if name == 'pk':
+                name = 'id'
+            keys.append((name, desc))
+        if not any(name == 'id' for name, _ in keys):
+            keys.append(('id', False))
+        return keys
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param, '').lower()
+        if mode in ('1', 'true', 'exact'):
+            return queryset.count()
+        if mode == 'estimate':
+            return estimate_count(queryset)
+        return None
+
+    def get_next_link(self):
+        if not self.has_next or self.last_row is None:
+            return None
+        return self._link(self.last_row, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if self.first_row is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self._link(self.first_row, reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii')).decode('utf-8'))
+            raw_values = payload['v']
+            reverse = bool(payload.get('r'))
+            if len(raw_values) != len(self.keys):
+                raise ValueError
+            values = [field.to_python(raw) for field, raw in zip(self.key_fields, raw_values)]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return values, reverse
+
+    def encode_cursor(self, values, reverse):
+        payload = {'v': values}
+        if reverse:
+            payload['r'] = 1
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return b64encode(data).decode('ascii')
+
+    def _link(self, row, reverse):
+        values = [self._json_value(self._row_value(row, name)) for name, _ in self.keys]
+        return replace_query_param(
+            self.base_url,
+            self.cursor_query_param,
+            self.encode_cursor(values, reverse)
+        )
+
+    def _seek_filter(self, values, reverse):
+        condition = Q()
+        equal_prefix = Q()
+        for (name, desc), value in zip(self.keys, values):
+            lookup = 'lt' if desc ^ reverse else 'gt'
+            condition |= equal_prefix & Q(**{f'{name}__{lookup}': value})
+            equal_prefix &= Q(**{name: value})
+        return condition
+
+    @staticmethod
+    def _order_term(name, desc):
+        return f'-{name}' if desc else name
+
+    @staticmethod
+    def _resolve_field(queryset, name):
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            return annotation.output_field
+        return queryset.model._meta.get_field(name)
+
+    @staticmethod
+    def _row_value(row, name):
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    @staticmethod
+    def _json_value(value):
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        return value
+
+
+def estimate_count(queryset):
+    """
+    Cheap row estimate taken from the planner on PostgreSQL.
+
+    Other backends have no usable estimate, so they fall back to an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+    sql, params = queryset.order_by().query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class TaskPagination(PageNumberPagination):
+    """
+    Page number pagination by default, keyset pagination on request.
+
+    Clients opt into keyset mode with `?cursor=` (an empty value starts at the
+    first page) or `?paginate=cursor`. In keyset mode `count` is only computed
+    when asked for with `?count=exact` or `?count=estimate`.
+    """
+
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    mode_query_param = 'paginate'
+
+    def __init__(self):
+        self.keyset = None
+
+    def use_keyset(self, request):
+        params = request.query_params
+        return (
+            KeysetPagination.cursor_query_param in params
+            or params.get(self.mode_query_param) == 'cursor'
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_keyset(request):
+            self.keyset = KeysetPagination(
+                self.page_size,
+                page_size_query_param=self.page_size_query_param,
+                max_page_size=self.max_page_size,
+            )
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.extend([
+            {
+                'name': KeysetPagination.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Keyset pagination cursor; switches to cursor mode.',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': KeysetPagination.count_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Cursor mode only: "exact" or "estimate" to include a count.',
+                'schema': {'type': 'string'},
+            },
+        ])
+        return parameters
@@ -12,14 +12,17 @@ class IsTaskOwner(permissions.BasePermission):
     ASSIGNEE_MUTABLE_FIELDS = {'status'}
 
     def has_object_permission(self, request, view, obj):
-        if obj.owner == request.user:
+        if obj.owner_id == request.user.id:
             return True
 
-        is_assignee = TaskRoleAssignment.objects.filter(
-            task=obj,
-            user=request.user,
-            is_active=True
-        ).exists()
+        if hasattr(obj, 'current_assignments'):
+            is_assignee = bool(obj.current_assignments)
+        else:
+            is_assignee = TaskRoleAssignment.objects.filter(
+                task=obj,
+                user=request.user,
+                is_active=True
+            ).exists()
 
         if not is_assignee:
             return False
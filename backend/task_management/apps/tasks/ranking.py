@@ -0,0 +1,165 @@
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.db.models.functions import Greatest
+
+from .models import Task, TaskPositionCounter
+
+# Distance between neighbouring positions after a rebalance. A task can be
+# dropped between two neighbours without renumbering anything as long as
+# their positions differ by at least 2.
+RANK_GAP = 1024
+BOARD_ORDERING = ('-position', '-created_at', '-id')
+
+
+def _advance_counter(user_id, step, column='last_position'):
+    """
+    Add `step` to a column of the user's counter row and return the new
+    value in one statement, or None when the user has no counter row yet.
+    """
+    if connection.vendor in ('postgresql', 'sqlite'):
+        table = connection.ops.quote_name(TaskPositionCounter._meta.db_table)
+        column = connection.ops.quote_name(column)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET {column} = {column} + %s '
+                f'WHERE "user_id" = %s RETURNING {column}',
+                [step, user_id],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    with transaction.atomic():
+        counters = TaskPositionCounter.objects.filter(user_id=user_id)
+        if not counters.update(**{column: F(column) + step}):
+            return None
+        return counters.values_list(column, flat=True).get()
+
+
+def _seed_counter(user_id):
+    """Start a user's counter at their current highest position."""
+    last_position = Task.objects.filter(owner_id=user_id).aggregate(
+        max_pos=Max('position')
+    ).get('max_pos') or 0
+    TaskPositionCounter.objects.bulk_create(
+        [TaskPositionCounter(user_id=user_id, last_position=last_position)],
+        ignore_conflicts=True,
+    )
+
+
+def reserve_positions(user_id, count=1):
+    """
+    Hand out `count` new top-of-board positions for `user_id`, RANK_GAP
+    apart and in ascending order, with one atomic UPDATE. Concurrent callers
+    always get disjoint ranges, so bulk imports can reserve a whole block.
+    """
+    step = count * RANK_GAP
+    last_position = _advance_counter(user_id, step)
+    if last_position is None:
+        _seed_counter(user_id)
+        last_position = _advance_counter(user_id, step)
+    first = last_position - step + RANK_GAP
+    return list(range(first, last_position + 1, RANK_GAP))
+
+
+def bump_board_version(user_id):
+    """
+    Advance the user's board version for one reorder delta and return
+    `(previous, version)`. Called inside the reorder's transaction, so
+    concurrent reorders of one board get consecutive versions.
+    """
+    version = _advance_counter(user_id, 1, column='board_version')
+    if version is None:
+        _seed_counter(user_id)
+        version = _advance_counter(user_id, 1, column='board_version')
+    return version - 1, version
+
+
+def get_board_version(user_id):
+    return TaskPositionCounter.objects.filter(user_id=user_id).values_list(
+        'board_version', flat=True
+    ).first() or 0
+
+
+def raise_counter(user_id, position):
+    """Make sure future reservations land above `position`."""
+    updated = TaskPositionCounter.objects.filter(user_id=user_id).update(
+        last_position=Greatest(F('last_position'), position)
+    )
+    if not updated:
+        _seed_counter(user_id)
+
+
+def _neighbour(task, exclude, above, position):
+    """
+    Closest other task of the owner's board at or above (or at or below)
+    `position`, as an `(id, position)` pair. Ties are included on purpose:
+    an equal position leaves no room and forces a rebalance.
+    """
+    queryset = Task.objects.filter(owner_id=task.owner_id).exclude(pk__in=[task.pk, exclude.pk])
+    if above:
+        queryset = queryset.filter(position__gte=position).order_by('position', 'created_at', 'id')
+    else:
+        queryset = queryset.filter(position__lte=position).order_by(*BOARD_ORDERING)
+    return queryset.values_list('id', 'position').first()
+
+
+def rebalance_positions(owner_id):
+    """
+    Respread the owner's tasks RANK_GAP apart, keeping the current board
+    order, in one `bulk_update`. Returns the ids whose position changed.
+    """
+    tasks = list(
+        Task.objects.filter(owner_id=owner_id).order_by(*BOARD_ORDERING).only('id', 'position')
+    )
+    changed = []
+    for index, task in enumerate(tasks):
+        position = (len(tasks) - index) * RANK_GAP
+        if task.position != position:
+            task.position = position
+            changed.append(task)
+    Task.objects.bulk_update(changed, ['position'], batch_size=500)
+    if tasks:
+        raise_counter(owner_id, len(tasks) * RANK_GAP)
+    return [task.id for task in changed]
+
+
+def place_between(task, after=None, before=None):
+    """
+    Pick a position that shows `task` right after `after` and/or right
+    before `before` (both tasks of the same owner, in board order) and write
+    it with a single-row UPDATE.
+
+    Returns `(position, rebalanced_ids)`; `rebalanced_ids` is empty unless
+    the neighbours had no room left and the board had to be respread first.
+    """
+    rebalanced = []
+    for attempt in range(2):
+        if after is not None:
+            upper = (after.id, after.position)
+        else:
+            upper = _neighbour(task, before, True, before.position)
+        if before is not None:
+            lower = (before.id, before.position)
+        else:
+            lower = _neighbour(task, after, False, after.position)
+
+        lower_position = lower[1] if lower else 0
+        if upper is None:
+            # The top of the board comes from the counter, like new tasks.
+            position = reserve_positions(task.owner_id)[0]
+            break
+        if upper[1] - lower_position >= 2:
+            position = (upper[1] + lower_position) // 2
+            break
+        if attempt:
+            # Freshly spread neighbours always have room unless they are inverted.
+            raise ValueError('`after_id` must come before `before_id` in the board order.')
+
+        rebalanced = rebalance_positions(task.owner_id)
+        for neighbour in (after, before):
+            if neighbour is not None:
+                neighbour.refresh_from_db(fields=['position'])
+
+    Task.objects.filter(pk=task.pk).update(position=position)
+    task.position = position
+    return position, rebalanced
@@ -1,27 +1,390 @@
+import atexit
+import itertools
+import logging
+import queue
+import threading
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
-from django.db.models import Count, Q
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections
 
+from .caching import cache_enabled, get_cached_page, store_page
+from .counters import get_counts
 from .models import Task
+from .oncommit import CommitBuffers
+from .ranking import get_board_version
+from .replay import record, reserve_sequences
 from .serializers import TaskSerializer
+from .stats import Counters
+from .fast_serializers import TaskValuesSerializer
+from .memberships import task_group
+from .versioning import GLOBAL_SCOPE, get_data_version, user_scope
 
+logger = logging.getLogger(__name__)
 
-def _broadcast(user_id, event, data):
-    if not user_id:
-        return
+_local = threading.local()
+
+# Tells a user's sockets to reload the tasks shared with them. Handled by the
+# consumer under its own message type; never numbered or replayed.
+MEMBERSHIPS_EVENT = 'task_memberships'
+# Events that replace any earlier event with the same key for the same user.
+LATEST_WINS_EVENTS = {'task_summary', MEMBERSHIPS_EVENT}
+# Position deltas; consecutive ones for a user are folded into one.
+MOVE_EVENT = 'tasks_reordered'
+# Per-task events, keyed on the task id in their data.
+TASK_EVENTS = {'task_created', 'task_updated', 'task_deleted'}
+# Per-task events also published to the task's group for its collaborators.
+# A new task has none yet.
+SHARED_TASK_EVENTS = {'task_updated', 'task_deleted'}
+
+
+class DispatchStats(Counters):
+    """Process-wide counters for the realtime dispatcher."""
+
+    fields = ('queued', 'merged', 'dropped', 'published')
 
-    channel_layer = get_channel_layer()
-    if not channel_layer:
-        return
 
-    async_to_sync(channel_layer.group_send)(
-        f'user_tasks_{user_id}',
-        {
+stats = DispatchStats()
+
+
+class Event:
+    """
+    One pending group message. `data` may be a callable, evaluated once
+    when the buffer is flushed, so the payload reflects committed state and
+    superseded events never pay for their queries. `event_id` is unique per
+    published event and keys its encoded frames; see `encodings.frames`.
+    An event with a `group` goes to that group only, unnumbered; `user_id`
+    then just names whose request queued it.
+    """
+
+    __slots__ = ('user_id', 'event', 'data', 'seq', 'event_id', 'group')
+
+    def __init__(self, user_id, event, data, seq=None, event_id=None, group=None):
+        self.user_id = user_id
+        self.event = event
+        self.data = data
+        self.seq = seq
+        self.event_id = event_id
+        self.group = group
+
+    def resolve(self):
+        if callable(self.data):
+            self.data = self.data()
+        return self.data
+
+    def message(self):
+        if self.event == MEMBERSHIPS_EVENT:
+            return {'type': MEMBERSHIPS_EVENT, **self.resolve()}
+        message = {
             'type': 'task_event',
-            'event': event,
-            'data': data,
+            'event': self.event,
+            'data': self.resolve(),
         }
+        if self.seq is not None:
+            message['seq'] = self.seq
+        if self.event_id is not None:
+            message['event_id'] = self.event_id
+        return message
+
+
+class EventBuffer:
+    """
+    Ordered set of pending events with redundant ones merged away.
+
+    A summary replaces the previous one for that user, and consecutive
+    reorder deltas combine into one spanning both versions. For a single
+    task, an update after a create stays a create with the newer payload, a
+    delete replaces whatever came before it, and a task created and deleted
+    within the buffer produces no event at all. Anything else is kept as is.
+    A merged event moves to the position of the latest one. Merges are
+    counted on `counters` (the dispatcher's stats by default).
+    """
+
+    def __init__(self, counters=None):
+        self.events = {}
+        self._serial = 0
+        self.counters = counters or stats
+
+    def __len__(self):
+        return len(self.events)
+
+    def _key(self, event):
+        if event.group is not None:
+            # Only per-task updates and deletes are sent this way.
+            return ('group', event.group)
+        if event.event in LATEST_WINS_EVENTS or event.event == MOVE_EVENT:
+            return (event.event, event.user_id)
+        if event.event in TASK_EVENTS and isinstance(event.data, dict) and 'id' in event.data:
+            return ('task', event.user_id, event.data['id'])
+        return self._serial_key()
+
+    def _serial_key(self):
+        self._serial += 1
+        return ('event', self._serial)
+
+    def add(self, event):
+        key = self._key(event)
+        previous = self.events.pop(key, None)
+        if previous is not None and event.event == MOVE_EVENT:
+            merged = merge_moves(previous.data, event.data)
+            if merged is None:
+                # Not consecutive (another worker sent the versions between):
+                # send both so clients still see the gap and resync.
+                self.events[self._serial_key()] = previous
+            else:
+                self.counters.incr('merged')
+                event.data = merged
+                # No longer the published event; its frames do not apply.
+                event.event_id = None
+        elif previous is not None:
+            self.counters.incr('merged')
+            if previous.event == 'task_created':
+                if event.event == 'task_deleted':
+                    self.counters.incr('merged')
+                    return
+                event.event = 'task_created'
+                event.event_id = None
+        self.events[key] = event
+
+    def extend(self, events):
+        for event in events:
+            self.add(event)
+
+    def pop_all(self):
+        events = list(self.events.values())
+        self.events.clear()
+        return events
+
+
+def merge_moves(older, newer):
+    """
+    One delta covering `older` then `newer`, or None when `newer` does not
+    pick up at the version `older` ended on.
+    """
+    if older['version'] != newer['previous_version']:
+        return None
+    moved = {row['id']: row for row in older['moved']}
+    moved.update((row['id'], row) for row in newer['moved'])
+    return {
+        'previous_version': older['previous_version'],
+        'version': newer['version'],
+        'moved': list(moved.values()),
+    }
+
+
+class RealtimeDispatcher:
+    """
+    Publishes events to the channel layer from a background thread.
+
+    The queue is bounded; when it is full the batch is dropped and counted,
+    since clients resynchronise on the next event anyway. Batches that pile
+    up while the thread is busy are merged before they are sent.
+    """
+
+    def __init__(self, send=None, maxsize=1000):
+        self.send = send
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._stopped = object()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='realtime-dispatcher', daemon=True)
+                self._thread.start()
+
+    def submit(self, events):
+        if not events:
+            return
+        self.start()
+        try:
+            self.queue.put_nowait(events)
+        except queue.Full:
+            stats.incr('dropped', len(events))
+            logger.warning('Realtime queue is full; dropped %d events.', len(events))
+
+    def flush(self):
+        """Block until everything submitted so far has been published."""
+        if self._thread is not None and self._thread.is_alive():
+            self.queue.join()
+
+    def shutdown(self, timeout=5):
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self.queue.put(self._stopped)
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            batches = [self.queue.get()]
+            while True:
+                try:
+                    batches.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(batch is self._stopped for batch in batches)
+            buffer = EventBuffer()
+            for batch in batches:
+                if batch is not self._stopped:
+                    buffer.extend(batch)
+            try:
+                publish(buffer.pop_all(), send=self.send)
+            finally:
+                # Numbering the events writes to the database.
+                close_old_connections()
+                for _ in batches:
+                    self.queue.task_done()
+            if stop:
+                return
+
+
+def _group_send(user_id, message):
+    return _send_to_group(f'user_tasks_{user_id}', message)
+
+
+def _send_to_group(group, message):
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return False
+    async_to_sync(channel_layer.group_send)(group, message)
+    return True
+
+
+def publish(events, send=None):
+    """
+    Send resolved events now, on the calling thread. Each one is numbered
+    and kept for replay first, so reconnecting clients can catch up; the
+    numbers are reserved per user for the whole batch at once. Events for
+    users that no longer exist are dropped. Membership changes are only
+    for the consumers and go out as they are.
+
+    Updates and deletes also go once to the task's group, where sockets of
+    users the task is shared with listen. The sequence belongs to the owner,
+    so that copy goes without it. Both copies carry the same new `event_id`.
+    """
+    send = send or _group_send
+    counts = Counter(
+        event.user_id for event in events if event.event != MEMBERSHIPS_EVENT and event.group is None
     )
+    try:
+        firsts = reserve_sequences(counts)
+    except Exception:
+        logger.exception('Failed to number realtime events for users %s.', sorted(counts))
+        firsts = {}
+    sequences = {user_id: itertools.count(first) for user_id, first in firsts.items()}
+    for event in events:
+        try:
+            if event.event == MEMBERSHIPS_EVENT:
+                sent = send(event.user_id, event.message())
+            elif event.group is not None:
+                event.event_id = uuid.uuid4().hex
+                sent = _send_to_group(event.group, {**event.message(), 'seq': None})
+            elif event.user_id not in sequences:
+                sent = False
+            else:
+                event.event_id = uuid.uuid4().hex
+                message = record(event.user_id, event.message(), next(sequences[event.user_id]))
+                sent = send(event.user_id, message)
+                if event.event in SHARED_TASK_EVENTS and isinstance(event.data, dict) and 'id' in event.data:
+                    _send_to_group(task_group(event.data['id']), {**message, 'seq': None})
+        except Exception:
+            logger.exception('Failed to publish %s for user %s.', event.event, event.user_id)
+            sent = False
+        stats.incr('published' if sent is not False else 'dropped')
+
+
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher():
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = RealtimeDispatcher(maxsize=getattr(settings, 'REALTIME_QUEUE_SIZE', 1000))
+            atexit.register(_dispatcher.shutdown)
+        return _dispatcher
+
+
+def _dispatch(events):
+    """Resolve payloads here, while the database is at hand, then publish."""
+    for event in events:
+        try:
+            event.resolve()
+        except Exception:
+            logger.exception('Failed to build %s for user %s.', event.event, event.user_id)
+            event.data = None
+    if getattr(settings, 'REALTIME_DISPATCH_ASYNC', True):
+        get_dispatcher().submit(events)
+    else:
+        publish(events)
+
+
+def _deliver(events):
+    """Hand events to the open request scope, or dispatch them."""
+    scope = getattr(_local, 'scope', None)
+    if scope is not None:
+        scope.extend(events)
+    else:
+        _dispatch(events)
+
+
+def _deliver_pending(buffer):
+    _deliver(buffer.pop_all())
+
+
+def _drop_pending(buffer):
+    stats.incr('dropped', len(buffer))
+
+
+_pending = CommitBuffers(EventBuffer, _deliver_pending, discard=_drop_pending)
+
+
+@contextmanager
+def collect():
+    """
+    Hold events back until the block exits, then dispatch them merged.
+    Used around each request so several autocommitted saves produce one
+    summary; transactions that commit inside the block join it.
+    """
+    if getattr(_local, 'scope', None) is not None:
+        yield
+        return
+    _local.scope = EventBuffer()
+    try:
+        yield
+    finally:
+        scope, _local.scope = _local.scope, None
+        _dispatch(scope.pop_all())
+
+
+def _enqueue(user_id, event, data, using=DEFAULT_DB_ALIAS, group=None):
+    """
+    Queue an event for `user_id`'s group, or for `group` on their behalf.
+
+    Inside a transaction it waits for the commit and is discarded on
+    rollback, per savepoint like audit rows. Otherwise it joins the current
+    request scope, or is dispatched right away.
+    """
+    if not user_id:
+        return
+    stats.incr('queued')
+    item = Event(user_id, event, data, group=group)
+    pending = _pending.get(using)
+    if pending is None:
+        _deliver([item])
+        return
+    pending.add(item)
+
+
+def _broadcast(user_id, event, data):
+    _enqueue(user_id, event, data)
 
 
 def get_user_task_summary(user_id):
@@ -33,36 +396,103 @@ def get_user_task_summary(user_id):
             'high_priority': 0,
         }
 
-    summary = Task.objects.filter(owner_id=user_id).aggregate(
-        total_tasks=Count('id'),
-        completed=Count('id', filter=Q(status='Completed')),
-        pending=Count('id', filter=Q(status='Pending')),
-        high_priority=Count('id', filter=Q(priority='High')),
-    )
-    return {key: summary.get(key, 0) or 0 for key in ['total_tasks', 'completed', 'pending', 'high_priority']}
+    return get_counts(user_id)
 
 
 def broadcast_task_summary(user_id):
-    summary = get_user_task_summary(user_id)
-    _broadcast(user_id, 'task_summary', summary)
-    return summary
+    _broadcast(user_id, 'task_summary', lambda: get_user_task_summary(user_id))
 
 
 def broadcast_task_payload(task, event):
     if not task or not task.owner_id:
         return
-    serialized = TaskSerializer(task).data
-    _broadcast(task.owner_id, event, serialized)
+    _broadcast(task.owner_id, event, _TaskPayload(task))
 
 
-def broadcast_full_task_list(user_id):
-    if not user_id:
-        return
+class _TaskPayload(dict):
+    """
+    Lazily serialized task. It carries the task id up front so per-task
+    events can be merged before the serializer runs.
+    """
+
+    def __init__(self, task):
+        super().__init__(id=task.id)
+        self.task = task
+
+    def __call__(self):
+        return TaskSerializer(self.task).data
+
+
+def broadcast_task_moves(user_id, previous_version, version, positions):
+    """
+    Tell the user's clients which tasks moved: `positions` is an iterable of
+    `(id, position)` pairs. A client whose last seen version is not
+    `previous_version` missed a delta and should ask for a resync.
+    """
+    _broadcast(user_id, MOVE_EVENT, {
+        'previous_version': previous_version,
+        'version': version,
+        'moved': [{'id': task_id, 'position': position} for task_id, position in positions],
+    })
+
+
+def full_task_list(user_id):
+    """The whole board with its version, sent to clients that ask for a resync."""
     tasks = Task.objects.filter(owner_id=user_id).order_by('-position', '-created_at')
-    serialized = TaskSerializer(tasks, many=True).data
-    _broadcast(user_id, 'tasks_reordered', serialized)
+    return {
+        'version': get_board_version(user_id),
+        'tasks': TaskValuesSerializer().serialize_queryset(tasks),
+    }
+
+
+def task_snapshot(user, size, fields=None):
+    """
+    What a page load needs, pushed to sockets that connect with
+    `?snapshot=<size>`: the summary, the first `size` tasks of the list in its
+    default ordering, and the data and board versions. Kept in the list cache
+    under the scope's data version, so it is rebuilt only after a change.
+    """
+    scope = GLOBAL_SCOPE if user.is_superuser or user.has_perm('tasks.task_manage') else user_scope(user.id)
+    version = get_data_version(scope)
+    selection = ','.join(fields) if fields is not None else '*'
+    key = f'tasks:snapshot:{scope}:{version}:{user.id}:{size}:{selection}'
+    if cache_enabled():
+        cached = get_cached_page(key)
+        if cached is not None:
+            return cached
+
+    tasks = Task.objects.order_by('-position', '-created_at')
+    if scope != GLOBAL_SCOPE:
+        tasks = tasks.filter(visibility__user=user)
+    reader = TaskValuesSerializer(fields=fields, user=user)
+    snapshot = {
+        'version': version,
+        'board_version': get_board_version(user.id),
+        'summary': get_user_task_summary(user.id),
+        'tasks': reader.to_representation(reader.values_queryset(tasks)[:size]),
+    }
+    if cache_enabled():
+        store_page(key, scope, snapshot)
+    return snapshot
+
+
+def broadcast_memberships_changed(user_ids):
+    """
+    Tell the users' sockets that the tasks shared with them changed, so
+    they reload their task groups (once per process). Queued and sent like
+    any other event, after commit.
+    """
+    for user_id in sorted({user_id for user_id in user_ids if user_id}):
+        _enqueue(user_id, MEMBERSHIPS_EVENT, {'generation': uuid.uuid4().hex})
 
 
 def broadcast_generic_event(user_id, event, data):
     _broadcast(user_id, event, data)
 
+
+def broadcast_shared_task_event(owner_id, task_id, event, data):
+    """
+    Send a `task_updated`/`task_deleted` to the collaborators of `task_id`
+    only, for writers that tell its owner some other way.
+    """
+    _enqueue(owner_id, event, data, group=task_group(task_id))
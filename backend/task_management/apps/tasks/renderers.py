@@ -0,0 +1,43 @@
+import ujson
+from django.conf import settings
+from rest_framework.renderers import JSONRenderer
+
+
+def fast_json_enabled():
+    return getattr(settings, 'FAST_JSON_RENDERER', True)
+
+
+def dumps(data, default=None):
+    """
+    Compact JSON text matching DRF's `JSONRenderer` output (unicode kept,
+    forward slashes unescaped), produced by ujson.
+    """
+    return ujson.dumps(
+        data,
+        ensure_ascii=False,
+        escape_forward_slashes=False,
+        default=default,
+    )
+
+
+class UJSONRenderer(JSONRenderer):
+    """
+    Drop-in `JSONRenderer` that encodes with ujson. Values ujson cannot handle
+    natively go through DRF's encoder; indented (browsable/debug) output and
+    the `FAST_JSON_RENDERER = False` setting fall back to the stock renderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if not fast_json_enabled() or self.get_indent(accepted_media_type, renderer_context):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = dumps(data, default=self.encoder_class().default)
+        except (TypeError, OverflowError, ValueError):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Same escaping as JSONRenderer so the output stays valid JavaScript.
+        ret = ret.replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+        return ret.encode()
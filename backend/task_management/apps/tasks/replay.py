@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+
+from .models import RealtimeSequence
+
+SLOT_KEY = 'tasks:realtime:{user_id}:{slot}'
+
+
+def get_cache():
+    return caches[getattr(settings, 'REALTIME_REPLAY_CACHE_ALIAS', 'default')]
+
+
+def buffer_size():
+    return getattr(settings, 'REALTIME_REPLAY_SIZE', 200)
+
+
+def _slot_key(user_id, seq):
+    return SLOT_KEY.format(user_id=user_id, slot=seq % buffer_size())
+
+
+def current_sequence(user_id):
+    return RealtimeSequence.objects.filter(user_id=user_id).values_list(
+        'last_seq', flat=True
+    ).first() or 0
+
+
+def _advance(user_id, step):
+    """Add `step` to the user's sequence and return it, or None without a row."""
+    if connection.vendor in ('postgresql', 'sqlite'):
+        table = connection.ops.quote_name(RealtimeSequence._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {table} SET "last_seq" = "last_seq" + %s WHERE "user_id" = %s RETURNING "last_seq"',
+                [step, user_id],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    sequences = RealtimeSequence.objects.filter(user_id=user_id)
+    if not sequences.update(last_seq=F('last_seq') + step):
+        return None
+    return sequences.values_list('last_seq', flat=True).get()
+
+
+def reserve_sequences(counts):
+    """
+    Reserve `count` consecutive sequence numbers for each user in `counts`
+    (`{user_id: count}`) with one UPDATE per user, and return
+    `{user_id: first}`. Users that no longer exist are left out.
+    """
+    firsts = {}
+    missing = []
+    for user_id, count in counts.items():
+        last = _advance(user_id, count)
+        if last is None:
+            missing.append(user_id)
+        else:
+            firsts[user_id] = last - count + 1
+    if missing:
+        existing = User.objects.filter(id__in=missing).values_list('id', flat=True)
+        try:
+            with transaction.atomic():
+                RealtimeSequence.objects.bulk_create(
+                    [RealtimeSequence(user_id=user_id) for user_id in existing], ignore_conflicts=True
+                )
+        except IntegrityError:
+            # One of them was deleted in between; its events go nowhere.
+            pass
+        for user_id in missing:
+            last = _advance(user_id, counts[user_id])
+            if last is not None:
+                firsts[user_id] = last - counts[user_id] + 1
+    return firsts
+
+
+def record(user_id, message, seq):
+    """
+    Number `message` with `seq` (from `reserve_sequences`) and keep it in
+    the user's ring buffer: slot `seq % REALTIME_REPLAY_SIZE`, so each user
+    holds at most that many messages, each for REALTIME_REPLAY_TTL seconds.
+    """
+    message = {**message, 'seq': seq}
+    get_cache().set(
+        _slot_key(user_id, seq), message, timeout=getattr(settings, 'REALTIME_REPLAY_TTL', 300)
+    )
+    return message
+
+
+def missed_since(user_id, since):
+    """
+    Messages numbered after `since`, oldest first, or None when any of them
+    has left the buffer (or has not been stored yet) and the client has to
+    resync instead.
+    """
+    current = current_sequence(user_id)
+    if since > current or current - since > buffer_size():
+        return None
+    sequence = range(since + 1, current + 1)
+    keys = [_slot_key(user_id, seq) for seq in sequence]
+    found = get_cache().get_many(keys)
+    messages = []
+    for seq, key in zip(sequence, keys):
+        message = found.get(key)
+        if message is None or message.get('seq') != seq:
+            return None
+        messages.append(message)
+    return messages
@@ -0,0 +1,160 @@
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from apps.audit.models import AuditLog
+
+from .models import TaskActivityRollup
+
+ROLLUP_FIELDS = (
+    'created',
+    'completed',
+    'reopened',
+    'deleted',
+    'created_high',
+    'created_medium',
+    'created_low',
+)
+# Audit actions that feed the rollups; everything else is ignored.
+ROLLUP_ACTIONS = ('Task Created', 'Status Changed', 'Task Deleted')
+BUCKETS = ('day', 'week')
+
+
+def _load(changed_data):
+    try:
+        data = json.loads(changed_data)
+    except (TypeError, ValueError):
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def entry_counts(entry):
+    """The rollup columns one audit row adds to, as `{field: 1}`."""
+    if entry.action == 'Task Created':
+        data = _load(entry.changed_data)
+        counts = {'created': 1}
+        priority = str(data.get('priority', '')).lower()
+        if f'created_{priority}' in ROLLUP_FIELDS:
+            counts[f'created_{priority}'] = 1
+        if data.get('status') == 'Completed':
+            counts['completed'] = 1
+        return counts
+    if entry.action == 'Status Changed':
+        data = _load(entry.changed_data)
+        if data.get('new') == 'Completed':
+            return {'completed': 1}
+        if data.get('old') == 'Completed':
+            return {'reopened': 1}
+        return {}
+    if entry.action == 'Task Deleted':
+        return {'deleted': 1}
+    return {}
+
+
+def rollup_deltas(entries):
+    """
+    `{(user_id, day): {field: delta}}` for `entries`, with every change also
+    counted under `(None, day)` for the global series.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for entry in entries:
+        counts = entry_counts(entry)
+        if not counts:
+            continue
+        day = timezone.localdate(entry.timestamp) if entry.timestamp else timezone.localdate()
+        for user_id in (entry.user_id, None):
+            for field, value in counts.items():
+                deltas[(user_id, day)][field] += value
+    return deltas
+
+
+def apply_deltas(deltas):
+    """One UPDATE per touched (user, day) row; missing rows are created first."""
+    if not deltas:
+        return
+    with transaction.atomic():
+        TaskActivityRollup.objects.bulk_create(
+            [TaskActivityRollup(user_id=user_id, day=day) for user_id, day in deltas],
+            ignore_conflicts=True,
+        )
+        for (user_id, day), fields in deltas.items():
+            rows = TaskActivityRollup.objects.filter(day=day)
+            rows = rows.filter(user__isnull=True) if user_id is None else rows.filter(user_id=user_id)
+            rows.update(**{field: F(field) + value for field, value in fields.items()})
+
+
+def record_entries(entries):
+    apply_deltas(rollup_deltas(entries))
+
+
+def backfill(chunk_size=5000):
+    """
+    Rebuild every rollup from the audit log, walking it by id in chunks.
+    Returns the number of audit rows read.
+
+    Only rows that exist when the rebuild starts are walked; rows audited
+    while it runs are folded in by the `entries_written` receiver, so
+    writes don't need to be paused.
+    """
+    max_id = AuditLog.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+    TaskActivityRollup.objects.all().delete()
+    last_id = 0
+    seen = 0
+    while True:
+        chunk = list(
+            AuditLog.objects.filter(id__gt=last_id, id__lte=max_id, action__in=ROLLUP_ACTIONS)
+            .order_by('id')
+            .only('id', 'user_id', 'action', 'changed_data', 'timestamp')[:chunk_size]
+        )
+        if not chunk:
+            return seen
+        apply_deltas(rollup_deltas(chunk))
+        last_id = chunk[-1].id
+        seen += len(chunk)
+
+
+def bucket_start(day, bucket):
+    if bucket == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def timeseries(user_id, start, end, bucket='day'):
+    """
+    Activity between `start` and `end` (inclusive) for one user, or for
+    everyone when `user_id` is None, summed per day or per ISO week. Empty
+    periods are included as zeros so charts get a continuous axis.
+    """
+    rows = TaskActivityRollup.objects.filter(day__gte=start, day__lte=end)
+    rows = rows.filter(user__isnull=True) if user_id is None else rows.filter(user_id=user_id)
+
+    series = {}
+    period = bucket_start(start, bucket)
+    step = timedelta(days=7 if bucket == 'week' else 1)
+    while period <= end:
+        series[period] = dict.fromkeys(ROLLUP_FIELDS, 0)
+        period += step
+    for row in rows.values('day', *ROLLUP_FIELDS):
+        totals = series[bucket_start(row.pop('day'), bucket)]
+        for field, value in row.items():
+            totals[field] += value
+
+    return [
+        {
+            'period': period.isoformat(),
+            'created': totals['created'],
+            'completed': totals['completed'],
+            'reopened': totals['reopened'],
+            'deleted': totals['deleted'],
+            'priority_mix': {
+                'high': totals['created_high'],
+                'medium': totals['created_medium'],
+                'low': totals['created_low'],
+            },
+        }
+        for period, totals in series.items()
+    ]
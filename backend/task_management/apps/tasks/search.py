@@ -0,0 +1,234 @@
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q
+from django.db.models.expressions import RawSQL
+from rest_framework.filters import SearchFilter
+
+from .models import Task
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+RANK_ANNOTATION = 'search_rank'
+RELEVANCE_ORDERING = 'relevance'
+
+TASK_TABLE = Task._meta.db_table
+FTS_TABLE = f'{TASK_TABLE}_fts'
+SEARCH_VECTOR_COLUMN = 'search_vector'
+POSTGRES_CONFIG = 'pg_catalog.english'
+
+
+class BaseSearchBackend:
+    """
+    Filters a task queryset by free text and, when asked to rank, annotates
+    `search_rank` (higher is more relevant).
+    """
+
+    supports_ranking = False
+
+    def search(self, queryset, text, rank=False):
+        raise NotImplementedError
+
+
+class BasicSearchBackend(BaseSearchBackend):
+    """Case-insensitive substring match, the original `SearchFilter` behaviour."""
+
+    def search(self, queryset, text, rank=False):
+        condition = Q()
+        for term in text.split():
+            condition &= Q(title__icontains=term) | Q(description__icontains=term)
+        return queryset.filter(condition)
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    Matches against the trigger-maintained `search_vector` column through its
+    GIN index. Title words carry weight A and description words weight B.
+    """
+
+    supports_ranking = True
+
+    def build_query(self, text):
+        tokens = TOKEN_RE.findall(text)
+        return ' & '.join(f'{token}:*' for token in tokens)
+
+    def search(self, queryset, text, rank=False):
+        query = self.build_query(text)
+        if not query:
+            # Only punctuation: nothing the index can match on.
+            return BasicSearchBackend().search(queryset, text)
+        tsquery = f"to_tsquery('{POSTGRES_CONFIG}', %s)"
+        column = f'"{TASK_TABLE}"."{SEARCH_VECTOR_COLUMN}"'
+        queryset = queryset.filter(
+            RawSQL(f'{column} @@ {tsquery}', [query], output_field=BooleanField())
+        )
+        if rank:
+            queryset = queryset.annotate(**{
+                RANK_ANNOTATION: RawSQL(
+                    f'ts_rank_cd({column}, {tsquery})',
+                    [query],
+                    output_field=FloatField()
+                )
+            })
+        return queryset
+
+
+class SQLiteFTSSearchBackend(BaseSearchBackend):
+    """
+    Matches against the FTS5 shadow table kept in sync by triggers. Ranking
+    uses bm25 with title matches weighted above description matches.
+    """
+
+    supports_ranking = True
+
+    def build_query(self, text):
+        tokens = TOKEN_RE.findall(text)
+        return ' '.join('"{}"*'.format(token.replace('"', '""')) for token in tokens)
+
+    def search(self, queryset, text, rank=False):
+        query = self.build_query(text)
+        if not query:
+            # Only punctuation: nothing the index can match on.
+            return BasicSearchBackend().search(queryset, text)
+        queryset = queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM "{FTS_TABLE}" WHERE "{FTS_TABLE}" MATCH %s', [query])
+        )
+        if rank:
+            queryset = queryset.annotate(**{
+                RANK_ANNOTATION: RawSQL(
+                    f'(SELECT -bm25("{FTS_TABLE}", 10.0, 1.0) FROM "{FTS_TABLE}" '
+                    f'WHERE "{FTS_TABLE}" MATCH %s AND rowid = "{TASK_TABLE}"."id")',
+                    [query],
+                    output_field=FloatField()
+                )
+            })
+        return queryset
+
+
+SEARCH_BACKENDS = {
+    'basic': BasicSearchBackend,
+    'postgres': PostgresSearchBackend,
+    'sqlite_fts': SQLiteFTSSearchBackend,
+}
+
+VENDOR_BACKENDS = {
+    'postgresql': 'postgres',
+    'sqlite': 'sqlite_fts',
+}
+
+
+def get_search_backend(using='default'):
+    name = getattr(settings, 'TASK_SEARCH_BACKEND', 'auto')
+    if name == 'auto':
+        name = VENDOR_BACKENDS.get(connections[using].vendor, 'basic')
+    return SEARCH_BACKENDS[name]()
+
+
+class TaskSearchFilter(SearchFilter):
+    """
+    `?search=` backed by the configured search backend. Combine it with
+    `?ordering=relevance` to sort by match quality.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        backend = get_search_backend(queryset.db)
+        rank = (
+            backend.supports_ranking
+            and request.query_params.get('ordering') == RELEVANCE_ORDERING
+        )
+        return backend.search(queryset, ' '.join(terms), rank=rank)
+
+
+def install_postgres_search(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TASK_TABLE}" ADD COLUMN IF NOT EXISTS "{SEARCH_VECTOR_COLUMN}" tsvector')
+        cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION {TASK_TABLE}_search_vector_update() RETURNS trigger AS $$
+            BEGIN
+                NEW.{SEARCH_VECTOR_COLUMN} :=
+                    setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(NEW.title, '')), 'A') ||
+                    setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(NEW.description, '')), 'B');
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute(f'DROP TRIGGER IF EXISTS {TASK_TABLE}_search_vector_trigger ON "{TASK_TABLE}"')
+        cursor.execute(f"""
+            CREATE TRIGGER {TASK_TABLE}_search_vector_trigger
+            BEFORE INSERT OR UPDATE OF title, description ON "{TASK_TABLE}"
+            FOR EACH ROW EXECUTE FUNCTION {TASK_TABLE}_search_vector_update()
+        """)
+        cursor.execute(f"""
+            UPDATE "{TASK_TABLE}" SET "{SEARCH_VECTOR_COLUMN}" =
+                setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('{POSTGRES_CONFIG}', coalesce(description, '')), 'B')
+        """)
+        cursor.execute(
+            f'CREATE INDEX IF NOT EXISTS {TASK_TABLE}_search_vector_gin '
+            f'ON "{TASK_TABLE}" USING GIN ("{SEARCH_VECTOR_COLUMN}")'
+        )
+
+
+def uninstall_postgres_search(connection):
+    with connection.cursor() as cursor:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {TASK_TABLE}_search_vector_trigger ON "{TASK_TABLE}"')
+        cursor.execute(f'DROP FUNCTION IF EXISTS {TASK_TABLE}_search_vector_update()')
+        cursor.execute(f'ALTER TABLE "{TASK_TABLE}" DROP COLUMN IF EXISTS "{SEARCH_VECTOR_COLUMN}"')
+
+
+def install_sqlite_fts(connection):
+    """
+    Create the FTS5 shadow table and its sync triggers, then rebuild it.
+    Safe to re-run, e.g. after a SQLite table rebuild dropped the triggers.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS "{FTS_TABLE}" USING fts5(
+                title, description, content='{TASK_TABLE}', content_rowid='id'
+            )
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON "{TASK_TABLE}" BEGIN
+                INSERT INTO "{FTS_TABLE}"(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON "{TASK_TABLE}" BEGIN
+                INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON "{TASK_TABLE}" BEGIN
+                INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}", rowid, title, description)
+                VALUES ('delete', old.id, old.title, old.description);
+                INSERT INTO "{FTS_TABLE}"(rowid, title, description)
+                VALUES (new.id, new.title, new.description);
+            END
+        """)
+        cursor.execute(f"""INSERT INTO "{FTS_TABLE}"("{FTS_TABLE}") VALUES ('rebuild')""")
+
+
+def uninstall_sqlite_fts(connection):
+    with connection.cursor() as cursor:
+        for suffix in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}')
+        cursor.execute(f'DROP TABLE IF EXISTS "{FTS_TABLE}"')
+
+
+def install_search_index(connection):
+    if connection.vendor == 'postgresql':
+        install_postgres_search(connection)
+    elif connection.vendor == 'sqlite':
+        install_sqlite_fts(connection)
+
+
+def uninstall_search_index(connection):
+    if connection.vendor == 'postgresql':
+        uninstall_postgres_search(connection)
+    elif connection.vendor == 'sqlite':
+        uninstall_sqlite_fts(connection)
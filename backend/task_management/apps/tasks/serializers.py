@@ -1,9 +1,12 @@
+from datetime import timedelta
+
 from django.contrib.auth.models import User
-from django.db.models import Max
 from django.utils import timezone
 from rest_framework import serializers
 
 from .models import Task, TaskRoleAssignment
+from .ranking import reserve_positions
+from .sparse import SparseFieldsetSerializerMixin
 
 
 class UserSummarySerializer(serializers.ModelSerializer):
@@ -13,7 +16,7 @@ class UserSummarySerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     owner_username = serializers.CharField(source='owner.username', read_only=True)
     owner_email = serializers.CharField(source='owner.email', read_only=True)
     current_assignment = serializers.SerializerMethodField()
@@ -46,20 +49,21 @@ class TaskSerializer(serializers.ModelSerializer):
         if not owner:
             raise serializers.ValidationError('Owner is required to create a task.')
         
-        last_position = Task.objects.filter(owner=owner).aggregate(
-            max_pos=Max('position')
-        ).get('max_pos') or 0
-        validated_data['position'] = last_position + 1
+        validated_data['position'] = reserve_positions(owner.id)[0]
         return super().create(validated_data)
 
     def get_current_assignment(self, obj):
         request = self.context.get('request')
         if not request or not request.user.is_authenticated:
             return None
-        assignment = obj.role_assignments.filter(
-            user=request.user,
-            is_active=True
-        ).first()
+        if hasattr(obj, 'current_assignments'):
+            prefetched = obj.current_assignments
+            assignment = prefetched[0] if prefetched else None
+        else:
+            assignment = obj.role_assignments.filter(
+                user=request.user,
+                is_active=True
+            ).first()
         if not assignment:
             return None
         return {
@@ -89,6 +93,55 @@ class TaskReorderSerializer(serializers.Serializer):
         return value
 
 
+class TaskMoveSerializer(serializers.Serializer):
+    after_id = serializers.IntegerField(min_value=1, required=False)
+    before_id = serializers.IntegerField(min_value=1, required=False)
+
+    def validate(self, attrs):
+        if not attrs.get('after_id') and not attrs.get('before_id'):
+            raise serializers.ValidationError('Provide after_id, before_id or both.')
+        if attrs.get('after_id') and attrs.get('after_id') == attrs.get('before_id'):
+            raise serializers.ValidationError('after_id and before_id must differ.')
+        return attrs
+
+
+class TaskBatchSerializer(serializers.Serializer):
+    MAX_OPERATIONS = 500
+
+    operations = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+        max_length=MAX_OPERATIONS
+    )
+    atomic = serializers.BooleanField(default=False)
+
+
+class TaskTimeseriesQuerySerializer(serializers.Serializer):
+    """Query parameters for the activity time series. `from` defaults to 29 days before `to`."""
+
+    MAX_DAYS = 731
+
+    to = serializers.DateField(required=False)
+    bucket = serializers.ChoiceField(choices=['day', 'week'], default='day')
+    scope = serializers.ChoiceField(choices=['me', 'global'], default='me')
+
+    def get_fields(self):
+        fields = super().get_fields()
+        # `from` is a Python keyword, so it cannot be declared on the class.
+        fields['from'] = serializers.DateField(required=False)
+        return fields
+
+    def validate(self, attrs):
+        end = attrs.get('to') or timezone.localdate()
+        start = attrs.get('from') or end - timedelta(days=29)
+        if start > end:
+            raise serializers.ValidationError('"from" must not be after "to".')
+        if (end - start).days >= self.MAX_DAYS:
+            raise serializers.ValidationError(f'The range may span at most {self.MAX_DAYS} days.')
+        attrs['from'], attrs['to'] = start, end
+        return attrs
+
+
 class TaskRoleAssignmentSerializer(serializers.ModelSerializer):
     user = UserSummarySerializer(read_only=True)
     assigned_by = UserSummarySerializer(read_only=True)
@@ -1,112 +1,102 @@
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
 from django.db.models.signals import post_save, pre_delete, pre_save, post_delete
 from django.dispatch import receiver
-from .models import Task
-from apps.audit.models import AuditLog
-import json
+from .models import Task, TaskRoleAssignment
+from apps.audit.writer import entries_written, record as record_audit
+from .audit_trail import (
+    TRACKED_FIELDS,
+    assignment_entries,
+    created_entries,
+    deleted_entries,
+    updated_entries,
+)
 from .realtime import (
+    broadcast_memberships_changed,
     broadcast_task_payload,
     broadcast_task_summary,
     broadcast_generic_event,
 )
+from .rollups import record_entries as record_rollups
+from .counters import new_state, old_state, record_change, recount
+from .visibility import grant_visibility, sync_task_user
+from .versioning import bump_task_versions, bump_user_versions
+from .caching import invalidate_scopes
+
+_state = threading.local()
+
+
+@contextmanager
+def muted_task_signals():
+    """
+    Silence the task and role assignment receivers below. Bulk writers that
+    take care of audit rows, visibility, versions and broadcasts themselves
+    use this around deletes, which would otherwise fire per row.
+    """
+    previous = getattr(_state, 'muted', False)
+    _state.muted = True
+    try:
+        yield
+    finally:
+        _state.muted = previous
+
+
+def signals_muted():
+    return getattr(_state, 'muted', False)
+
 
 @receiver(pre_save, sender=Task)
 def task_pre_save(sender, instance, **kwargs):
-    """Store the old instance data before save"""
-    if instance.pk:
-        try:
-            instance._old_instance = Task.objects.get(pk=instance.pk)
-        except Task.DoesNotExist:
-            instance._old_instance = None
-    else:
-        instance._old_instance = None
+    """Fill in old values the snapshot lacks, e.g. after `.only()`."""
+    if signals_muted():
+        return
+    instance.load_snapshot(['owner_id', *TRACKED_FIELDS])
 
 
 @receiver(post_save, sender=Task)
 def task_post_save(sender, instance, created, **kwargs):
     """Create audit log after task save"""
+    if signals_muted():
+        return
     if created:
-        # Task Created
-        AuditLog.objects.create(
-            user=instance.owner,
-            task=instance,
-            action='Task Created',
-            changed_data=json.dumps({
-                'title': instance.title,
-                'description': instance.description,
-                'status': instance.status,
-                'priority': instance.priority,
-            })
-        )
+        record_audit(created_entries(instance))
+        record_change(None, new_state(instance))
+        grant_visibility(instance.id, instance.owner_id)
         broadcast_task_payload(instance, 'task_created')
     else:
-        # Task Updated
-        changes = {}
-        old_instance = getattr(instance, '_old_instance', None)
-        
-        if old_instance:
-            # Check for changes
-            if old_instance.title != instance.title:
-                changes['title'] = {
-                    'old': old_instance.title,
-                    'new': instance.title
-                }
-            if old_instance.description != instance.description:
-                changes['description'] = {
-                    'old': old_instance.description,
-                    'new': instance.description
-                }
-            if old_instance.status != instance.status:
-                changes['status'] = {
-                    'old': old_instance.status,
-                    'new': instance.status
-                }
-                # Special log for status change
-                AuditLog.objects.create(
-                    user=instance.owner,
-                    task=instance,
-                    action='Status Changed',
-                    changed_data=json.dumps(changes['status'])
-                )
-            if old_instance.priority != instance.priority:
-                changes['priority'] = {
-                    'old': old_instance.priority,
-                    'new': instance.priority
-                }
-                # Special log for priority change
-                AuditLog.objects.create(
-                    user=instance.owner,
-                    task=instance,
-                    action='Priority Changed',
-                    changed_data=json.dumps(changes['priority'])
-                )
-            
-            if changes:
-                AuditLog.objects.create(
-                    user=instance.owner,
-                    task=instance,
-                    action='Task Updated',
-                    changed_data=json.dumps(changes)
-                )
+        # Old values come from the snapshot taken when the task was loaded.
+        old_owner_id = instance.get_old_value('owner_id')
+        if old_owner_id != instance.owner_id:
+            grant_visibility(instance.id, instance.owner_id)
+            sync_task_user(instance.id, old_owner_id)
+            invalidate_scopes(bump_user_versions([old_owner_id], include_global=False))
+            broadcast_memberships_changed([old_owner_id, instance.owner_id])
+
+        if instance.has_snapshot():
+            old_values = {field: instance.get_old_value(field) for field in TRACKED_FIELDS}
+            record_audit(updated_entries(old_values, instance))
+            record_change(old_state(instance), new_state(instance))
+        else:
+            recount(user_ids={old_owner_id, instance.owner_id})
         broadcast_task_payload(instance, 'task_updated')
 
+    invalidate_scopes(bump_task_versions(instance.id))
     broadcast_task_summary(instance.owner_id)
 
 
 @receiver(pre_delete, sender=Task)
-def task_pre_delete(sender, instance, **kwargs):
+def task_pre_delete(sender, instance, origin=None, **kwargs):
     """Create audit log before task deletion"""
-    AuditLog.objects.create(
-        user=instance.owner,
-        task=None,  # Task will be deleted
-        action='Task Deleted',
-        changed_data=json.dumps({
-            'task_id': instance.id,
-            'title': instance.title,
-            'description': instance.description,
-            'status': instance.status,
-            'priority': instance.priority,
-        })
-    )
+    if signals_muted():
+        return
+    # Visibility rows cascade with the task, so bump its viewers first.
+    invalidate_scopes(bump_task_versions(instance.id))
+    # A user delete takes their audit rows with it.
+    origin_model = getattr(origin, 'model', None) or type(origin)
+    if origin_model is not User:
+        record_audit(deleted_entries(instance))
     broadcast_generic_event(
         instance.owner_id,
         'task_deleted',
@@ -115,5 +105,50 @@ def task_pre_delete(sender, instance, **kwargs):
 
 
 @receiver(post_delete, sender=Task)
-def task_post_delete(sender, instance, **kwargs):
-    broadcast_task_summary(instance.owner_id)
\ No newline at end of file
+def task_post_delete(sender, instance, origin=None, **kwargs):
+    if signals_muted():
+        return
+    # A user delete takes their counter row with it.
+    origin_model = getattr(origin, 'model', None) or type(origin)
+    if origin_model is not User:
+        record_change(old_state(instance), None)
+    broadcast_task_summary(instance.owner_id)
+
+
+@receiver(post_save, sender=TaskRoleAssignment)
+def role_assignment_post_save(sender, instance, created, **kwargs):
+    if signals_muted():
+        return
+    record_audit(assignment_entries(instance, created=created))
+    user_ids = {instance.user_id}
+    sync_task_user(instance.task_id, instance.user_id)
+    # An assignment moved to another user or task may leave the old user
+    # without a reason to see the old task.
+    old_task_id = instance.get_old_value('task_id')
+    old_user_id = instance.get_old_value('user_id')
+    if (old_task_id, old_user_id) != (instance.task_id, instance.user_id):
+        sync_task_user(old_task_id, old_user_id)
+        user_ids.add(old_user_id)
+    # Admin lists embed `current_assignment`, so the global scope changes too.
+    invalidate_scopes(bump_user_versions(user_ids))
+    broadcast_memberships_changed(user_ids)
+
+
+@receiver(post_delete, sender=TaskRoleAssignment)
+def role_assignment_post_delete(sender, instance, origin=None, **kwargs):
+    if signals_muted():
+        return
+    # Only direct deletes are logged; cascades from a task or user delete
+    # would reference rows that are about to disappear.
+    origin_model = getattr(origin, 'model', None) or type(origin)
+    if origin_model is TaskRoleAssignment and instance.is_active:
+        record_audit(assignment_entries(instance, deleted=True))
+    sync_task_user(instance.task_id, instance.user_id)
+    invalidate_scopes(bump_user_versions([instance.user_id]))
+    broadcast_memberships_changed([instance.user_id])
+
+
+@receiver(entries_written)
+def audit_entries_written(sender, entries, **kwargs):
+    """Fold freshly written audit rows into the daily activity rollups."""
+    record_rollups(entries)
@@ -0,0 +1,119 @@
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def parse_field_list(value):
+    if not value:
+        return []
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+def select_fields(available, fields=None, omit=None):
+    """
+    Resolve `?fields=` / `?omit=` against the available field names, keeping
+    the serializer's declared order. Returns None when no selection applies.
+    """
+    fields = list(fields or [])
+    omit = list(omit or [])
+    if not fields and not omit:
+        return None
+    unknown = [name for name in fields + omit if name not in available]
+    if unknown:
+        raise ValidationError({FIELDS_PARAM: [f"Unknown field(s): {', '.join(unknown)}"]})
+    selected = [name for name in available if not fields or name in fields]
+    return [name for name in selected if name not in omit]
+
+
+def project(data, fields):
+    """Trim an already serialized payload (a dict or a list of dicts)."""
+    if not fields:
+        return data
+    if isinstance(data, list):
+        return [project(item, fields) for item in data]
+    if isinstance(data, dict):
+        return {key: value for key, value in data.items() if key in fields}
+    return data
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Drops every field not listed in `context['sparse_fields']`, so unneeded
+    fields are never evaluated.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.context.get('sparse_fields')
+        if selected is not None:
+            for name in set(self.fields) - set(selected):
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """
+    Adds `?fields=a,b` and `?omit=c` to read requests.
+
+    The selection trims the serializer and the query: the queryset is limited
+    with `only()` to the columns the remaining fields need, and relations
+    that are no longer read are neither joined nor prefetched.
+    `sparse_field_sources` maps serializer fields to model paths; fields not
+    listed map to the model field of the same name. Views call
+    `apply_sparse_fieldset()` last in `filter_queryset`, once ordering is final.
+    """
+
+    sparse_field_sources = {}
+    sparse_required_columns = ('id',)
+
+    def get_sparse_fields(self):
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = None
+            request = getattr(self, 'request', None)
+            if request is not None and request.method in ('GET', 'HEAD'):
+                available = list(self.get_serializer_class()().fields)
+                self._sparse_fields = select_fields(
+                    available,
+                    parse_field_list(request.query_params.get(FIELDS_PARAM)),
+                    parse_field_list(request.query_params.get(OMIT_PARAM)),
+                )
+        return self._sparse_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        selected = self.get_sparse_fields()
+        if selected is not None:
+            context['sparse_fields'] = selected
+        return context
+
+    def get_sparse_columns(self, fields):
+        columns = list(self.sparse_required_columns)
+        for name in fields:
+            columns.extend(self.sparse_field_sources.get(name, [name]))
+        return columns
+
+    def apply_sparse_fieldset(self, queryset):
+        selected = self.get_sparse_fields()
+        if selected is None:
+            return queryset
+
+        columns = self.get_sparse_columns(selected)
+        # Keyset pagination reads the ordering columns back from each row.
+        for term in queryset.query.order_by:
+            name = term.lstrip('-') if isinstance(term, str) else None
+            if name and name not in queryset.query.annotations:
+                columns.append(name)
+
+        relations = {column.split('__', 1)[0] for column in columns if '__' in column}
+        # A relation traversed with select_related must keep its FK column.
+        columns.extend(sorted(relations))
+        queryset = queryset.select_related(None)
+        if relations:
+            queryset = queryset.select_related(*sorted(relations))
+        if not any(name in selected for name in self.sparse_prefetch_fields()):
+            queryset = queryset.prefetch_related(None)
+        return queryset.only(*dict.fromkeys(columns))
+
+    def sparse_prefetch_fields(self):
+        """Serializer fields that rely on the queryset's prefetches."""
+        return []
@@ -0,0 +1,27 @@
+import threading
+
+
+class Counters:
+    """
+    Process-wide counters, safe to bump from any thread. Subclasses list
+    their counters in `fields` and may add derived values to `snapshot()`.
+    """
+
+    fields = ()
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            for name in self.fields:
+                setattr(self, name, 0)
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: getattr(self, name) for name in self.fields}
@@ -1,3 +1,1848 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import random
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import cbor2
+import msgpack
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.exceptions import ChannelFull
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.audit.models import AuditLog
+from apps.audit.writer import write_entries
+from task_management.channel_layers import SQLiteChannelLayer
+
+from . import rollups
+from .batch import TaskBatch
+from .caching import get_list_cache, stats as list_cache_stats
+from .consumers import TaskConsumer
+from .counters import COUNTER_FIELDS, count_tasks, get_counts, recount
+from .encodings import frames as encoded_frames
+from .memberships import MembershipCache, memberships
+from .fast_serializers import TaskValuesSerializer
+from .outbound import OutboundQueue, stats as outbound_stats
+from .overview import clear_snapshot
+from .models import (
+    RealtimeSequence,
+    Task,
+    TaskActivityRollup,
+    TaskCounter,
+    TaskPositionCounter,
+    TaskRoleAssignment,
+    TaskVisibility,
+)
+from .ranking import RANK_GAP, rebalance_positions, reserve_positions
+from .realtime import Event, EventBuffer, RealtimeDispatcher, full_task_list, publish, stats as realtime_stats
+from .renderers import UJSONRenderer
+from .replay import current_sequence, get_cache as get_replay_cache, missed_since
+from .rollups import ROLLUP_FIELDS
+from .serializers import TaskSerializer
+from .sparse import project
+from .versioning import GLOBAL_SCOPE, get_data_version, user_scope
+from .visibility import find_visibility_drift, rebuild_visibility
+
+
+# Expected query counts per endpoint, independent of page size and data volume.
+BUDGETS = {
+    'list': 6,
+    'retrieve': 4,
+    'retrieve_owner': 4,
+    'summary': 2,
+    'reorder': 9,
+    'move': 11,
+    'admin_overview': 4,
+}
+
+
+# The dispatcher thread numbers events in the database, which it cannot
+# share with the test's open transaction; publish inline instead.
+@override_settings(REALTIME_DISPATCH_ASYNC=False)
+class TaskAPITestCase(TestCase):
+    def setUp(self):
+        get_list_cache().clear()
+        list_cache_stats.reset()
+        clear_snapshot()
+        self.user = User.objects.create_user(username='owner', password='pass12345')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def run_commit_hooks(self):
+        """Run and clear on_commit hooks queued so far; TestCase never commits."""
+        hooks, connection.run_on_commit = connection.run_on_commit, []
+        for _, hook, _ in hooks:
+            hook()
+
+    def make_tasks(self, count, owner=None, **extra):
+        owner = owner or self.user
+        return [
+            Task.objects.create(
+                title=f'Task {index}',
+                description=f'Description {index}',
+                owner=owner,
+                position=index + 1,
+                **extra
+            )
+            for index in range(count)
+        ]
+
+
+class CursorPaginationTests(TaskAPITestCase):
+    def collect_ids(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        return ids
+
+    def test_walks_every_task_once_in_position_order(self):
+        tasks = self.make_tasks(7)
+        ids = self.collect_ids('/api/tasks/?cursor=&page_size=3')
+        expected = [task.id for task in sorted(tasks, key=lambda t: -t.position)]
+        self.assertEqual(ids, expected)
+
+    def test_priority_ordering_with_ties(self):
+        self.make_tasks(3, priority='High')
+        self.make_tasks(4, priority='Low')
+        ids = self.collect_ids('/api/tasks/?cursor=&page_size=2&ordering=-priority')
+        self.assertEqual(len(ids), 7)
+        self.assertEqual(len(set(ids)), 7)
+        priorities = list(Task.objects.filter(id__in=ids[:3]).values_list('priority', flat=True))
+        self.assertEqual(set(priorities), {'High'})
+
+    def test_previous_link_returns_prior_page(self):
+        self.make_tasks(5)
+        first = self.client.get('/api/tasks/?cursor=&page_size=2')
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(
+            [row['id'] for row in back.data['results']],
+            [row['id'] for row in first.data['results']],
+        )
+
+    def test_count_is_opt_in(self):
+        self.make_tasks(3)
+        response = self.client.get('/api/tasks/?cursor=')
+        self.assertNotIn('count', response.data)
+        response = self.client.get('/api/tasks/?cursor=&count=exact')
+        self.assertEqual(response.data['count'], 3)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/tasks/?cursor=garbage')
+        self.assertEqual(response.status_code, 404)
+
+    def test_page_number_mode_is_default(self):
+        self.make_tasks(3)
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.data['count'], 3)
+
+
+class QueryBudgetTests(TaskAPITestCase):
+    """
+    Pin the number of queries per endpoint so per-row lookups cannot creep
+    back in. Each request uses a fresh user instance so permission caches do
+    not leak between measurements.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.collaborator = User.objects.create_user(username='collaborator', password='pass12345')
+        self.admin = User.objects.create_superuser(username='admin', password='pass12345')
+        for user in (self.user, self.collaborator, self.admin):
+            get_data_version(user_scope(user.id))
+        get_data_version(GLOBAL_SCOPE)
+
+    def request_queries(self, user, method, url, data=None):
+        client = APIClient()
+        client.force_authenticate(user=User.objects.get(pk=user.pk))
+        self.run_commit_hooks()
+        # Work deferred to commit (audit rows, realtime payloads) counts too;
+        # publishing happens on the dispatcher thread and does not.
+        with mock.patch('apps.tasks.realtime.publish'), CaptureQueriesContext(connection) as captured:
+            response = getattr(client, method)(url, data, format='json')
+            self.run_commit_hooks()
+        self.assertLess(response.status_code, 400, response.data)
+        return len(captured)
+
+    def assign(self, tasks, user):
+        for task in tasks:
+            TaskRoleAssignment.objects.create(
+                task=task,
+                user=user,
+                assigned_by=self.user,
+                assigned_role=TaskRoleAssignment.ROLE_MEMBER,
+            )
+
+    def assertBudget(self, expected, user, method, url, data=None):
+        self.assertEqual(self.request_queries(user, method, url, data), expected)
+
+    def test_list(self):
+        self.assign(self.make_tasks(3), self.collaborator)
+        small = self.request_queries(self.collaborator, 'get', '/api/tasks/?page_size=2')
+        self.assign(self.make_tasks(20), self.collaborator)
+        self.assertBudget(small, self.collaborator, 'get', '/api/tasks/?page_size=20')
+        self.assertBudget(small - 1, self.collaborator, 'get', '/api/tasks/?cursor=&page_size=20')
+        self.assertEqual(small, BUDGETS['list'])
+
+    def test_retrieve(self):
+        task = self.make_tasks(1)[0]
+        self.assign([task], self.collaborator)
+        self.assertBudget(BUDGETS['retrieve'], self.collaborator, 'get', f'/api/tasks/{task.id}/')
+        self.assertBudget(BUDGETS['retrieve_owner'], self.user, 'get', f'/api/tasks/{task.id}/')
+
+    def test_summary(self):
+        self.make_tasks(5)
+        self.assertBudget(BUDGETS['summary'], self.user, 'get', '/api/tasks/summary/')
+
+    def test_reorder(self):
+        tasks = self.make_tasks(2)
+        # Boards normally have a position counter row already.
+        reserve_positions(self.user.id)
+        task_ids = [task.id for task in tasks]
+        self.assertBudget(BUDGETS['reorder'], self.user, 'post', '/api/tasks/reorder/', {'task_ids': task_ids})
+
+    def test_move(self):
+        tasks = self.make_tasks(3)
+        rebalance_positions(self.user.id)
+        self.assertBudget(
+            BUDGETS['move'], self.user, 'post', f'/api/tasks/{tasks[0].id}/move/', {'after_id': tasks[1].id}
+        )
+
+    def test_admin_overview(self):
+        self.make_tasks(3)
+        small = self.request_queries(self.admin, 'get', '/api/tasks/admin/overview/')
+        self.make_tasks(10, owner=self.collaborator)
+        clear_snapshot()
+        self.assertBudget(small, self.admin, 'get', '/api/tasks/admin/overview/')
+        self.assertEqual(small, BUDGETS['admin_overview'])
+        # Served from the snapshot, only the recent tasks are read.
+        self.assertBudget(small - 2, self.admin, 'get', '/api/tasks/admin/overview/')
+
+
+class TaskMoveTests(TaskAPITestCase):
+    def board(self):
+        return list(Task.objects.filter(owner=self.user).values_list('id', flat=True))
+
+    def move(self, task, **data):
+        return self.client.post(f'/api/tasks/{task.id}/move/', data, format='json')
+
+    def test_new_tasks_are_spaced_apart(self):
+        self.client.post('/api/tasks/', {'title': 'One', 'description': 'x'}, format='json')
+        self.client.post('/api/tasks/', {'title': 'Two', 'description': 'x'}, format='json')
+        positions = list(Task.objects.values_list('position', flat=True))
+        self.assertEqual(positions, [2 * RANK_GAP, RANK_GAP])
+
+    def test_create_takes_position_from_counter(self):
+        self.make_tasks(2)
+        self.client.post('/api/tasks/', {'title': 'One', 'description': 'x'}, format='json')
+        with CaptureQueriesContext(connection) as captured:
+            self.client.post('/api/tasks/', {'title': 'Two', 'description': 'x'}, format='json')
+        self.assertFalse([q for q in captured if 'MAX(' in q['sql']])
+        top = Task.objects.filter(owner=self.user).values_list('position', flat=True)[:2]
+        self.assertEqual(list(top), [2 + 2 * RANK_GAP, 2 + RANK_GAP])
+
+    def test_positions_grow_past_32_bits(self):
+        self.client.post('/api/tasks/', {'title': 'One', 'description': 'x'}, format='json')
+        TaskPositionCounter.objects.filter(user=self.user).update(last_position=2 ** 31)
+        response = self.client.post('/api/tasks/', {'title': 'Two', 'description': 'x'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Task.objects.get(title='Two').position, 2 ** 31 + RANK_GAP)
+
+    def test_reserve_range(self):
+        self.assertEqual(reserve_positions(self.user.id, 3), [RANK_GAP, 2 * RANK_GAP, 3 * RANK_GAP])
+        self.assertEqual(reserve_positions(self.user.id), [4 * RANK_GAP])
+        self.assertEqual(
+            TaskPositionCounter.objects.get(user=self.user).last_position, 4 * RANK_GAP
+        )
+
+    def test_rebalance_keeps_new_tasks_on_top(self):
+        a, b, c = reversed(self.make_tasks(3))
+        reserve_positions(self.user.id)
+        rebalance_positions(self.user.id)
+        self.move(c, before_id=a.id)
+        self.client.post('/api/tasks/', {'title': 'New', 'description': 'x'}, format='json')
+        new = Task.objects.get(title='New')
+        self.assertEqual(self.board(), [new.id, c.id, a.id, b.id])
+
+    def test_move_between_writes_one_row(self):
+        a, b, c = reversed(self.make_tasks(3))
+        rebalance_positions(self.user.id)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.move(c, after_id=a.id, before_id=b.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['rebalanced'], 0)
+        updates = [q['sql'] for q in captured if q['sql'].startswith('UPDATE "tasks_task"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.board(), [a.id, c.id, b.id])
+
+    def test_move_to_edges(self):
+        a, b, c = reversed(self.make_tasks(3))
+        rebalance_positions(self.user.id)
+        self.move(c, before_id=a.id)
+        self.assertEqual(self.board(), [c.id, a.id, b.id])
+        self.move(c, after_id=b.id)
+        self.assertEqual(self.board(), [a.id, b.id, c.id])
+
+    def test_dense_positions_are_rebalanced(self):
+        a, b, c, d = reversed(self.make_tasks(4))
+        response = self.move(d, after_id=a.id)
+        self.assertGreater(response.data['rebalanced'], 0)
+        self.assertEqual(self.board(), [a.id, d.id, b.id, c.id])
+        positions = list(Task.objects.filter(owner=self.user).values_list('position', flat=True))
+        self.assertEqual(len(set(positions)), 4)
+
+    def test_invalid_moves(self):
+        a, b, c = reversed(self.make_tasks(3))
+        other = User.objects.create_user(username='other', password='pass12345')
+        foreign = self.make_tasks(1, owner=other)[0]
+        self.assertEqual(self.move(a, after_id=c.id, before_id=b.id).status_code, 400)
+        self.assertEqual(self.move(a, after_id=foreign.id).status_code, 400)
+        self.assertEqual(self.move(a).status_code, 400)
+        self.assertEqual(self.move(foreign, after_id=a.id).status_code, 404)
+        self.assertEqual(self.board(), [a.id, b.id, c.id])
+
+    def test_reorder_uses_one_update(self):
+        tasks = self.make_tasks(4)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.post(
+                '/api/tasks/reorder/', {'task_ids': [task.id for task in tasks]}, format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['data']], [task.id for task in tasks])
+        updates = [q['sql'] for q in captured if q['sql'].startswith('UPDATE "tasks_task"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.board(), [task.id for task in tasks])
+
+
+class ReorderDeltaTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('apps.tasks.realtime._group_send')
+        self.send = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.tasks = list(reversed(self.make_tasks(4)))
+        rebalance_positions(self.user.id)
+        self.run_commit_hooks()
+        self.send.reset_mock()
+
+    def deltas(self):
+        return [
+            call.args[1]['data'] for call in self.send.call_args_list
+            if call.args[1]['event'] == 'tasks_reordered'
+        ]
+
+    def reorder(self, tasks):
+        self.client.post('/api/tasks/reorder/', {'task_ids': [task.id for task in tasks]}, format='json')
+
+    def test_reorder_sends_only_moved_rows(self):
+        a, b, c, d = self.tasks
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reorder([b, a, c, d])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reorder([b, a, c, d])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/tasks/{d.id}/move/', {'before_id': b.id}, format='json')
+        positions = dict(Task.objects.values_list('id', 'position'))
+        first, second = self.deltas()
+        self.assertEqual((first['previous_version'], first['version']), (0, 1))
+        self.assertEqual(
+            sorted(first['moved'], key=lambda row: row['id']),
+            sorted([{'id': a.id, 'position': 3 * RANK_GAP}, {'id': b.id, 'position': 4 * RANK_GAP}],
+                   key=lambda row: row['id']),
+        )
+        self.assertEqual((second['previous_version'], second['version']), (1, 2))
+        self.assertEqual(second['moved'], [{'id': d.id, 'position': positions[d.id]}])
+
+    def test_consecutive_deltas_are_merged(self):
+        def delta(previous_version, *moved):
+            return Event(self.user.id, 'tasks_reordered', {
+                'previous_version': previous_version,
+                'version': previous_version + 1,
+                'moved': [{'id': task_id, 'position': position} for task_id, position in moved],
+            })
+
+        buffer = EventBuffer()
+        buffer.add(delta(0, (1, 10), (2, 20)))
+        buffer.add(delta(1, (2, 30), (3, 40)))
+        [merged] = buffer.pop_all()
+        self.assertEqual((merged.data['previous_version'], merged.data['version']), (0, 2))
+        self.assertEqual(
+            merged.data['moved'],
+            [{'id': 1, 'position': 10}, {'id': 2, 'position': 30}, {'id': 3, 'position': 40}],
+        )
+
+        # A version sent by another worker in between keeps the gap visible.
+        buffer.add(delta(2))
+        buffer.add(delta(4))
+        self.assertEqual([event.data['version'] for event in buffer.pop_all()], [3, 5])
+
+    def test_resync_payload_has_full_board_and_version(self):
+        a, b, c, d = self.tasks
+        self.reorder([b, a, c, d])
+        data = full_task_list(self.user.id)
+        self.assertEqual(data['version'], 1)
+        self.assertEqual([row['id'] for row in data['tasks']], [b.id, a.id, c.id, d.id])
+
+
+class TaskBatchTests(TaskAPITestCase):
+    def batch(self, operations, **extra):
+        return self.client.post('/api/tasks/batch/', {'operations': operations, **extra}, format='json')
+
+    def test_mixed_batch_coalesces_side_effects(self):
+        keep, drop = self.make_tasks(2)
+        with mock.patch('apps.tasks.batch.broadcast_generic_event') as broadcast, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.batch([
+                {'op': 'create', 'data': {'title': 'New A', 'description': 'x'}},
+                {'op': 'create', 'data': {'title': 'New B', 'description': 'y', 'priority': 'High'}},
+                {'op': 'update', 'id': keep.id, 'data': {'status': 'Completed'}},
+                {'op': 'delete', 'id': drop.id},
+            ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['succeeded'], 4)
+        created_ids = [result['id'] for result in response.data['results'][:2]]
+        self.assertEqual(response.data['results'][1]['data']['priority'], 'High')
+        self.assertEqual(
+            list(Task.objects.filter(owner=self.user).values_list('id', flat=True)),
+            list(reversed(created_ids)) + [keep.id],
+        )
+        self.assertEqual(Task.objects.get(pk=keep.pk).status, 'Completed')
+        self.assertEqual(
+            sorted(AuditLog.objects.values_list('action', flat=True)),
+            ['Status Changed', 'Task Created', 'Task Created', 'Task Deleted', 'Task Updated'],
+        )
+        self.assertTrue(TaskVisibility.objects.filter(user=self.user, task_id=created_ids[0]).exists())
+        broadcast.assert_called_once()
+        event = broadcast.call_args.args[2]
+        self.assertEqual(event['deleted'], [drop.id])
+        self.assertEqual(len(event['created']), 2)
+
+    def test_item_errors_do_not_abort_the_batch(self):
+        task, twice = self.make_tasks(2)
+        other = User.objects.create_user(username='other', password='pass12345')
+        foreign = self.make_tasks(1, owner=other)[0]
+        response = self.batch([
+            {'op': 'update', 'id': task.id, 'data': {'status': 'Nope'}},
+            {'op': 'delete', 'id': foreign.id},
+            {'op': 'archive', 'id': task.id},
+            {'op': 'update', 'id': twice.id, 'data': {'title': 'Renamed'}},
+            {'op': 'delete', 'id': twice.id},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['error'] * 5,
+        )
+        self.assertIn('status', response.data['results'][0]['errors'])
+        self.assertEqual(response.data['results'][1]['errors'], {'detail': 'Not found.'})
+        response = self.batch([
+            {'op': 'update', 'id': task.id, 'data': {'status': 'Nope'}},
+            {'op': 'create', 'data': {'title': 'Kept', 'description': 'x'}},
+        ])
+        self.assertEqual([result['status'] for result in response.data['results']], ['error', 'ok'])
+        self.assertTrue(Task.objects.filter(title='Kept').exists())
+
+    def test_atomic_batch_is_all_or_nothing(self):
+        task = self.make_tasks(1)[0]
+        response = self.batch([
+            {'op': 'create', 'data': {'title': 'Skipped', 'description': 'x'}},
+            {'op': 'delete', 'id': task.id},
+            {'op': 'update', 'id': 999999, 'data': {'title': 'Missing'}},
+        ], atomic=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [result['status'] for result in response.data['results']],
+            ['skipped', 'skipped', 'error'],
+        )
+        self.assertEqual(list(Task.objects.values_list('id', flat=True)), [task.id])
+
+    def test_updates_only_write_their_own_fields(self):
+        first, second = self.make_tasks(2)
+        apply = TaskBatch.apply
+
+        def apply_after_concurrent_edit(batch):
+            # A PATCH that committed after this batch read its targets.
+            Task.objects.filter(pk=first.pk).update(title='Concurrent')
+            return apply(batch)
+
+        with mock.patch.object(TaskBatch, 'apply', apply_after_concurrent_edit):
+            response = self.batch([
+                {'op': 'update', 'id': first.id, 'data': {'status': 'Completed'}},
+                {'op': 'update', 'id': second.id, 'data': {'title': 'Renamed'}},
+            ])
+        self.assertEqual(response.status_code, 200)
+        first.refresh_from_db()
+        self.assertEqual((first.title, first.status), ('Concurrent', 'Completed'))
+        self.assertEqual(Task.objects.get(pk=second.pk).title, 'Renamed')
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        def count(size):
+            tasks = self.make_tasks(size)
+            operations = [{'op': 'update', 'id': task.id, 'data': {'priority': 'Low'}} for task in tasks]
+            operations += [{'op': 'create', 'data': {'title': f'T{i}', 'description': 'x'}} for i in range(size)]
+            with CaptureQueriesContext(connection) as captured:
+                self.assertEqual(self.batch(operations).status_code, 200)
+            return len(captured)
+
+        count(1)
+        self.assertEqual(count(2), count(12))
+
+
+class ChangeTrackingTests(TaskAPITestCase):
+    def test_dirty_fields_come_from_the_loaded_snapshot(self):
+        task = Task.objects.get(pk=self.make_tasks(1)[0].pk)
+        self.assertEqual(task.get_dirty_fields(), {})
+        task.title = 'Renamed'
+        with self.assertNumQueries(0):
+            self.assertEqual(task.get_dirty_fields(), {'title': ('Task 0', 'Renamed')})
+        task.save()
+        self.assertEqual(task.get_dirty_fields(), {})
+
+    def test_deferred_fields_join_the_snapshot_when_loaded(self):
+        task = Task.objects.only('id', 'title').get(pk=self.make_tasks(1)[0].pk)
+        task.status = 'Completed'
+        self.assertEqual(task.get_dirty_fields(), {})
+        task = Task.objects.only('id', 'title').get(pk=task.pk)
+        self.assertEqual(task.description, 'Description 0')
+        task.description = 'Changed'
+        self.assertEqual(task.get_dirty_fields(), {'description': ('Description 0', 'Changed')})
+
+    def test_update_does_not_refetch_the_task(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = self.make_tasks(1)[0]
+            with CaptureQueriesContext(connection) as captured:
+                response = self.client.patch(f'/api/tasks/{task.id}/', {'status': 'Completed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        task_selects = [
+            q['sql'] for q in captured
+            if q['sql'].startswith('SELECT') and 'FROM "tasks_task"' in q['sql'] and 'COUNT' not in q['sql']
+        ]
+        self.assertEqual(len(task_selects), 1)
+        self.assertEqual(
+            list(AuditLog.objects.filter(task=task).values_list('action', flat=True).order_by('id')),
+            ['Task Created', 'Status Changed', 'Task Updated'],
+        )
+
+    def test_unloaded_instance_save_is_diffed_against_the_row(self):
+        other = User.objects.create_user(username='other', password='pass12345')
+        with self.captureOnCommitCallbacks(execute=True):
+            task = self.make_tasks(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            Task(
+                pk=task.pk, title='Handed over', description=task.description, owner=other,
+                position=task.position, status='Completed', priority=task.priority, created_at=task.created_at,
+            ).save()
+        self.assertEqual(list(TaskVisibility.objects.filter(task=task).values_list('user_id', flat=True)), [other.id])
+        self.assertEqual(get_counts(self.user.id)['total_tasks'], 0)
+        self.assertEqual(get_counts(other.id)['completed'], 1)
+        self.assertEqual(
+            list(AuditLog.objects.filter(task=task).values_list('action', flat=True).order_by('id')),
+            ['Task Created', 'Status Changed', 'Task Updated'],
+        )
+
+    def test_deferred_field_change_is_audited(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = self.make_tasks(1)[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            partial = Task.objects.only('id', 'owner', 'position').get(pk=task.pk)
+            partial.status = 'Completed'
+            partial.save()
+        self.assertEqual(get_counts(self.user.id)['completed'], 1)
+        self.assertEqual(
+            list(AuditLog.objects.filter(task=task).values_list('action', flat=True).order_by('id')),
+            ['Task Created', 'Status Changed', 'Task Updated'],
+        )
+
+    def test_role_assignments_are_audited(self):
+        member = User.objects.create_user(username='member', password='pass12345')
+        with self.captureOnCommitCallbacks(execute=True):
+            task = self.make_tasks(1)[0]
+            url = f'/api/tasks/{task.id}/roles/'
+            response = self.client.post(
+                url, {'user_id': member.id, 'assigned_role': TaskRoleAssignment.ROLE_MEMBER}, format='json'
+            )
+            self.assertEqual(response.status_code, 201)
+            assignment_id = response.data['id']
+            self.client.patch(
+                f'{url}{assignment_id}/', {'assigned_role': TaskRoleAssignment.ROLE_REVIEWER}, format='json'
+            )
+            self.client.delete(f'{url}{assignment_id}/')
+        logs = AuditLog.objects.filter(task=task, action__startswith='Role').order_by('id')
+        self.assertEqual(
+            [log.action for log in logs],
+            ['Role Assigned', 'Role Updated', 'Role Revoked'],
+        )
+        self.assertEqual(
+            json.loads(logs[1].changed_data)['assigned_role'],
+            {'old': 'Member', 'new': 'Reviewer'},
+        )
+        self.assertTrue(all(log.user_id == self.user.id for log in logs))
+
+
+class RealtimeDispatchTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        realtime_stats.reset()
+        patcher = mock.patch('apps.tasks.realtime._group_send')
+        self.send = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def published(self):
+        return [(call.args[0], call.args[1]['event'], call.args[1]['data']) for call in self.send.call_args_list]
+
+    def test_nothing_is_sent_before_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post('/api/tasks/', {'title': 'One', 'description': 'x'}, format='json')
+        self.send.assert_not_called()
+        for callback in callbacks:
+            callback()
+        self.assertEqual([event for _, event, _ in self.published()], ['task_created', 'task_summary'])
+
+    def test_redundant_events_are_merged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            task = self.make_tasks(1)[0]
+            task.title = 'Renamed'
+            task.save()
+            task.status = 'Completed'
+            task.save()
+            doomed = self.make_tasks(1)[0]
+            doomed.title = 'Soon gone'
+            doomed.save()
+        doomed_id = doomed.id
+        with self.captureOnCommitCallbacks(execute=True):
+            doomed.delete()
+        events = self.published()
+        self.assertEqual(
+            [event for _, event, _ in events],
+            ['task_created', 'task_created', 'task_summary', 'task_deleted', 'task_summary'],
+        )
+        self.assertEqual(events[0][2]['status'], 'Completed')
+        self.assertEqual(events[2][2]['total_tasks'], 2)
+        self.assertEqual(events[3][2], {'id': doomed_id})
+        self.assertEqual(events[4][2]['total_tasks'], 1)
+        snapshot = realtime_stats.snapshot()
+        self.assertEqual(snapshot['published'], 5)
+        self.assertEqual(snapshot['queued'], snapshot['published'] + snapshot['merged'])
+
+    def test_update_then_delete_sends_only_the_delete(self):
+        task = self.make_tasks(1)[0]
+        self.run_commit_hooks()
+        self.send.reset_mock()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                task.title = 'Renamed'
+                task.save()
+                task.delete()
+        self.assertEqual([event for _, event, _ in self.published()], ['task_deleted', 'task_summary'])
+
+    def test_rolled_back_events_are_dropped(self):
+        self.run_commit_hooks()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self.make_tasks(2)
+                    raise ValueError
+            except ValueError:
+                pass
+            self.make_tasks(1)
+        self.assertEqual([event for _, event, _ in self.published()], ['task_created', 'task_summary'])
+        self.assertEqual(realtime_stats.snapshot()['dropped'], 3)
+
+    def test_background_dispatcher_merges_pending_batches(self):
+        sent = []
+        release = threading.Event()
+
+        def send(user_id, message):
+            release.wait(5)
+            sent.append((threading.current_thread().name, message['event'], message['data']))
+
+        dispatcher = RealtimeDispatcher(send=send)
+        with mock.patch('apps.tasks.realtime.reserve_sequences', side_effect=lambda counts: dict.fromkeys(counts, 1)), \
+                mock.patch('apps.tasks.realtime.record', side_effect=lambda user_id, message, seq: message):
+            dispatcher.submit([Event(self.user.id, 'task_summary', {'total_tasks': 1})])
+            dispatcher.submit([Event(self.user.id, 'task_summary', {'total_tasks': 2})])
+            dispatcher.submit([Event(self.user.id, 'task_summary', {'total_tasks': 3})])
+            release.set()
+            dispatcher.shutdown()
+        self.assertEqual(sent[0][0], 'realtime-dispatcher')
+        self.assertLessEqual(len(sent), 2)
+        self.assertEqual(sent[-1][2], {'total_tasks': 3})
+
+
+@override_settings(REALTIME_REPLAY_SIZE=4)
+class EventReplayTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        get_replay_cache().clear()
+        encoded_frames.clear()
+        self.run_commit_hooks()
+
+    def publish_summaries(self, count):
+        for _ in range(count):
+            self.make_tasks(1)
+            self.run_commit_hooks()
+
+    def test_events_are_numbered_and_kept_for_replay(self):
+        with mock.patch('apps.tasks.realtime._group_send') as send:
+            self.publish_summaries(2)
+        seqs = [call.args[1]['seq'] for call in send.call_args_list]
+        self.assertEqual(seqs, [1, 2, 3, 4])
+        self.assertEqual(current_sequence(self.user.id), 4)
+        self.assertEqual([message['seq'] for message in missed_since(self.user.id, 1)], [2, 3, 4])
+        self.assertEqual(missed_since(self.user.id, 4), [])
+        self.assertIsNone(missed_since(self.user.id, 5))
+
+    def test_gap_beyond_the_buffer_needs_a_resync(self):
+        self.publish_summaries(3)
+        self.assertEqual(current_sequence(self.user.id), 6)
+        self.assertEqual([message['seq'] for message in missed_since(self.user.id, 2)], [3, 4, 5, 6])
+        self.assertIsNone(missed_since(self.user.id, 1))
+
+    def test_sequence_survives_losing_the_cache(self):
+        self.publish_summaries(1)
+        get_replay_cache().clear()
+        with mock.patch('apps.tasks.realtime._group_send') as send:
+            self.publish_summaries(1)
+        self.assertEqual([call.args[1]['seq'] for call in send.call_args_list], [3, 4])
+        self.assertIsNone(missed_since(self.user.id, 1))
+
+    def test_out_of_order_events_need_a_resync(self):
+        self.publish_summaries(1)
+        token = AccessToken.for_user(self.user)
+        group = f'user_tasks_{self.user.id}'
+
+        def event(seq):
+            return {'type': 'task_event', 'event': 'task_summary', 'data': {'total_tasks': seq}, 'seq': seq}
+
+        async def run():
+            communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), f'/ws/tasks/?token={token}')
+            await communicator.connect()
+            frames = [await communicator.receive_json_from()]
+            for seq in (3, 5, 4, 6):
+                await get_channel_layer().group_send(group, event(seq))
+                frames.append(await communicator.receive_json_from())
+            # Already numbered when the socket connected.
+            await get_channel_layer().group_send(group, event(2))
+            self.assertTrue(await communicator.receive_nothing(0.05))
+            await communicator.disconnect()
+            return frames
+
+        frames = async_to_sync(run)()
+        self.assertEqual(
+            [(frame['event'], frame['data']) for frame in frames[1:]],
+            [('task_summary', {'total_tasks': 3}), ('resync_required', {'seq': 5}),
+             ('resync_required', {'seq': 5}), ('task_summary', {'total_tasks': 6})],
+        )
+
+    def test_sequences_are_reserved_once_per_user_and_batch(self):
+        with mock.patch('apps.tasks.realtime._group_send') as send, \
+                mock.patch('apps.tasks.realtime._send_to_group'):
+            publish([Event(self.user.id, 'task_summary', {})])
+            with CaptureQueriesContext(connection) as captured:
+                publish([Event(self.user.id, 'task_updated', {'id': task_id}) for task_id in (1, 2, 3)])
+        self.assertEqual([call.args[1]['seq'] for call in send.call_args_list], [1, 2, 3, 4])
+        self.assertEqual(len(captured), 1)
+        self.assertIn('tasks_realtimesequence', captured[0]['sql'])
+
+    def test_events_for_deleted_users_are_dropped(self):
+        gone = User.objects.create_user(username='gone', password='pass12345')
+        gone_id = gone.id
+        gone.delete()
+        realtime_stats.reset()
+        with mock.patch('apps.tasks.realtime._group_send') as send, \
+                self.assertNoLogs('apps.tasks.realtime', 'ERROR'):
+            publish([Event(gone_id, 'task_summary', {})])
+        send.assert_not_called()
+        self.assertFalse(RealtimeSequence.objects.filter(user_id=gone_id).exists())
+        self.assertEqual(realtime_stats.snapshot()['dropped'], 1)
+
+    def connect(self, query=''):
+        token = AccessToken.for_user(self.user)
+        communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), f'/ws/tasks/?token={token}{query}')
+
+        async def run():
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            frames = [await communicator.receive_json_from()]
+            while not await communicator.receive_nothing(0.05):
+                frames.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return frames
+
+        return async_to_sync(run)()
+
+    def test_reconnect_replays_missed_events(self):
+        self.publish_summaries(2)
+        connected, *replayed = self.connect('&since=2')
+        self.assertEqual(connected['data']['seq'], 4)
+        self.assertEqual(
+            [(frame['seq'], frame['event']) for frame in replayed],
+            [(3, 'task_created'), (4, 'task_summary')],
+        )
+
+    def test_reconnect_past_the_buffer_gets_resync_required(self):
+        self.publish_summaries(3)
+        frames = self.connect('&since=1')
+        self.assertEqual(
+            [(frame['event'], frame['data'].get('seq')) for frame in frames],
+            [('connected', 6), ('resync_required', 6)],
+        )
+
+
+class WebSocketEncodingTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        encoded_frames.clear()
+        self.token = AccessToken.for_user(self.user)
+
+    def communicator(self, query='', subprotocols=None):
+        return WebsocketCommunicator(
+            TaskConsumer.as_asgi(), f'/ws/tasks/?token={self.token}{query}', subprotocols=subprotocols
+        )
+
+    def test_subprotocol_selects_binary_frames(self):
+        async def run():
+            communicator = self.communicator(subprotocols=['msgpack'])
+            connected, subprotocol = await communicator.connect()
+            hello = msgpack.unpackb(await communicator.receive_from())
+            await communicator.send_to(bytes_data=msgpack.packb({'type': 'ping'}))
+            pong = msgpack.unpackb(await communicator.receive_from())
+            await communicator.disconnect()
+            return connected, subprotocol, hello, pong
+
+        connected, subprotocol, hello, pong = async_to_sync(run)()
+        self.assertTrue(connected)
+        self.assertEqual(subprotocol, 'msgpack')
+        self.assertEqual(hello['event'], 'connected')
+        self.assertEqual(pong, {'event': 'pong'})
+
+    def send_to_sockets(self, count, events):
+        async def run():
+            sockets = [self.communicator('&encoding=cbor') for _ in range(count)]
+            for communicator in sockets:
+                await communicator.connect()
+                await communicator.receive_from()
+            received = []
+            for event in events:
+                await get_channel_layer().group_send(f'user_tasks_{self.user.id}', event)
+                received.append([cbor2.loads(await communicator.receive_from()) for communicator in sockets])
+            for communicator in sockets:
+                await communicator.disconnect()
+            return received
+
+        return async_to_sync(run)()
+
+    def test_event_is_encoded_once_for_every_socket(self):
+        event = {'type': 'task_event', 'event': 'task_summary', 'data': {'total_tasks': 3}, 'seq': 1, 'event_id': 'a'}
+        [received] = self.send_to_sockets(3, [event])
+        self.assertEqual(received, [{'event': 'task_summary', 'data': {'total_tasks': 3}, 'seq': 1}] * 3)
+        self.assertEqual((encoded_frames.misses, encoded_frames.hits), (1, 2))
+
+    def test_frames_are_keyed_on_the_event_not_its_seq(self):
+        # A later event with the same seq must not get the earlier frame.
+        events = [
+            {'type': 'task_event', 'event': 'task_summary', 'data': {'total_tasks': total}, 'seq': 1, 'event_id': key}
+            for total, key in ((1, 'a'), (2, 'b'))
+        ]
+        first, = self.send_to_sockets(1, events[:1])
+        second, = self.send_to_sockets(1, events[1:])
+        self.assertEqual((first[0]['data'], second[0]['data']), ({'total_tasks': 1}, {'total_tasks': 2}))
+        self.assertEqual(encoded_frames.misses, 2)
+
+    def test_batch_payloads_are_trimmed_to_the_socket_fields(self):
+        row = {'id': 1, 'title': 'A', 'description': 'x', 'status': 'Pending'}
+        event = {
+            'type': 'task_event',
+            'event': 'tasks_batch',
+            'data': {'created': [row], 'updated': [dict(row, id=2)], 'deleted': [3]},
+            'seq': 1,
+            'event_id': 'a',
+        }
+
+        async def run():
+            communicator = self.communicator('&fields=id,title')
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await get_channel_layer().group_send(f'user_tasks_{self.user.id}', event)
+            received = await communicator.receive_json_from()
+            await communicator.disconnect()
+            return received
+
+        self.assertEqual(async_to_sync(run)()['data'], {
+            'created': [{'id': 1, 'title': 'A'}],
+            'updated': [{'id': 2, 'title': 'A'}],
+            'deleted': [3],
+        })
+
+    def test_unknown_encoding_is_rejected(self):
+        async def run():
+            communicator = self.communicator('&encoding=xml')
+            connected, code = await communicator.connect()
+            return connected, code
+
+        self.assertEqual(async_to_sync(run)(), (False, 4400))
+
+
+class OutboundQueueTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        outbound_stats.reset()
+
+    def event(self, name, data, seq=None):
+        return Event(self.user.id, name, data, seq=seq)
+
+    def test_pending_events_are_coalesced(self):
+        outbound = OutboundQueue(limit=10)
+        for total in range(3):
+            outbound.put(self.event('task_summary', {'total_tasks': total}))
+        outbound.put(self.event('task_updated', {'id': 1, 'title': 'Old'}))
+        outbound.put(self.event('task_updated', {'id': 1, 'title': 'New'}))
+        outbound.put(self.event('task_created', {'id': 2}))
+        events = async_to_sync(outbound.get)()
+        self.assertEqual(
+            [(event.event, event.data) for event in events],
+            [('task_summary', {'total_tasks': 2}), ('task_updated', {'id': 1, 'title': 'New'}),
+             ('task_created', {'id': 2})],
+        )
+        snapshot = outbound_stats.snapshot()
+        self.assertEqual((snapshot['queued'], snapshot['merged'], snapshot['max_depth']), (6, 3, 3))
+
+    def test_merged_events_lose_their_frame_key(self):
+        outbound = OutboundQueue(limit=10)
+        outbound.put(Event(self.user.id, 'task_created', {'id': 1}, seq=1, event_id='a'))
+        outbound.put(Event(self.user.id, 'task_updated', {'id': 1}, seq=2, event_id='b'))
+        outbound.put(Event(self.user.id, 'task_updated', {'id': 2}, seq=3, event_id='c'))
+        outbound.put(Event(self.user.id, 'task_updated', {'id': 2}, seq=4, event_id='d'))
+        events = async_to_sync(outbound.get)()
+        self.assertEqual([(event.event, event.event_id) for event in events],
+                         [('task_created', None), ('task_updated', 'd')])
+
+    def test_overflow_replaces_backlog_with_resync(self):
+        outbound = OutboundQueue(limit=3)
+        for seq in range(1, 5):
+            outbound.put(self.event('task_updated', {'id': seq}, seq=seq))
+        [event] = async_to_sync(outbound.get)()
+        self.assertEqual((event.event, event.data), ('resync_required', {'seq': 4}))
+        snapshot = outbound_stats.snapshot()
+        self.assertEqual((snapshot['overflows'], snapshot['dropped']), (1, 4))
+
+    def test_stalled_until_a_write_completes(self):
+        outbound = OutboundQueue(slow_timeout=5)
+        with mock.patch('apps.tasks.outbound.time.monotonic', return_value=100):
+            outbound.put(self.event('task_summary', {}))
+        with mock.patch('apps.tasks.outbound.time.monotonic', return_value=106):
+            self.assertTrue(outbound.stalled())
+            outbound.written(len(async_to_sync(outbound.get)()))
+            self.assertFalse(outbound.stalled())
+
+    def test_slow_client_is_disconnected(self):
+        token = AccessToken.for_user(self.user)
+        event = {'type': 'task_event', 'event': 'task_summary', 'data': {'total_tasks': 1}}
+
+        async def run():
+            communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), f'/ws/tasks/?token={token}')
+            await communicator.connect()
+            await communicator.receive_json_from()
+            group = f'user_tasks_{self.user.id}'
+            await get_channel_layer().group_send(group, event)
+            first = await communicator.receive_json_from()
+            with mock.patch.object(OutboundQueue, 'stalled', return_value=True):
+                await get_channel_layer().group_send(group, event)
+                closed = await communicator.receive_output()
+            await communicator.wait()
+            return first, closed
+
+        first, closed = async_to_sync(run)()
+        self.assertEqual(first['data'], {'total_tasks': 1})
+        self.assertEqual(closed, {'type': 'websocket.close', 'code': 4408})
+        self.assertEqual(outbound_stats.snapshot()['slow_disconnects'], 1)
+
+
+class ConnectSnapshotTests(TaskAPITestCase):
+    def connect(self, query):
+        token = AccessToken.for_user(self.user)
+
+        async def run():
+            communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), f'/ws/tasks/?token={token}{query}')
+            await communicator.connect()
+            frames = [await communicator.receive_json_from(), await communicator.receive_json_from()]
+            await communicator.disconnect()
+            return frames
+
+        return async_to_sync(run)()
+
+    def test_snapshot_follows_connected(self):
+        tasks = self.make_tasks(3, status='Completed')
+        connected, snapshot = self.connect('&snapshot=2&fields=id,title')
+        self.assertEqual(connected['event'], 'connected')
+        self.assertEqual(snapshot['event'], 'snapshot')
+        data = snapshot['data']
+        self.assertEqual(data['version'], get_data_version(user_scope(self.user.id)))
+        self.assertEqual(data['summary']['completed'], 3)
+        self.assertEqual(data['tasks'], [{'id': task.id, 'title': task.title} for task in tasks[:0:-1]])
+
+    def test_snapshot_is_cached_until_the_data_changes(self):
+        self.make_tasks(2)
+        first = self.connect('&snapshot=5')[1]['data']
+        list_cache_stats.reset()
+        self.assertEqual(self.connect('&snapshot=5')[1]['data'], first)
+        self.assertEqual(list_cache_stats.snapshot()['hits'], 1)
+        self.make_tasks(1)
+        self.assertEqual(len(self.connect('&snapshot=5')[1]['data']['tasks']), 3)
+        self.assertEqual(list_cache_stats.snapshot()['misses'], 1)
+
+
+class MembershipCacheTests(SimpleTestCase):
+    def test_sockets_share_one_entry_reloaded_once_per_generation(self):
+        loads = []
+
+        def load(user_id):
+            loads.append(user_id)
+            return frozenset({len(loads)})
+
+        cache = MembershipCache(load=load)
+        self.assertEqual(cache.connect(7), {1})
+        self.assertEqual(cache.connect(7), {1})
+        self.assertEqual(cache.refresh(7, 'a'), {2})
+        self.assertEqual(cache.refresh(7, 'a'), {2})
+        self.assertEqual(loads, [7, 7])
+        cache.disconnect(7)
+        self.assertIn(7, cache)
+        cache.disconnect(7)
+        self.assertNotIn(7, cache)
+
+
+class TaskGroupTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        memberships.clear()
+        self.collaborator = User.objects.create_user(username='collaborator', password='pass12345')
+        self.task = self.make_tasks(1)[0]
+        self.run_commit_hooks()
+
+    def commit(self, func):
+        with self.captureOnCommitCallbacks(execute=True):
+            func()
+
+    def assign(self):
+        self.assignment = TaskRoleAssignment.objects.create(
+            task=self.task, user=self.collaborator, assigned_role='Member', assigned_by=self.user
+        )
+
+    def rename(self, title):
+        self.task.title = title
+        self.task.save()
+
+    def test_collaborator_follows_shared_tasks(self):
+        token = AccessToken.for_user(self.collaborator)
+
+        async def run():
+            communicator = WebsocketCommunicator(TaskConsumer.as_asgi(), f'/ws/tasks/?token={token}')
+            await communicator.connect()
+            await communicator.receive_json_from()
+            await database_sync_to_async(self.commit)(lambda: self.rename('Before sharing'))
+            before = await communicator.receive_nothing(0.1)
+            await database_sync_to_async(self.commit)(self.assign)
+            await communicator.receive_nothing(0.1)
+            await database_sync_to_async(self.commit)(lambda: self.rename('Shared'))
+            shared = await communicator.receive_json_from()
+            await database_sync_to_async(self.commit)(self.assignment.delete)
+            await communicator.receive_nothing(0.1)
+            await database_sync_to_async(self.commit)(lambda: self.rename('After sharing'))
+            after = await communicator.receive_nothing(0.1)
+            await communicator.disconnect()
+            return before, shared, after
+
+        before, shared, after = async_to_sync(run)()
+        self.assertTrue(before)
+        self.assertEqual((shared['event'], shared['data']['title'], shared['seq']), ('task_updated', 'Shared', None))
+        self.assertTrue(after)
+        self.assertNotIn(self.collaborator.id, memberships)
+
+    def test_collaborator_sockets_share_one_frame(self):
+        self.commit(self.assign)
+        token = AccessToken.for_user(self.collaborator)
+        encoded_frames.clear()
+
+        async def run():
+            sockets = [
+                WebsocketCommunicator(TaskConsumer.as_asgi(), f'/ws/tasks/?token={token}') for _ in range(2)
+            ]
+            for communicator in sockets:
+                await communicator.connect()
+                await communicator.receive_json_from()
+            await database_sync_to_async(self.commit)(lambda: self.rename('Shared'))
+            received = [await communicator.receive_json_from() for communicator in sockets]
+            for communicator in sockets:
+                await communicator.disconnect()
+            return received
+
+        first, second = async_to_sync(run)()
+        self.assertEqual(first, second)
+        self.assertEqual((encoded_frames.misses, encoded_frames.hits), (1, 1))
+
+    def test_membership_changes_are_queued_for_the_dispatcher(self):
+        def assign_and_unassign():
+            self.assign()
+            self.assignment.delete()
+
+        with override_settings(REALTIME_DISPATCH_ASYNC=True), \
+                mock.patch('apps.tasks.realtime.get_dispatcher') as dispatcher, \
+                mock.patch('apps.tasks.realtime._group_send') as send:
+            self.commit(assign_and_unassign)
+        send.assert_not_called()
+        events = [event for call in dispatcher().submit.call_args_list for event in call.args[0]]
+        [event] = [event for event in events if event.event == 'task_memberships']
+        self.assertEqual(event.user_id, self.collaborator.id)
+        self.assertEqual(set(event.message()), {'type', 'generation'})
+
+    def test_batch_changes_reach_collaborators(self):
+        self.commit(self.assign)
+        with self.captureOnCommitCallbacks(execute=True):
+            private = self.make_tasks(1)[0]
+
+        def batch(*operations):
+            with mock.patch('apps.tasks.realtime._send_to_group') as to_group, \
+                    mock.patch('apps.tasks.realtime._group_send') as to_user:
+                self.commit(lambda: self.client.post(
+                    '/api/tasks/batch/', {'operations': list(operations)}, format='json'
+                ))
+            group_messages = [(call.args[0], call.args[1]['event']) for call in to_group.call_args_list]
+            memberships_for = [call.args[0] for call in to_user.call_args_list
+                               if call.args[1]['type'] == 'task_memberships']
+            return group_messages, memberships_for, to_group
+
+        group_messages, memberships_for, to_group = batch(
+            {'op': 'update', 'id': self.task.id, 'data': {'title': 'Batched'}},
+            {'op': 'update', 'id': private.id, 'data': {'title': 'Private'}},
+        )
+        self.assertEqual(group_messages, [(f'task_{self.task.id}', 'task_updated')])
+        self.assertEqual(to_group.call_args.args[1]['data']['title'], 'Batched')
+        self.assertEqual(memberships_for, [])
+
+        group_messages, memberships_for, _ = batch({'op': 'delete', 'id': self.task.id})
+        self.assertEqual(group_messages, [(f'task_{self.task.id}', 'task_deleted')])
+        self.assertEqual(memberships_for, [self.collaborator.id])
+
+    def test_update_publishes_once_to_the_task_group(self):
+        self.commit(self.assign)
+        with mock.patch('apps.tasks.realtime._send_to_group') as send, CaptureQueriesContext(connection) as captured:
+            self.commit(lambda: self.rename('Renamed'))
+        groups = [call.args[0] for call in send.call_args_list]
+        self.assertEqual(groups.count(f'task_{self.task.id}'), 1)
+        self.assertNotIn('tasks_taskroleassignment', ' '.join(query['sql'] for query in captured))
+
+
+class SQLiteChannelLayerTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'channels.sqlite3')
+
+    def layer(self, **options):
+        return SQLiteChannelLayer(path=self.path, poll_interval=0.005, **options)
+
+    def test_group_send_reaches_other_processes(self):
+        async def scenario():
+            worker_a, worker_b = self.layer(), self.layer()
+            local = await worker_a.new_channel()
+            remote = await worker_b.new_channel()
+            await worker_a.group_add('user_tasks_1', local)
+            await worker_b.group_add('user_tasks_1', remote)
+            await worker_a.group_send('user_tasks_1', {'type': 'task_event', 'n': 1})
+            received = await asyncio.wait_for(
+                asyncio.gather(worker_a.receive(local), worker_b.receive(remote)), 2
+            )
+            await worker_b.group_discard('user_tasks_1', remote)
+            await worker_a.group_send('user_tasks_1', {'type': 'task_event', 'n': 2})
+            self.assertEqual((await asyncio.wait_for(worker_a.receive(local), 2))['n'], 2)
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(worker_b.receive(remote), 0.1)
+            await worker_a.close()
+            await worker_b.close()
+            return received
+
+        self.assertEqual([message['n'] for message in async_to_sync(scenario)()], [1, 1])
+
+    def test_group_membership_expires(self):
+        async def scenario():
+            sender, receiver = self.layer(), self.layer(group_expiry=0.05)
+            channel = await receiver.new_channel()
+            await receiver.group_add('expiring', channel)
+            await asyncio.sleep(0.1)
+            await sender.group_send('expiring', {'type': 'task_event'})
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(receiver.receive(channel), 0.1)
+            await receiver.close()
+
+        async_to_sync(scenario)()
+
+    def test_capacity_is_enforced_per_channel(self):
+        async def scenario():
+            sender = self.layer(capacity=2, channel_capacity={'worker-*': 3})
+            for _ in range(3):
+                await sender.send('worker-jobs', {'type': 'job'})
+            with self.assertRaises(ChannelFull):
+                await sender.send('worker-jobs', {'type': 'job'})
+            receiver = self.layer(capacity=2)
+            channel = await receiver.new_channel()
+            await receiver.group_add('busy', channel)
+            for n in range(4):
+                await sender.group_send('busy', {'type': 'task_event', 'n': n})
+            first = await asyncio.wait_for(receiver.receive(channel), 2)
+            second = await asyncio.wait_for(receiver.receive(channel), 2)
+            self.assertEqual([first['n'], second['n']], [0, 1])
+            self.assertEqual((await receiver.receive('worker-jobs'))['type'], 'job')
+            await receiver.close()
+
+        async_to_sync(scenario)()
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_channel_layers', messages=40, groups=2, stdout=out)
+        self.assertIn('SQLiteChannelLayer (cross process)', out.getvalue())
+
+
+def explain_problems(sql):
+    """
+    Return the sequential scans and explicit sorts in the plan of `sql`.
+    SQLite reports them as a bare `SCAN table` and `USE TEMP B-TREE`;
+    PostgreSQL as `Seq Scan` and `Sort` nodes once seq scans are penalized.
+    """
+    problems = []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            nodes = [plan[0]['Plan']]
+            while nodes:
+                node = nodes.pop()
+                if node['Node Type'] == 'Seq Scan':
+                    problems.append(f"seq scan on {node['Relation Name']}")
+                elif node['Node Type'] in ('Sort', 'Incremental Sort'):
+                    problems.append('sort')
+                nodes.extend(node.get('Plans', []))
+        else:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            for row in cursor.fetchall():
+                detail = row[-1]
+                if detail.startswith('SCAN') and ' USING ' not in detail:
+                    problems.append(detail)
+                elif 'TEMP B-TREE' in detail:
+                    problems.append(detail)
+    return problems
+
+
+class QueryPlanTests(TaskAPITestCase):
+    """
+    Run EXPLAIN on the queries behind the hot endpoints against a seeded
+    database and fail on sequential scans or sorts the indexes should avoid.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(username='admin', password='pass12345')
+        self.others = [
+            User.objects.create_user(username=f'user{index}', password='pass12345')
+            for index in range(8)
+        ]
+        for owner in [self.user] + self.others:
+            Task.objects.bulk_create(
+                Task(title=f'Task {index}', description='Seeded', owner=owner, position=index + 1)
+                for index in range(40)
+            )
+        members = [self.user] + self.others
+        TaskRoleAssignment.objects.bulk_create(
+            TaskRoleAssignment(
+                task=task,
+                user=member,
+                assigned_by=task.owner,
+                assigned_role=TaskRoleAssignment.ROLE_MEMBER,
+                is_active=index % 4 != 0,
+            )
+            for offset, member in enumerate(members)
+            for index, task in enumerate(
+                Task.objects.filter(owner=members[(offset + 1) % len(members)])[:20]
+            )
+        )
+        for task in Task.objects.filter(owner=self.user)[:10]:
+            task.status = 'Completed'
+            task.save()
+        rebuild_visibility()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertIndexedPlans(self, user, url):
+        client = APIClient()
+        client.force_authenticate(user=user)
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        checked = 0
+        for query in captured:
+            sql = query['sql']
+            if not sql.startswith('SELECT') or not any(
+                table in sql for table in ('"tasks_task', '"audit_auditlog"')
+            ):
+                continue
+            if '"tasks_taskvisibility"' in sql:
+                self.assertVisibleTasksPlan(sql)
+            else:
+                self.assertEqual(explain_problems(sql), [], f'{url}: {sql}')
+            checked += 1
+        self.assertGreater(checked, 0)
+
+    def assertVisibleTasksPlan(self, sql):
+        """
+        Visible-task queries must be driven by the user's visibility rows,
+        reach tasks by primary key, and sort at most that bounded set: the
+        ordering columns live on the task, so only the final ORDER BY may
+        need a temporary B-tree.
+        """
+        if connection.vendor != 'sqlite':
+            problems = [problem for problem in explain_problems(sql) if problem != 'sort']
+            self.assertEqual(problems, [], sql)
+            return
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+            steps = [row[-1] for row in cursor.fetchall()]
+        self.assertRegex(steps[0], r'^SEARCH tasks_taskvisibility USING (COVERING )?INDEX \S+ \(user_id=\?', sql)
+        for step in steps[1:]:
+            if step == 'USE TEMP B-TREE FOR ORDER BY':
+                continue
+            self.assertRegex(step, r'^SEARCH \S+ USING (INTEGER PRIMARY KEY|(COVERING )?INDEX)', sql)
+
+    def test_owner_endpoints(self):
+        task = Task.objects.filter(owner=self.user).first()
+        for url in (
+            '/api/tasks/',
+            '/api/tasks/?cursor=',
+            f'/api/tasks/{task.id}/',
+            '/api/tasks/summary/',
+            '/api/logs/',
+        ):
+            get_list_cache().clear()
+            self.assertIndexedPlans(self.user, url)
+
+    def test_admin_list(self):
+        self.assertIndexedPlans(self.admin, '/api/tasks/')
+        self.assertIndexedPlans(self.admin, '/api/tasks/?cursor=')
+
+    def test_owner_broadcast_query(self):
+        sql = str(
+            TaskValuesSerializer()
+            .values_queryset(Task.objects.filter(owner=self.user).order_by('-position', '-created_at'))
+            .query
+        )
+        self.assertEqual(explain_problems(sql), [])
+
+
+class TaskVisibilityTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.collaborator = User.objects.create_user(username='collaborator', password='pass12345')
+        self.task = self.make_tasks(1)[0]
+
+    def visible_ids(self, user):
+        return set(TaskVisibility.objects.filter(user=user).values_list('task_id', flat=True))
+
+    def test_index_follows_owner_and_assignments(self):
+        self.assertEqual(self.visible_ids(self.user), {self.task.id})
+        self.assertEqual(self.visible_ids(self.collaborator), set())
+
+        assignment = TaskRoleAssignment.objects.create(
+            task=self.task,
+            user=self.collaborator,
+            assigned_by=self.user,
+            assigned_role=TaskRoleAssignment.ROLE_REVIEWER,
+        )
+        self.assertEqual(self.visible_ids(self.collaborator), {self.task.id})
+
+        assignment.is_active = False
+        assignment.save(update_fields=['is_active'])
+        self.assertEqual(self.visible_ids(self.collaborator), set())
+
+    def test_reassigning_moves_visibility(self):
+        newcomer = User.objects.create_user(username='newcomer', password='pass12345')
+        assignment = TaskRoleAssignment.objects.create(
+            task=self.task,
+            user=self.collaborator,
+            assigned_by=self.user,
+            assigned_role=TaskRoleAssignment.ROLE_REVIEWER,
+        )
+        assignment = TaskRoleAssignment.objects.get(pk=assignment.pk)
+        version = get_data_version(user_scope(self.collaborator.id))
+
+        assignment.user = newcomer
+        assignment.save()
+        self.assertEqual(self.visible_ids(self.collaborator), set())
+        self.assertEqual(self.visible_ids(newcomer), {self.task.id})
+        self.assertNotEqual(get_data_version(user_scope(self.collaborator.id)), version)
+
+    def test_list_uses_index(self):
+        self.make_tasks(2, owner=self.collaborator)
+        client = APIClient()
+        client.force_authenticate(user=self.collaborator)
+        response = client.get('/api/tasks/')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_checker_and_rebuild(self):
+        TaskVisibility.objects.all().delete()
+        stale_task = self.make_tasks(1, owner=self.collaborator)[0]
+        TaskVisibility.objects.create(user=self.user, task=stale_task)
+
+        missing, extra = find_visibility_drift()
+        self.assertIn((self.user.id, self.task.id), missing)
+        self.assertEqual(extra, {(self.user.id, stale_task.id)})
+        with self.assertRaises(CommandError):
+            call_command('check_task_visibility', stdout=StringIO())
+
+        call_command('rebuild_task_visibility', stdout=StringIO())
+        self.assertEqual(find_visibility_drift(), (set(), set()))
+
+
+class TaskCounterTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user(username='other', password='pass12345')
+
+    def assertCountersMatch(self, message=None):
+        actual = count_tasks()
+        zeros = dict.fromkeys(COUNTER_FIELDS, 0)
+        for user in (self.user, self.other):
+            self.assertEqual(get_counts(user.id), actual.get(user.id, zeros), message)
+
+    def test_counters_follow_randomized_writes(self):
+        rng = random.Random(16)
+        statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+        priorities = [choice for choice, _ in Task.PRIORITY_CHOICES]
+        for step in range(60):
+            tasks = list(Task.objects.all())
+            op = rng.choice(['create', 'patch', 'save', 'transfer', 'delete', 'batch', 'bulk_delete'])
+            if op == 'create' or not tasks:
+                self.client.post('/api/tasks/', {
+                    'title': f'Task {step}', 'description': 'x',
+                    'status': rng.choice(statuses), 'priority': rng.choice(priorities),
+                }, format='json')
+            elif op == 'patch':
+                owned = [task for task in tasks if task.owner_id == self.user.id] or tasks
+                self.client.patch(f'/api/tasks/{rng.choice(owned).id}/', {
+                    'status': rng.choice(statuses), 'priority': rng.choice(priorities),
+                }, format='json')
+            elif op == 'save':
+                task = rng.choice(tasks)
+                task.status = rng.choice(statuses)
+                task.save()
+            elif op == 'transfer':
+                task = rng.choice(tasks)
+                task.owner = self.other if task.owner_id == self.user.id else self.user
+                task.priority = rng.choice(priorities)
+                task.save()
+            elif op == 'delete':
+                rng.choice(tasks).delete()
+            elif op == 'batch':
+                owned = [task for task in tasks if task.owner_id == self.user.id]
+                operations = [{'op': 'create', 'data': {
+                    'title': f'Batch {step}', 'description': 'x', 'priority': rng.choice(priorities),
+                }}]
+                if len(owned) >= 2:
+                    first, second = rng.sample(owned, 2)
+                    operations.append({'op': 'update', 'id': first.id, 'data': {'status': rng.choice(statuses)}})
+                    operations.append({'op': 'delete', 'id': second.id})
+                self.client.post('/api/tasks/batch/', {'operations': operations}, format='json')
+            else:
+                Task.objects.filter(id__in=[task.id for task in rng.sample(tasks, min(2, len(tasks)))]).delete()
+            self.assertCountersMatch(f'after step {step} ({op})')
+
+    def test_summary_reads_one_counter_row(self):
+        self.make_tasks(3, priority='High')
+        get_counts(self.user.id)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/tasks/summary/')
+        self.assertEqual(response.data['high_priority'], 3)
+        self.assertFalse([q for q in captured if 'COUNT(' in q['sql']])
+
+    def test_recount_repairs_drift(self):
+        self.make_tasks(2)
+        TaskCounter.objects.filter(user=self.user).update(total_tasks=7, pending=0)
+        out = StringIO()
+        call_command('recount_task_counters', stdout=out)
+        self.assertIn(f'repaired: user={self.user.id}', out.getvalue())
+        self.assertCountersMatch()
+        self.assertEqual(recount(), {})
+
+    def test_user_delete_takes_counter_with_it(self):
+        self.make_tasks(2, owner=self.other)
+        self.other.delete()
+        self.assertFalse(TaskCounter.objects.filter(user_id=self.other.id).exists())
+
+
+class TaskRollupTests(TaskAPITestCase):
+    url = '/api/tasks/analytics/timeseries/'
+
+    def rollup_rows(self):
+        return list(TaskActivityRollup.objects.order_by('user_id', 'day').values('user_id', 'day', *ROLLUP_FIELDS))
+
+    def make_activity(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            high = self.client.post('/api/tasks/', {'title': 'A', 'description': 'x', 'priority': 'High'}, format='json')
+            low = self.client.post('/api/tasks/', {'title': 'B', 'description': 'x', 'priority': 'Low'}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/tasks/{high.data['data']['id']}/", {'status': 'Completed'}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/tasks/{high.data['data']['id']}/", {'status': 'Pending'}, format='json')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/tasks/{low.data['data']['id']}/")
+
+    def test_rollups_follow_audit_writes(self):
+        self.make_activity()
+        today = timezone.localdate()
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['series']), 30)
+        self.assertEqual(response.data['series'][-1], {
+            'period': today.isoformat(),
+            'created': 2,
+            'completed': 1,
+            'reopened': 1,
+            'deleted': 1,
+            'priority_mix': {'high': 1, 'medium': 0, 'low': 1},
+        })
+        self.assertEqual(response.data['series'][0]['created'], 0)
+
+        week = self.client.get(self.url, {'bucket': 'week', 'from': (today - timedelta(days=13)).isoformat()})
+        self.assertEqual(sum(period['created'] for period in week.data['series']), 2)
+        self.assertEqual(week.data['series'][-1]['period'], (today - timedelta(days=today.weekday())).isoformat())
+
+    def test_global_series_and_permissions(self):
+        self.make_activity()
+        self.assertEqual(self.client.get(self.url, {'scope': 'global'}).status_code, 403)
+        admin = User.objects.create_superuser(username='admin', password='pass12345')
+        self.client.force_authenticate(user=admin)
+        self.assertEqual(self.client.get(self.url).data['series'][-1]['created'], 0)
+        self.assertEqual(self.client.get(self.url, {'scope': 'global'}).data['series'][-1]['created'], 2)
+        self.assertEqual(self.client.get(self.url, {'from': '2026-02-01', 'to': '2026-01-01'}).status_code, 400)
+
+    def test_backfill_matches_incremental_rollups(self):
+        self.make_activity()
+        incremental = self.rollup_rows()
+        TaskActivityRollup.objects.all().delete()
+        with CaptureQueriesContext(connection) as captured:
+            call_command('backfill_task_rollups', chunk_size=2, stdout=StringIO())
+        self.assertEqual(self.rollup_rows(), incremental)
+        self.assertFalse([q for q in captured if 'COUNT(' in q['sql']])
+
+    def test_rows_audited_during_backfill_are_counted_once(self):
+        self.make_activity()
+        apply_deltas = rollups.apply_deltas
+
+        def audit_mid_rebuild(deltas):
+            apply_deltas(deltas)
+            if not getattr(audit_mid_rebuild, 'done', False):
+                audit_mid_rebuild.done = True
+                write_entries([AuditLog(user=self.user, action='Task Created', changed_data='{"priority": "High"}')])
+
+        with mock.patch.object(rollups, 'apply_deltas', side_effect=audit_mid_rebuild):
+            rollups.backfill(chunk_size=2)
+        today = TaskActivityRollup.objects.get(user=self.user, day=timezone.localdate())
+        self.assertEqual((today.created, today.created_high), (3, 2))
+
+
+class AdminOverviewTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser(username='admin', password='pass12345')
+        self.client.force_authenticate(user=self.admin)
+
+    def test_totals_come_from_one_aggregate(self):
+        self.make_tasks(3, priority='High')
+        self.make_tasks(2, owner=self.admin, status='Completed')
+        with CaptureQueriesContext(connection) as captured:
+            data = self.client.get('/api/tasks/admin/overview/').data
+        self.assertEqual(len([q for q in captured if 'COUNT(' in q['sql']]), 1)
+        self.assertEqual(data['totals'], {'total_tasks': 5, 'completed': 2, 'pending': 3, 'high_priority': 3})
+        self.assertEqual(data['priority_breakdown'], {'high': 3, 'medium': 2, 'low': 0})
+        self.assertEqual(data['status_breakdown'], {'completed': 2, 'pending': 3})
+        self.assertEqual(
+            [(row['username'], row['total'], row['high_priority']) for row in data['top_users']],
+            [('owner', 3, 3), ('admin', 2, 0)],
+        )
+        self.assertEqual(len(data['recent_tasks']), 5)
+
+    def test_snapshot_is_reused_until_it_expires(self):
+        self.make_tasks(1)
+        first = self.client.get('/api/tasks/admin/overview/').data
+        self.make_tasks(1)
+        cached = self.client.get('/api/tasks/admin/overview/').data
+        self.assertEqual(cached['totals']['total_tasks'], 1)
+        self.assertEqual(cached['snapshot']['generated_at'], first['snapshot']['generated_at'])
+        self.assertGreaterEqual(cached['snapshot']['age_seconds'], 0)
+        with override_settings(TASK_OVERVIEW_REFRESH_INTERVAL=0):
+            self.assertEqual(self.client.get('/api/tasks/admin/overview/').data['totals']['total_tasks'], 2)
+        self.make_tasks(1)
+        refreshed = self.client.get('/api/tasks/admin/overview/?refresh=1').data
+        self.assertEqual(refreshed['totals']['total_tasks'], 3)
+
+
+class TaskSearchTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.title_match = Task.objects.create(
+            title='Quarterly budget review', description='Numbers', owner=self.user, position=1
+        )
+        self.body_match = Task.objects.create(
+            title='Planning', description='Prepare the budget slides', owner=self.user, position=2
+        )
+        Task.objects.create(title='Unrelated', description='Nothing here', owner=self.user, position=3)
+
+    def search_ids(self, query):
+        response = self.client.get(f'/api/tasks/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_matches_title_and_description_prefixes(self):
+        ids = self.search_ids('search=budg')
+        self.assertEqual(set(ids), {self.title_match.id, self.body_match.id})
+
+    def test_index_follows_updates(self):
+        self.body_match.description = 'Prepare the slides'
+        self.body_match.save()
+        self.assertEqual(self.search_ids('search=budget'), [self.title_match.id])
+
+    def test_relevance_ordering_prefers_title_matches(self):
+        ids = self.search_ids('search=budget&ordering=relevance')
+        self.assertEqual(ids, [self.title_match.id, self.body_match.id])
+
+    def test_relevance_ordering_with_cursor(self):
+        ids = self.search_ids('search=budget&ordering=relevance&cursor=&page_size=1')
+        self.assertEqual(ids, [self.title_match.id])
+
+    def test_punctuation_only_search_does_not_list_everything(self):
+        self.assertEqual(self.search_ids('search=%21%3F'), [])
+        tagged = Task.objects.create(title='Ship it?!', description='', owner=self.user, position=4)
+        self.assertEqual(self.search_ids('search=%3F%21'), [tagged.id])
+
+
+class ConditionalGetTests(TaskAPITestCase):
+    def assertNotModified(self, url):
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        etag = first['ETag']
+        self.assertTrue(etag.startswith('W/'))
+        with self.assertNumQueries(1):
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], etag)
+        return etag
+
+    def test_list_summary_and_logs_answer_304(self):
+        self.make_tasks(2)
+        for url in ('/api/tasks/', '/api/tasks/summary/', '/api/logs/'):
+            self.assertNotModified(url)
+
+    def test_writes_invalidate_etag(self):
+        task = self.make_tasks(1)[0]
+        etag = self.assertNotModified('/api/tasks/')
+        task.status = 'Completed'
+        task.save()
+        response = self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_query_parameters_change_etag(self):
+        first = self.client.get('/api/tasks/?status=Pending')
+        second = self.client.get('/api/tasks/?status=Completed', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+
+    def test_assignment_invalidates_assignee_etag(self):
+        task = self.make_tasks(1)[0]
+        collaborator = User.objects.create_user(username='collaborator', password='pass12345')
+        client = APIClient()
+        client.force_authenticate(user=collaborator)
+        etag = client.get('/api/tasks/')['ETag']
+        TaskRoleAssignment.objects.create(
+            task=task,
+            user=collaborator,
+            assigned_by=self.user,
+            assigned_role=TaskRoleAssignment.ROLE_MEMBER,
+        )
+        response = client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_assignment_changes_invalidate_admin_etag(self):
+        task = self.make_tasks(1)[0]
+        collaborator = User.objects.create_user(username='collaborator', password='pass12345')
+        admin = User.objects.create_superuser(username='admin', password='pass12345')
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        etag = client.get('/api/tasks/')['ETag']
+        assignment = TaskRoleAssignment.objects.create(
+            task=task,
+            user=collaborator,
+            assigned_by=self.user,
+            assigned_role=TaskRoleAssignment.ROLE_MEMBER,
+        )
+        response = client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        assignment.delete()
+        self.assertEqual(client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ListCacheTests(TaskAPITestCase):
+    def test_repeated_pages_are_served_from_cache(self):
+        self.make_tasks(3)
+        first = self.client.get('/api/tasks/?status=Pending&page=1')
+        self.assertEqual(first['X-Cache'], 'MISS')
+        with self.assertNumQueries(1):
+            second = self.client.get('/api/tasks/?page=1&status=Pending')
+        self.assertEqual(second['X-Cache'], 'HIT')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(list_cache_stats.snapshot()['hits'], 1)
+
+    def test_task_writes_invalidate_cached_pages(self):
+        task = self.make_tasks(1)[0]
+        self.client.get('/api/tasks/')
+        task.title = 'Renamed'
+        task.save()
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['results'][0]['title'], 'Renamed')
+        self.assertGreaterEqual(list_cache_stats.snapshot()['invalidations'], 1)
+
+    def test_cache_stats_endpoint_is_admin_only(self):
+        self.assertEqual(self.client.get('/api/tasks/admin/cache-stats/').status_code, 403)
+        admin = User.objects.create_superuser(username='admin', password='pass12345')
+        self.client.force_authenticate(user=admin)
+        response = self.client.get('/api/tasks/admin/cache-stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('hit_ratio', response.data)
+
+
+class SparseFieldsetTests(TaskAPITestCase):
+    def test_fields_trim_payload_and_columns(self):
+        self.make_tasks(2)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get('/api/tasks/?fields=id,title,status,position')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'title', 'status', 'position'})
+        page_query = next(q['sql'] for q in captured if 'LIMIT' in q['sql'])
+        self.assertNotIn('"description"', page_query)
+        self.assertNotIn('auth_user', page_query)
+
+    def test_omit(self):
+        self.make_tasks(1)
+        response = self.client.get('/api/tasks/?omit=description,owner_email')
+        row = response.data['results'][0]
+        self.assertNotIn('description', row)
+        self.assertNotIn('owner_email', row)
+        self.assertIn('owner_username', row)
+
+    def test_sparse_cursor_pages_need_no_extra_queries(self):
+        self.make_tasks(5)
+        self.client.get('/api/tasks/?cursor=&fields=id&page_size=2')
+        with self.assertNumQueries(2):
+            self.client.get('/api/tasks/?cursor=&fields=id&page_size=4&ordering=-priority')
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/tasks/?fields=id,nope')
+        self.assertEqual(response.status_code, 400)
+
+    def test_audit_log_fields(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.make_tasks(1)
+        response = self.client.get('/api/logs/?fields=id,action,username')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'action', 'username'})
+
+    def test_project_serialized_payloads(self):
+        payload = [{'id': 1, 'title': 'a', 'description': 'b'}]
+        self.assertEqual(project(payload, ['id', 'title']), [{'id': 1, 'title': 'a'}])
+
+
+class TaskValuesSerializerTests(TaskAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.email = 'owner@example.com'
+        self.user.save()
+        admin = User.objects.create_superuser(username='root', password='pass12345')
+        tasks = self.make_tasks(3)
+        tasks[0].title = 'Réunion / “quotes” \u2028 done'
+        tasks[0].save()
+        TaskRoleAssignment.objects.create(
+            task=tasks[1],
+            user=self.user,
+            assigned_role=TaskRoleAssignment.ROLE_REVIEWER,
+            submission_deadline=timezone.now(),
+            feedback_notes='Looks good',
+            assigned_by=admin,
+        )
+        self.make_tasks(1, owner=admin)
+
+    def render_both(self, fields=None):
+        request = APIRequestFactory().get('/api/tasks/')
+        request.user = self.user
+        context = {'request': request}
+        if fields is not None:
+            context['sparse_fields'] = fields
+        queryset = Task.objects.order_by('-position', 'id')
+        slow = TaskSerializer(
+            queryset.select_related('owner').with_current_assignment(self.user),
+            many=True,
+            context=context,
+        ).data
+        fast = TaskValuesSerializer(fields=fields, user=self.user).serialize_queryset(queryset)
+        return UJSONRenderer().render(slow), UJSONRenderer().render(fast)
+
+    def test_output_is_byte_identical(self):
+        slow, fast = self.render_both()
+        self.assertEqual(fast, slow)
+        self.assertIn(b'Reviewer', fast)
+
+    def test_sparse_fields_are_byte_identical(self):
+        slow, fast = self.render_both(['id', 'owner_email', 'current_assignment', 'updated_at'])
+        self.assertEqual(fast, slow)
+
+    def test_list_endpoint_reads_values(self):
+        with self.settings(TASK_FAST_READ_PATH=False):
+            slow = self.client.get('/api/tasks/?page_size=50').content
+        get_list_cache().clear()
+        fast = self.client.get('/api/tasks/?page_size=50').content
+        self.assertEqual(fast, slow)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_task_serializers', tasks=50, repeat=1, stdout=out)
+        self.assertIn('speedup', out.getvalue())
+        self.assertEqual(Task.objects.count(), 4)
+
+
+class UJSONRendererTests(TestCase):
+    def test_matches_drf_json_renderer(self):
+        data = {
+            'title': 'Café / résumé  ',
+            'when': timezone.now(),
+            'nested': [{'n': 1, 'f': 1.5, 'none': None, 'flag': True}],
+        }
+        self.assertEqual(UJSONRenderer().render(data), JSONRenderer().render(data))
@@ -0,0 +1,102 @@
+from django.core.exceptions import FieldDoesNotExist
+
+_MISSING = object()
+
+
+class ChangeTrackingMixin:
+    """
+    Remembers the field values a model instance was loaded (or last saved)
+    with, so receivers can diff an update without re-reading the row.
+
+    Values are keyed by attname (`owner_id`, not `owner`). Deferred fields
+    join the snapshot when they are first loaded. Instances that were never
+    loaded or saved have no snapshot, and `has_snapshot()` is False.
+
+    The snapshot is refreshed after `save()` returns, so `post_save`
+    receivers still see the changes that were just written.
+    """
+
+    tracked_fields = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    @classmethod
+    def get_tracked_attnames(cls):
+        fields = cls._meta.concrete_fields
+        if cls.tracked_fields is not None:
+            fields = [field for field in fields if field.name in cls.tracked_fields]
+        return [field.attname for field in fields]
+
+    def has_snapshot(self):
+        return getattr(self, '_loaded_values', None) is not None
+
+    def get_old_value(self, attname, default=None):
+        """Value of `attname` as loaded; the current value when it was not loaded."""
+        value = (getattr(self, '_loaded_values', None) or {}).get(attname, _MISSING)
+        if value is _MISSING:
+            return getattr(self, attname, default)
+        return value
+
+    def load_snapshot(self, attnames):
+        """
+        Read the `attnames` missing from the snapshot from the database, in
+        one query, so an instance built by hand or loaded with `.only()` can
+        still be diffed on save. Rows that do not exist yet are left alone.
+        """
+        loaded = getattr(self, '_loaded_values', None) or {}
+        missing = [attname for attname in attnames if attname not in loaded]
+        if not missing or self.pk is None:
+            return
+        row = type(self)._base_manager.using(self._state.db).filter(pk=self.pk).values(*missing).first()
+        if row is not None:
+            loaded.update(row)
+            self._loaded_values = loaded
+
+    def get_dirty_fields(self):
+        """`{attname: (old, new)}` for tracked fields changed since the snapshot."""
+        loaded = getattr(self, '_loaded_values', None)
+        if not loaded:
+            return {}
+        deferred = self.get_deferred_fields()
+        dirty = {}
+        for attname in self.get_tracked_attnames():
+            if attname in deferred or attname not in loaded:
+                continue
+            new = getattr(self, attname)
+            if loaded[attname] != new:
+                dirty[attname] = (loaded[attname], new)
+        return dirty
+
+    def snapshot(self, attnames=None):
+        deferred = self.get_deferred_fields()
+        if attnames is None:
+            attnames = [field.attname for field in self._meta.concrete_fields]
+        loaded = getattr(self, '_loaded_values', None) or {}
+        loaded.update(
+            (attname, getattr(self, attname)) for attname in attnames if attname not in deferred
+        )
+        self._loaded_values = loaded
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self.snapshot(None if update_fields is None else self._attnames(update_fields))
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self.snapshot(None if fields is None else self._attnames(fields))
+
+    def _attnames(self, names):
+        attnames = []
+        for name in names:
+            try:
+                field = self._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete:
+                attnames.append(field.attname)
+        return attnames
@@ -0,0 +1,50 @@
+import secrets
+
+from django.db.models import F
+
+from .models import DataVersion, TaskVisibility
+
+GLOBAL_SCOPE = 'global'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def get_data_version(scope):
+    """
+    Current version of `scope`. Missing rows start at a random value so an
+    ETag issued before a reset can never match one issued after it.
+    """
+    version = DataVersion.objects.filter(scope=scope).values_list('version', flat=True).first()
+    if version is None:
+        version = secrets.randbits(48)
+        DataVersion.objects.bulk_create(
+            [DataVersion(scope=scope, version=version)],
+            ignore_conflicts=True,
+        )
+    return version
+
+
+def bump_user_versions(user_ids, include_global=True):
+    """Bump the given users' scopes (and the global scope); returns the scopes."""
+    scopes = [user_scope(user_id) for user_id in set(user_ids) if user_id]
+    if include_global:
+        scopes.append(GLOBAL_SCOPE)
+    if scopes:
+        DataVersion.objects.filter(scope__in=scopes).update(version=F('version') + 1)
+    return scopes
+
+
+def bump_task_versions(*task_ids):
+    """
+    Bump every scope that can see any of `task_ids`: owners, active assignees
+    and the global scope used by admins. Must run while the tasks' visibility
+    rows still exist, i.e. before a delete cascades. Returns the bumped scopes.
+    """
+    viewer_ids = (
+        TaskVisibility.objects.filter(task_id__in=task_ids)
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+    return bump_user_versions(list(viewer_ids))
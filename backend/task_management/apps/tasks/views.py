@@ -4,9 +4,9 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.exceptions import PermissionDenied
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
+from rest_framework.filters import OrderingFilter
 from django.db import transaction
-from django.db.models import Count, Q, Case, When, IntegerField
+from django.db.models import Case, When, IntegerField
 from django.shortcuts import get_object_or_404
 
 from .models import Task, TaskRoleAssignment
@@ -14,17 +14,46 @@ from .serializers import (
     TaskSerializer,
     TaskSummarySerializer,
     TaskReorderSerializer,
+    TaskMoveSerializer,
+    TaskBatchSerializer,
+    TaskTimeseriesQuerySerializer,
     TaskRoleAssignmentSerializer,
 )
 from .permissions import IsTaskOwner
 from .filters import TaskFilter
+from .pagination import TaskPagination
+from .sparse import SparseFieldsetViewMixin
+from .search import RANK_ANNOTATION, RELEVANCE_ORDERING, TaskSearchFilter
+from .caching import (
+    cache_enabled,
+    get_cached_page,
+    invalidate_scopes,
+    list_cache_key,
+    stats as list_cache_stats,
+    store_page,
+)
+from .conditional import conditional_on_data_version
+from .batch import TaskBatch
+from .fast_serializers import TaskValuesSerializer, fast_read_path_enabled
+from .outbound import stats as outbound_stats
+from .overview import get_snapshot, snapshot_meta
+from .ranking import bump_board_version, place_between
+from .rollups import timeseries
+from .versioning import GLOBAL_SCOPE, bump_task_versions, user_scope
 from .realtime import (
-    broadcast_full_task_list,
+    broadcast_task_moves,
     get_user_task_summary,
+    stats as realtime_stats,
 )
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+def task_list_version_scope(view, request):
+    if view.can_view_all_tasks(request.user):
+        return GLOBAL_SCOPE
+    return user_scope(request.user.id)
+
+
+class TaskViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """
     ViewSet for Task CRUD operations
     
@@ -38,24 +67,29 @@ class TaskViewSet(viewsets.ModelViewSet):
     
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated, IsTaskOwner]
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    pagination_class = TaskPagination
+    filter_backends = [DjangoFilterBackend, TaskSearchFilter, OrderingFilter]
     filterset_class = TaskFilter
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'updated_at', 'priority', 'status', 'position']
     ordering = ['-position', '-created_at']
+    sparse_field_sources = {
+        'owner_username': ['owner__username'],
+        'owner_email': ['owner__email'],
+        'current_assignment': [],
+    }
+    sparse_required_columns = ('id', 'owner')
     
     def get_queryset(self):
         """Return tasks owned by or assigned to the authenticated user"""
         user = self.request.user
-        queryset = Task.objects.select_related('owner').prefetch_related('role_assignments')
+        queryset = Task.objects.select_related('owner').with_current_assignment(user)
 
-        if user.is_superuser or user.has_perm('tasks.task_manage'):
-            base_queryset = queryset.distinct()
+        if self.can_view_all_tasks(user):
+            base_queryset = queryset
         else:
-            base_queryset = queryset.filter(
-                Q(owner=user) |
-                Q(role_assignments__user=user, role_assignments__is_active=True)
-            ).distinct()
+            # TaskVisibility holds one row per (user, task), so no DISTINCT is needed.
+            base_queryset = queryset.filter(visibility__user=user)
         
         # Always annotate priority_weight for potential priority ordering
         base_queryset = base_queryset.annotate(
@@ -70,6 +104,9 @@ class TaskViewSet(viewsets.ModelViewSet):
         
         return base_queryset
     
+    def can_view_all_tasks(self, user):
+        return user.is_superuser or user.has_perm('tasks.task_manage')
+
     def filter_queryset(self, queryset):
         """Override to handle custom priority ordering"""
         queryset = super().filter_queryset(queryset)
@@ -77,11 +114,16 @@ class TaskViewSet(viewsets.ModelViewSet):
         # Check if ordering by priority
         ordering_param = self.request.query_params.get('ordering', '')
         if ordering_param == 'priority':
-            return queryset.order_by('priority_weight', '-created_at')
+            queryset = queryset.order_by('priority_weight', '-created_at')
         elif ordering_param == '-priority':
-            return queryset.order_by('-priority_weight', '-created_at')
+            queryset = queryset.order_by('-priority_weight', '-created_at')
+        elif ordering_param == RELEVANCE_ORDERING and RANK_ANNOTATION in queryset.query.annotations:
+            queryset = queryset.order_by(f'-{RANK_ANNOTATION}', '-created_at')
         
-        return queryset
+        return self.apply_sparse_fieldset(queryset)
+
+    def sparse_prefetch_fields(self):
+        return ['current_assignment']
 
     def get_permissions(self):
         if self.action == 'admin_overview':
@@ -92,6 +134,38 @@ class TaskViewSet(viewsets.ModelViewSet):
         """Set the owner to the current user"""
         serializer.save(owner=self.request.user)
     
+    @conditional_on_data_version(task_list_version_scope)
+    def list(self, request, *args, **kwargs):
+        """List tasks, serving repeated pages from the list cache"""
+        if not cache_enabled():
+            return self.list_response(request, *args, **kwargs)
+
+        scope, version = self.data_version
+        cache_key = list_cache_key(request, scope, version)
+        cached = get_cached_page(cache_key)
+        if cached is not None:
+            response = Response(cached)
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = self.list_response(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            store_page(cache_key, scope, response.data)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list_response(self, request, *args, **kwargs):
+        """Build the list page through the values() fast path when enabled"""
+        if not fast_read_path_enabled():
+            return super().list(request, *args, **kwargs)
+
+        reader = TaskValuesSerializer(fields=self.get_sparse_fields(), user=request.user)
+        rows = reader.values_queryset(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(reader.to_representation(page))
+        return Response(reader.to_representation(rows))
+
     def create(self, request, *args, **kwargs):
         """Custom create response"""
         serializer = self.get_serializer(data=request.data)
@@ -127,6 +201,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         }, status=status.HTTP_200_OK)
     
     @action(detail=False, methods=['get'], url_path='summary')
+    @conditional_on_data_version()
     def summary(self, request):
         """
         Analytics Endpoint
@@ -136,6 +211,31 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = TaskSummarySerializer(summary_data)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path='analytics/timeseries')
+    def timeseries(self, request):
+        """
+        Created/completed/deleted counts and the priority mix of new tasks
+        per day or week, read from the daily rollups.
+        GET /api/tasks/analytics/timeseries/?from=&to=&bucket=day|week&scope=me|global
+        `scope=global` is limited to users who can see every task.
+        """
+        serializer = TaskTimeseriesQuerySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        params = serializer.validated_data
+        if params['scope'] == 'global' and not self.can_view_all_tasks(request.user):
+            return Response(
+                {'error': 'Only managers can see global analytics.'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        user_id = None if params['scope'] == 'global' else request.user.id
+        return Response({
+            'from': params['from'],
+            'to': params['to'],
+            'bucket': params['bucket'],
+            'scope': params['scope'],
+            'series': timeseries(user_id, params['from'], params['to'], params['bucket']),
+        })
+
     @action(detail=False, methods=['post'], url_path='reorder')
     def reorder(self, request):
         """
@@ -145,7 +245,9 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         task_ids = serializer.validated_data['task_ids']
 
-        tasks = list(Task.objects.filter(owner=request.user, id__in=task_ids))
+        tasks = list(
+            Task.objects.filter(owner=request.user, id__in=task_ids).only('id', 'position')
+        )
         if len(tasks) != len(task_ids):
             return Response(
                 {'error': 'One or more tasks could not be found.'},
@@ -154,71 +256,151 @@ class TaskViewSet(viewsets.ModelViewSet):
 
         task_map = {task.id: task for task in tasks}
         sorted_positions = sorted([task.position for task in tasks], reverse=True)
+        changed = []
+        for idx, task_id in enumerate(task_ids):
+            task = task_map[task_id]
+            if task.position != sorted_positions[idx]:
+                task.position = sorted_positions[idx]
+                changed.append(task)
 
+        # Positions carry no audit trail, so skip the per-row save signals.
         with transaction.atomic():
-            updated_tasks = []
-            for idx, task_id in enumerate(task_ids):
-                task = task_map[task_id]
-                new_position = sorted_positions[idx]
-                if task.position != new_position:
-                    task.position = new_position
-                    task.save(update_fields=['position'])
-                updated_tasks.append(task)
-
-        broadcast_full_task_list(request.user.id)
+            Task.objects.bulk_update(changed, ['position'])
+            if changed:
+                invalidate_scopes(bump_task_versions(*[task.id for task in changed]))
+                previous_version, version = bump_board_version(request.user.id)
+                broadcast_task_moves(
+                    request.user.id,
+                    previous_version,
+                    version,
+                    [(task.id, task.position) for task in changed],
+                )
 
+        rows = TaskValuesSerializer(user=request.user).serialize_queryset(
+            Task.objects.filter(id__in=task_ids)
+        )
+        rows_by_id = {row['id']: row for row in rows}
         return Response({
             'message': 'Tasks reordered successfully',
-            'data': TaskSerializer(updated_tasks, many=True).data
+            'data': [rows_by_id[task_id] for task_id in task_ids]
+        })
+
+    @action(detail=True, methods=['post'], url_path='move')
+    def move(self, request, pk=None):
+        """
+        Drop one task between two neighbours of the same board
+        POST /api/tasks/{id}/move/ {"after_id": A, "before_id": B}
+        Only the moved row is written unless the board needs a rebalance.
+        """
+        serializer = TaskMoveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        after_id = serializer.validated_data.get('after_id')
+        before_id = serializer.validated_data.get('before_id')
+
+        task = get_object_or_404(Task.objects.only('id', 'owner', 'position'), pk=pk, owner=request.user)
+        ids = [task_id for task_id in (after_id, before_id) if task_id]
+        neighbours = Task.objects.filter(owner=request.user, id__in=ids).only('id', 'position').in_bulk()
+        if task.id in ids or len(neighbours) != len(ids):
+            return Response(
+                {'error': 'Tasks can only be moved between other tasks on your own board.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            with transaction.atomic():
+                position, rebalanced = place_between(
+                    task,
+                    after=neighbours.get(after_id),
+                    before=neighbours.get(before_id),
+                )
+                invalidate_scopes(bump_task_versions(task.id, *rebalanced))
+                moved = [(task.id, position)]
+                if rebalanced:
+                    moved = Task.objects.filter(id__in=[task.id, *rebalanced]).values_list('id', 'position')
+                previous_version, version = bump_board_version(request.user.id)
+                broadcast_task_moves(request.user.id, previous_version, version, moved)
+        except ValueError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = TaskValuesSerializer(user=request.user).serialize_queryset(Task.objects.filter(pk=task.pk))[0]
+
+        return Response({
+            'message': 'Task moved successfully',
+            'rebalanced': len(rebalanced),
+            'data': data
         })
 
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request):
+        """
+        Apply many create/update/delete operations in one transaction
+        POST /api/tasks/batch/
+        {"atomic": false, "operations": [
+            {"op": "create", "data": {...}},
+            {"op": "update", "id": 1, "data": {...}},
+            {"op": "delete", "id": 2}
+        ]}
+        Updates are partial. Invalid operations are reported per item and the
+        rest is applied, unless "atomic" is true.
+        """
+        serializer = TaskBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        batch = TaskBatch(
+            request.user,
+            serializer.validated_data['operations'],
+            self.get_queryset(),
+            context=self.get_serializer_context(),
+        )
+        atomic = serializer.validated_data['atomic']
+        batch.run(atomic=atomic)
+
+        failed = batch.failed
+        rejected = atomic and failed
+        return Response({
+            'message': 'Batch rejected' if rejected else 'Batch applied',
+            'succeeded': 0 if rejected else len(batch.results) - failed,
+            'failed': failed,
+            'results': batch.results,
+        }, status=status.HTTP_400_BAD_REQUEST if rejected else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='admin/cache-stats',
+            permission_classes=[IsAuthenticated, IsAdminUser])
+    def cache_stats(self, request):
+        """
+        Task list cache counters for tuning.
+        GET /api/tasks/admin/cache-stats/
+        """
+        return Response(list_cache_stats.snapshot())
+
+    @action(detail=False, methods=['get'], url_path='admin/realtime-stats',
+            permission_classes=[IsAuthenticated, IsAdminUser])
+    def realtime_stats(self, request):
+        """
+        Realtime dispatcher counters: events queued, merged, dropped, published.
+        `connections` covers the sockets served by this process: open sockets,
+        outbound queue depth, frames merged, dropped and sent, and slow
+        disconnects.
+        GET /api/tasks/admin/realtime-stats/
+        """
+        return Response({**realtime_stats.snapshot(), 'connections': outbound_stats.snapshot()})
+
     @action(detail=False, methods=['get'], url_path='admin/overview',
             permission_classes=[IsAuthenticated, IsAdminUser])
     def admin_overview(self, request):
         """
-        Aggregate stats for staff users.
+        Aggregate stats for staff users, served from a cached snapshot that is
+        recomputed every TASK_OVERVIEW_REFRESH_INTERVAL seconds (or on
+        `?refresh=1`). `snapshot.age_seconds` says how old the numbers are.
         """
-        queryset = Task.objects.select_related('owner')
-
-        totals = {
-            'total_tasks': queryset.count(),
-            'completed': queryset.filter(status='Completed').count(),
-            'pending': queryset.filter(status='Pending').count(),
-            'high_priority': queryset.filter(priority='High').count(),
-        }
-        priority_breakdown = {
-            'high': queryset.filter(priority='High').count(),
-            'medium': queryset.filter(priority='Medium').count(),
-            'low': queryset.filter(priority='Low').count(),
-        }
-        status_breakdown = {
-            'completed': totals['completed'],
-            'pending': totals['pending'],
-        }
-
-        top_users = list(
-            queryset.values('owner__username').annotate(
-                total=Count('id'),
-                completed=Count('id', filter=Q(status='Completed')),
-                high_priority=Count('id', filter=Q(priority='High')),
-            ).order_by('-total')[:5]
-        )
-
-        recent_tasks = queryset.order_by('-created_at')[:5]
+        snapshot = get_snapshot(force=request.query_params.get('refresh') == '1')
+        reader = TaskValuesSerializer(user=request.user)
+        recent_tasks = reader.values_queryset(Task.objects.order_by('-created_at'))[:5]
 
         return Response({
-            'totals': totals,
-            'priority_breakdown': priority_breakdown,
-            'status_breakdown': status_breakdown,
-            'top_users': [
-                {
-                    'username': row['owner__username'],
-                    'total': row['total'],
-                    'completed': row['completed'],
-                    'high_priority': row['high_priority'],
-                } for row in top_users
-            ],
-            'recent_tasks': TaskSerializer(recent_tasks, many=True).data,
+            **snapshot['data'],
+            'recent_tasks': reader.to_representation(recent_tasks),
+            'snapshot': snapshot_meta(snapshot),
         })
 
 
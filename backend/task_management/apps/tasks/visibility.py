@@ -0,0 +1,109 @@
+from django.db import transaction
+
+from .models import Task, TaskRoleAssignment, TaskVisibility
+
+
+def grant_visibility(task_id, user_id):
+    grant_visibilities([(task_id, user_id)])
+
+
+def grant_visibilities(pairs):
+    """Add `(task_id, user_id)` rows to the index in one insert."""
+    TaskVisibility.objects.bulk_create(
+        [TaskVisibility(task_id=task_id, user_id=user_id) for task_id, user_id in pairs],
+        ignore_conflicts=True,
+    )
+
+
+def sync_task_user(task_id, user_id):
+    """
+    Recompute whether `user_id` should see `task_id` and fix the index row.
+    The user keeps visibility while they own the task or hold an active role.
+    """
+    visible = (
+        Task.objects.filter(pk=task_id, owner_id=user_id).exists()
+        or TaskRoleAssignment.objects.filter(
+            task_id=task_id,
+            user_id=user_id,
+            is_active=True
+        ).exists()
+    )
+    if visible:
+        grant_visibility(task_id, user_id)
+    else:
+        TaskVisibility.objects.filter(task_id=task_id, user_id=user_id).delete()
+    return visible
+
+
+def _task_id_chunks(chunk_size):
+    last_id = 0
+    while True:
+        ids = list(
+            Task.objects.filter(id__gt=last_id)
+            .order_by('id')
+            .values_list('id', flat=True)[:chunk_size]
+        )
+        if not ids:
+            return
+        yield ids[0], ids[-1]
+        last_id = ids[-1]
+
+
+def _expected_pairs(first_id, last_id):
+    pairs = set(
+        Task.objects.filter(id__gte=first_id, id__lte=last_id)
+        .values_list('owner_id', 'id')
+    )
+    pairs.update(
+        TaskRoleAssignment.objects.filter(
+            task_id__gte=first_id,
+            task_id__lte=last_id,
+            is_active=True
+        ).values_list('user_id', 'task_id')
+    )
+    return pairs
+
+
+def _actual_pairs(first_id, last_id):
+    return set(
+        TaskVisibility.objects.filter(task_id__gte=first_id, task_id__lte=last_id)
+        .values_list('user_id', 'task_id')
+    )
+
+
+def find_visibility_drift(chunk_size=1000):
+    """
+    Compare the index against owners and active assignments.
+
+    Returns `(missing, extra)` as sets of `(user_id, task_id)` pairs.
+    """
+    missing, extra = set(), set()
+    for first_id, last_id in _task_id_chunks(chunk_size):
+        expected = _expected_pairs(first_id, last_id)
+        actual = _actual_pairs(first_id, last_id)
+        missing |= expected - actual
+        extra |= actual - expected
+    return missing, extra
+
+
+def rebuild_visibility(chunk_size=1000):
+    """
+    Repair the index chunk by chunk. Returns `(added, removed)` counts.
+    """
+    added = removed = 0
+    for first_id, last_id in _task_id_chunks(chunk_size):
+        with transaction.atomic():
+            expected = _expected_pairs(first_id, last_id)
+            actual = _actual_pairs(first_id, last_id)
+            missing = expected - actual
+            stale = actual - expected
+            TaskVisibility.objects.bulk_create(
+                [TaskVisibility(user_id=user_id, task_id=task_id) for user_id, task_id in missing],
+                batch_size=chunk_size,
+                ignore_conflicts=True,
+            )
+            for user_id, task_id in stale:
+                TaskVisibility.objects.filter(user_id=user_id, task_id=task_id).delete()
+        added += len(missing)
+        removed += len(stale)
+    return added, removed
@@ -0,0 +1,312 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from channels.exceptions import ChannelFull
+from channels.layers import BaseChannelLayer
+from rest_framework.utils.encoders import JSONEncoder
+
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS channel_messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        process TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        body TEXT NOT NULL,
+        expires REAL NOT NULL
+    )
+    """,
+    'CREATE INDEX IF NOT EXISTS channel_messages_process ON channel_messages (process, id)',
+    'CREATE INDEX IF NOT EXISTS channel_messages_channel ON channel_messages (channel, id)',
+    """
+    CREATE TABLE IF NOT EXISTS channel_groups (
+        group_name TEXT NOT NULL,
+        channel TEXT NOT NULL,
+        expires REAL NOT NULL,
+        PRIMARY KEY (group_name, channel)
+    )
+    """,
+)
+
+
+class _LocalChannel:
+    """Receive queue for a channel owned by this process, bound to its event loop."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.last_used = time.monotonic()
+
+    def put(self, item):
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.queue.put_nowait(item)
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.queue.put_nowait, item)
+
+
+class SQLiteChannelLayer(BaseChannelLayer):
+    """
+    Channel layer shared by every process on one host through a SQLite file.
+
+    Each process owns the channels it creates (`specific.<process>!<id>`).
+    Messages for channels in the same process skip the database; messages for
+    other processes are inserted into the file, and each process claims its
+    own with one `DELETE ... RETURNING` per poll. Group memberships live in
+    the file too and lapse after `group_expiry` seconds unless re-added.
+    Undelivered messages expire after `expiry` seconds, and sends to a
+    channel already holding `capacity` messages raise `ChannelFull` (group
+    sends skip that member instead), as with the other layers.
+    """
+
+    extensions = ['groups', 'flush']
+
+    def __init__(
+        self,
+        path='channels.sqlite3',
+        expiry=60,
+        group_expiry=86400,
+        capacity=100,
+        channel_capacity=None,
+        poll_interval=0.02,
+    ):
+        super().__init__(expiry=expiry, capacity=capacity, channel_capacity=channel_capacity)
+        self.channel_capacity = self.compile_capacities(channel_capacity or {})
+        self.path = os.fspath(path)
+        self.group_expiry = group_expiry
+        self.poll_interval = poll_interval
+        self.process = f'specific.{uuid.uuid4().hex[:12]}'
+        self._local = {}
+        self._lock = threading.Lock()
+        self._pollers = {}
+        self._last_cleanup = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='channel-layer')
+        self._db = None
+
+    # Database access runs on one dedicated thread.
+
+    def _connection(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                self._db.execute(statement)
+        return self._db
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _encode(self, message):
+        return json.dumps(message, cls=JSONEncoder)
+
+    def _decode(self, body):
+        return json.loads(body)
+
+    def _owner(self, channel):
+        return channel.split('!', 1)[0] if '!' in channel else ''
+
+    def _is_local(self, channel):
+        return self._owner(channel) == self.process
+
+    def _insert(self, rows):
+        """Insert `(channel, body)` rows, skipping full channels. Returns the skipped channels."""
+        db = self._connection()
+        now = time.time()
+        channels = sorted({channel for channel, _ in rows})
+        placeholders = ','.join('?' * len(channels))
+        # One write transaction, so the capacity check holds across processes.
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            pending = dict(db.execute(
+                f'SELECT channel, COUNT(*) FROM channel_messages '
+                f'WHERE channel IN ({placeholders}) AND expires > ? GROUP BY channel',
+                [*channels, now],
+            ).fetchall())
+            full, accepted = set(), []
+            for channel, body in rows:
+                if pending.get(channel, 0) >= self.get_capacity(channel):
+                    full.add(channel)
+                    continue
+                pending[channel] = pending.get(channel, 0) + 1
+                accepted.append((self._owner(channel), channel, body, now + self.expiry))
+            if accepted:
+                db.executemany(
+                    'INSERT INTO channel_messages (process, channel, body, expires) VALUES (?, ?, ?, ?)',
+                    accepted,
+                )
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+        return full
+
+    def _claim_process(self):
+        db = self._connection()
+        now = time.time()
+        rows = db.execute(
+            'DELETE FROM channel_messages WHERE process = ? RETURNING id, channel, body, expires',
+            [self.process],
+        ).fetchall()
+        if now - self._last_cleanup > self.expiry:
+            self._last_cleanup = now
+            db.execute('DELETE FROM channel_messages WHERE expires <= ?', [now])
+            db.execute('DELETE FROM channel_groups WHERE expires <= ?', [now])
+        rows.sort()
+        return [(channel, body) for _, channel, body, expires in rows if expires > now]
+
+    def _claim_channel(self, channel):
+        db = self._connection()
+        row = db.execute(
+            'DELETE FROM channel_messages WHERE id = ('
+            '  SELECT id FROM channel_messages WHERE channel = ? AND expires > ? ORDER BY id LIMIT 1'
+            ') RETURNING body',
+            [channel, time.time()],
+        ).fetchone()
+        return row[0] if row else None
+
+    def _group_channels(self, group):
+        return [
+            row[0] for row in self._connection().execute(
+                'SELECT channel FROM channel_groups WHERE group_name = ? AND expires > ?',
+                [group, time.time()],
+            )
+        ]
+
+    def _group_add(self, group, channel):
+        self._connection().execute(
+            'INSERT INTO channel_groups (group_name, channel, expires) VALUES (?, ?, ?) '
+            'ON CONFLICT (group_name, channel) DO UPDATE SET expires = excluded.expires',
+            [group, channel, time.time() + self.group_expiry],
+        )
+
+    def _group_discard(self, group, channel):
+        self._connection().execute(
+            'DELETE FROM channel_groups WHERE group_name = ? AND channel = ?', [group, channel]
+        )
+
+    def _flush(self):
+        db = self._connection()
+        db.execute('DELETE FROM channel_messages')
+        db.execute('DELETE FROM channel_groups')
+
+    # Local delivery and polling.
+
+    def _local_channel(self, channel, create=True):
+        with self._lock:
+            local = self._local.get(channel)
+            if local is None and create:
+                local = self._local[channel] = _LocalChannel(asyncio.get_running_loop())
+            return local
+
+    def _deliver_local(self, channel, message, strict):
+        local = self._local.get(channel)
+        if local is None:
+            return True
+        if local.queue.qsize() >= self.get_capacity(channel):
+            if strict:
+                raise ChannelFull(channel)
+            return False
+        local.put((time.monotonic() + self.expiry, message))
+        return True
+
+    def _ensure_poller(self):
+        loop = asyncio.get_running_loop()
+        task = self._pollers.get(loop)
+        if task is None or task.done():
+            self._pollers[loop] = loop.create_task(self._poll())
+
+    async def _poll(self):
+        while True:
+            try:
+                rows = await self._run(self._claim_process)
+            except sqlite3.Error:
+                rows = []
+            for channel, body in rows:
+                self._deliver_local(channel, self._decode(body), strict=False)
+            self._forget_idle_channels()
+            await asyncio.sleep(self.poll_interval)
+
+    def _forget_idle_channels(self):
+        cutoff = time.monotonic() - self.group_expiry
+        with self._lock:
+            for channel in [name for name, local in self._local.items() if local.last_used < cutoff]:
+                del self._local[channel]
+
+    # Channel layer API.
+
+    async def send(self, channel, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_channel_name(channel)
+        if self._is_local(channel):
+            self._deliver_local(channel, message, strict=True)
+            return
+        full = await self._run(self._insert, [(channel, self._encode(message))])
+        if full:
+            raise ChannelFull(channel)
+
+    async def receive(self, channel):
+        self.require_valid_channel_name(channel)
+        if '!' not in channel:
+            while True:
+                body = await self._run(self._claim_channel, channel)
+                if body is not None:
+                    return self._decode(body)
+                await asyncio.sleep(self.poll_interval)
+
+        self._ensure_poller()
+        local = self._local_channel(channel)
+        while True:
+            local.last_used = time.monotonic()
+            expires, message = await local.queue.get()
+            if expires > time.monotonic():
+                return message
+
+    async def new_channel(self, prefix='specific'):
+        channel = f'{self.process}!{uuid.uuid4().hex}'
+        self._local_channel(channel)
+        return channel
+
+    async def group_add(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._run(self._group_add, group, channel)
+
+    async def group_discard(self, group, channel):
+        self.require_valid_group_name(group)
+        self.require_valid_channel_name(channel)
+        await self._run(self._group_discard, group, channel)
+
+    async def group_send(self, group, message):
+        assert isinstance(message, dict), 'message is not a dict'
+        self.require_valid_group_name(group)
+        channels = await self._run(self._group_channels, group)
+        remote = []
+        body = None
+        for channel in channels:
+            if self._is_local(channel):
+                self._deliver_local(channel, message, strict=False)
+            else:
+                body = body or self._encode(message)
+                remote.append((channel, body))
+        if remote:
+            await self._run(self._insert, remote)
+
+    async def flush(self):
+        with self._lock:
+            self._local.clear()
+        await self._run(self._flush)
+
+    async def close(self):
+        for task in self._pollers.values():
+            task.cancel()
+        self._pollers.clear()
@@ -61,6 +61,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.tasks.middleware.RealtimeDispatchMiddleware',
 ]
 
 ROOT_URLCONF = 'task_management.urls'
@@ -139,6 +140,10 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.tasks.renderers.UJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
     'DEFAULT_FILTER_BACKENDS': [
@@ -148,6 +153,97 @@ REST_FRAMEWORK = {
     ],
 }
 
+# -----------------------
+# Caches
+# -----------------------
+# Local memory caches evict least-recently-used entries once MAX_ENTRIES is
+# reached. Point TASK_LIST_CACHE_BACKEND and REALTIME_CACHE_BACKEND at a shared
+# backend (e.g. Redis) when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'default',
+    },
+    'task_lists': {
+        'BACKEND': config(
+            'TASK_LIST_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config('TASK_LIST_CACHE_LOCATION', default='task-lists'),
+        'TIMEOUT': config('TASK_LIST_CACHE_TIMEOUT', default=300, cast=int),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('TASK_LIST_CACHE_MAX_ENTRIES', default=5000, cast=int),
+        },
+    },
+    'realtime': {
+        'BACKEND': config(
+            'REALTIME_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config('REALTIME_CACHE_LOCATION', default='realtime'),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('REALTIME_CACHE_MAX_ENTRIES', default=20000, cast=int),
+        },
+    },
+}
+
+# -----------------------
+# Tasks
+# -----------------------
+# Rendered task list pages are cached per user, keyed on the data version.
+TASK_LIST_CACHE_ENABLED = config('TASK_LIST_CACHE_ENABLED', default=True, cast=bool)
+TASK_LIST_CACHE_ALIAS = 'task_lists'
+
+# Serve task lists from values() rows instead of model instances.
+TASK_FAST_READ_PATH = config('TASK_FAST_READ_PATH', default=True, cast=bool)
+
+# Encode REST responses and WebSocket frames with ujson.
+FAST_JSON_RENDERER = config('FAST_JSON_RENDERER', default=True, cast=bool)
+# Full-text search for tasks: 'auto' picks PostgreSQL tsvector or SQLite FTS5
+# from the database vendor; 'basic' falls back to ILIKE matching.
+TASK_SEARCH_BACKEND = config('TASK_SEARCH_BACKEND', default='auto')
+
+# The admin overview is served from a cached snapshot recomputed at most
+# this often (seconds); admins can force a refresh with ?refresh=1.
+TASK_OVERVIEW_REFRESH_INTERVAL = config('TASK_OVERVIEW_REFRESH_INTERVAL', default=60, cast=int)
+
+# Realtime events are merged per transaction and per request, then published
+# after commit from a background thread. Batches that arrive while the queue
+# is full are dropped and counted.
+REALTIME_DISPATCH_ASYNC = config('REALTIME_DISPATCH_ASYNC', default=True, cast=bool)
+REALTIME_QUEUE_SIZE = config('REALTIME_QUEUE_SIZE', default=1000, cast=int)
+
+# Published events are numbered per user and the last REALTIME_REPLAY_SIZE
+# are kept for REALTIME_REPLAY_TTL seconds, so sockets reconnecting with
+# ?since=<seq> only replay what they missed.
+REALTIME_REPLAY_CACHE_ALIAS = 'realtime'
+REALTIME_REPLAY_SIZE = config('REALTIME_REPLAY_SIZE', default=200, cast=int)
+REALTIME_REPLAY_TTL = config('REALTIME_REPLAY_TTL', default=300, cast=int)
+
+# WebSocket clients may ask for msgpack or CBOR frames instead of JSON. Each
+# event is encoded once per format and field selection; this many recent
+# frames are kept per process for the other sockets receiving it.
+REALTIME_FRAME_CACHE_SIZE = config('REALTIME_FRAME_CACHE_SIZE', default=1024, cast=int)
+
+# Each socket has its own outbound queue, merged like the dispatcher's. A
+# client more than REALTIME_CONNECTION_QUEUE_SIZE events behind gets a single
+# resync_required instead; one that finishes no write for
+# REALTIME_SLOW_CLIENT_TIMEOUT seconds while events wait is disconnected.
+REALTIME_CONNECTION_QUEUE_SIZE = config('REALTIME_CONNECTION_QUEUE_SIZE', default=100, cast=int)
+REALTIME_SLOW_CLIENT_TIMEOUT = config('REALTIME_SLOW_CLIENT_TIMEOUT', default=10, cast=float)
+
+# -----------------------
+# Audit log
+# -----------------------
+# Audit rows are buffered per transaction and bulk-inserted on commit. With
+# AUDIT_LOG_ASYNC they are handed to a background writer instead; when its
+# queue stays full for AUDIT_LOG_QUEUE_TIMEOUT seconds the request writes
+# its own rows.
+AUDIT_LOG_ASYNC = config('AUDIT_LOG_ASYNC', default=False, cast=bool)
+AUDIT_LOG_QUEUE_SIZE = config('AUDIT_LOG_QUEUE_SIZE', default=1000, cast=int)
+AUDIT_LOG_QUEUE_TIMEOUT = config('AUDIT_LOG_QUEUE_TIMEOUT', default=0.5, cast=float)
+AUDIT_LOG_BATCH_SIZE = config('AUDIT_LOG_BATCH_SIZE', default=500, cast=int)
+
 # -----------------------
 # JWT Settings
 # -----------------------
@@ -193,8 +289,25 @@ SWAGGER_SETTINGS = {
 # -----------------------
 # Channels
 # -----------------------
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels.layers.InMemoryChannelLayer',
+# The in-memory layer only reaches clients connected to the same process.
+# CHANNEL_LAYER=sqlite shares events between every worker on one host
+# through CHANNEL_LAYER_PATH, without running Redis.
+CHANNEL_LAYER = config('CHANNEL_LAYER', default='memory')
+if CHANNEL_LAYER == 'sqlite':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'task_management.channel_layers.SQLiteChannelLayer',
+            'CONFIG': {
+                'path': config('CHANNEL_LAYER_PATH', default=str(BASE_DIR / 'channels.sqlite3')),
+                'expiry': config('CHANNEL_LAYER_EXPIRY', default=60, cast=int),
+                'group_expiry': config('CHANNEL_LAYER_GROUP_EXPIRY', default=86400, cast=int),
+                'capacity': config('CHANNEL_LAYER_CAPACITY', default=100, cast=int),
+            },
+        }
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        }
     }
-}
@@ -33,6 +33,7 @@ const Dashboard = () => {
   const [socketStatus, setSocketStatus] = useState('disconnected');
   const socketRef = useRef(null);
   const reconnectTimeout = useRef(null);
+  const lastSeq = useRef(null);
 
   const fetchTasks = useCallback(async (page = 1, overrideFilters) => {
     setLoading(true);
@@ -164,9 +165,22 @@ const Dashboard = () => {
   const handleSocketMessage = useCallback((event) => {
     try {
       const payload = JSON.parse(event.data);
-      const { event: type, data } = payload;
+      const { event: type, data, seq } = payload;
+      if (seq) {
+        lastSeq.current = seq;
+      }
 
       switch (type) {
+        case 'connected':
+          if (lastSeq.current === null) {
+            lastSeq.current = data?.seq ?? 0;
+          }
+          break;
+        case 'resync_required':
+          lastSeq.current = data?.seq ?? 0;
+          fetchStats();
+          fetchTasks(currentPage);
+          break;
         case 'task_summary':
           setStats(data);
           break;
@@ -174,6 +188,7 @@ const Dashboard = () => {
         case 'task_updated':
         case 'task_deleted':
         case 'tasks_reordered':
+        case 'tasks_batch':
           fetchTasks(currentPage);
           break;
         default:
@@ -182,7 +197,7 @@ const Dashboard = () => {
     } catch (err) {
       console.error('Failed to parse realtime payload', err);
     }
-  }, [fetchTasks, currentPage]);
+  }, [fetchTasks, fetchStats, currentPage]);
 
   const connectWebSocket = useCallback(() => {
     const token = localStorage.getItem('access_token');
@@ -195,7 +210,9 @@ const Dashboard = () => {
     }
 
     setSocketStatus('connecting');
-    const socket = new WebSocket(`${getWebSocketUrl()}${WS_TASK_PATH}?token=${token}`);
+    // Resume from the last event seen so only missed events are replayed.
+    const since = lastSeq.current !== null ? `&since=${lastSeq.current}` : '';
+    const socket = new WebSocket(`${getWebSocketUrl()}${WS_TASK_PATH}?token=${token}${since}`);
     socketRef.current = socket;
 
     socket.onopen = () => setSocketStatus('connected');